@@ -21,7 +21,7 @@ import { CITimeline } from "../../components/dashboard/CITimeline";
 import { RepoCard, RepoCardSkeleton } from "../../components/dashboard/RepoCard";
 import { GitHubIcon } from "../../components/dashboard/GitHubIcon";
 import { ScoreBreakdown } from "../../components/dashboard/ScoreBreakdown";
-import { getDefaultCommands, formatTime, mapLanguage, getBranchName, getTeamBranchName } from "./utils";
+import { getDefaultCommands, formatTime, mapLanguage, getBranchName, getTeamBranchName, appendLLMDelta } from "./utils";
 import { Repo, Fix, CIRun, LogLine, PipelineStep, StepStatus, StepState, Phase } from "./types";
 
 
@@ -74,6 +74,7 @@ export default function Dashboard() {
     total_fixed: number;
     total_failures: number;
     iterations: number;
+    llm_calls?: number;
     repo_url: string;
   } | null>(null);
 
@@ -282,6 +283,9 @@ export default function Dashboard() {
           case "log":
             setLogs((prev) => [...prev, { line: data.line ?? "", ts: data.ts ?? "" }]);
             break;
+          case "llm_delta":
+            setLogs((prev) => appendLLMDelta(prev, data.text ?? "", data.ts ?? ""));
+            break;
           case "step":
             updateStep(data.step as PipelineStep, data.status as StepStatus);
             break;
@@ -300,6 +304,9 @@ export default function Dashboard() {
           case "fix":
             setFixes((prev) => [...prev, data.fix]);
             break;
+          case "fix_explanation":
+            setFixes((prev) => prev.map((f) => (f.id === data.fix.id ? data.fix : f)));
+            break;
           case "complete":
             setFinalResult(data.result);
             setPhase("done");
@@ -937,7 +944,9 @@ export default function Dashboard() {
                   </div>
                   <span className="text-2xl font-bold text-foreground">{finalResult?.iterations ?? 0}</span>
                 </div>
-                <p className="mt-2 text-xs text-muted-foreground">Iterations used</p>
+                <p className="mt-2 text-xs text-muted-foreground">
+                  Iterations used{finalResult?.llm_calls ? ` · ${finalResult.llm_calls} LLM calls` : ""}
+                </p>
               </div>
               <div className="glass-card rounded-2xl p-4">
                 <div className="flex items-center gap-2">
@@ -10,12 +10,20 @@ export interface Repo {
 }
 
 export interface Fix {
+  /** Position in the run's fixes; fix_explanation events refer to it */
+  id?: number;
   file: string;
+  /** Every file the fix wrote (edit-mode fixes may touch several) */
+  files?: string[];
   bug_type: string;
   line_number: number;
   commit_message: string;
   status: "fixed" | "failed";
   error_message?: string;
+  /** Errors sharing this fix's target file, fixed by the same change */
+  errors_covered?: number;
+  /** Model answers rejected before the workspace was touched (cut off, empty, unchanged, shrunk) */
+  screened?: { reason: string; detail: string; model: string; mode: string }[];
   description?: string;
   explanation?: {
     root_cause: string;
@@ -35,6 +43,8 @@ export interface CIRun {
 export interface LogLine {
   line: string;
   ts: string;
+  /** Streamed model output (llm_delta events) rather than a server log line */
+  llm?: boolean;
 }
 
 export type PipelineStep =
@@ -1,5 +1,7 @@
 // Dashboard utility functions
 
+import { LogLine } from "./types";
+
 export function timeAgo(date: string) {
   const seconds = Math.floor(
     (new Date().getTime() - new Date(date).getTime()) / 1000
@@ -69,3 +71,21 @@ export function getTeamBranchName(teamName: string, leaderName: string): string
     str.toUpperCase().replace(/\s+/g, "_").replace(/[^A-Z0-9_]/g, "");
   return `${sanitize(teamName)}_${sanitize(leaderName)}_AI_Fix`;
 }
+
+/**
+ * Append streamed model output to the log: text continues the trailing
+ * streamed line, and every newline in it starts a new one.
+ */
+export function appendLLMDelta(logs: LogLine[], text: string, ts: string): LogLine[] {
+  if (!text) return logs;
+  const next = [...logs];
+  const [first, ...rest] = text.split("\n");
+  const last = next[next.length - 1];
+  if (last?.llm) {
+    next[next.length - 1] = { ...last, line: last.line + first };
+  } else {
+    next.push({ line: first, ts, llm: true });
+  }
+  for (const line of rest) next.push({ line, ts, llm: true });
+  return next;
+}
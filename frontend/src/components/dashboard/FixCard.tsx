@@ -38,6 +38,9 @@ export function FixCard({ fix }: { fix: Fix }) {
               {fix.line_number > 0 && (
                 <span className="text-xs text-muted-foreground">Line {fix.line_number}</span>
               )}
+              {(fix.errors_covered ?? 1) > 1 && (
+                <span className="text-xs text-muted-foreground">+{fix.errors_covered! - 1} more error(s) in one fix</span>
+              )}
             </div>
             <p className="text-sm text-muted-foreground leading-relaxed">
               {fix.explanation?.root_cause || fix.description || fix.error_message || fix.commit_message}
@@ -36,7 +36,9 @@ export function BuildLogTerminal({ logs, isStreaming }: { logs: LogLine[]; isStr
     }
   }, []);
 
-  const getLineClass = (line: string): string => {
+  const getLineClass = ({ line, llm }: LogLine): string => {
+    if (llm)
+      return "text-zinc-500";
     if (line.startsWith("  ERROR") || line.includes("✗") || line.includes("FAIL"))
       return "text-destructive";
     if (line.includes("✓") || line.includes("All tests passing") || line.includes("PASS"))
@@ -141,7 +143,7 @@ export function BuildLogTerminal({ logs, isStreaming }: { logs: LogLine[]; isStr
                         {i + 1}
                       </td>
                       {/* Content */}
-                      <td className={`px-2 whitespace-pre-wrap break-all ${getLineClass(log.line)}`}>
+                      <td className={`px-2 whitespace-pre-wrap break-all ${getLineClass(log)}`}>
                         {log.line || "\u00A0"}
                       </td>
                     </tr>
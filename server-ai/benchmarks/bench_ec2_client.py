@@ -0,0 +1,164 @@
+"""Benchmark — per-call HTTP clients vs. the shared ec2-agent connection pool.
+
+Starts a minimal stand-in for ec2-agent in-process (`GET /api/v1/files`
+answering immediately, so only client overhead is measured) and reads a
+file `--calls` times, one after another and `--concurrency` at a time, in
+two modes:
+
+    per-call  a new httpx.AsyncClient per request (the old EC2Client behaviour)
+    pooled    EC2Client through the shared `ec2_http` pool (keep-alive)
+
+Reports latency percentiles and the number of TCP connections the server
+accepted. With --url the requests go to a running ec2-agent instead
+(e.g. an HTTPS endpoint, where TLS setup widens the gap); --session-id
+and --file-path then name a real file.
+
+Usage (from server-ai/):
+    python -m benchmarks.bench_ec2_client --calls 500 --concurrency 20
+    python -m benchmarks.bench_ec2_client --url https://agent.example.com --session-id abc --file-path README.md
+"""
+
+import argparse
+import asyncio
+import logging
+import socket
+import statistics
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from src.app.config import api_settings
+from src.services.ec2_client import EC2Client, ec2_http
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _create_app(stats: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/files")
+    async def read_file(session_id: str, file_path: str) -> dict:
+        stats["requests"] += 1
+        return {"session_id": session_id, "file_path": file_path, "content": "x = 1\n" * 200}
+
+    return app
+
+
+class _CountingServer(uvicorn.Server):
+    """Counts accepted TCP connections."""
+
+    def __init__(self, config: uvicorn.Config, stats: dict):
+        super().__init__(config)
+        self._stats = stats
+
+    async def startup(self, sockets=None) -> None:
+        stats = self._stats
+
+        class _Counting(self.config.http_protocol_class):
+            def connection_made(self, transport):
+                stats["connections"] += 1
+                super().connection_made(transport)
+
+        self.config.http_protocol_class = _Counting
+        await super().startup(sockets)
+
+
+async def _per_call(session_id: str, file_path: str) -> None:
+    """What every EC2Client method used to do: build a client, send one request, close it."""
+    headers = {"X-API-Key": api_settings.ec2_agent_api_key} if api_settings.ec2_agent_api_key else {}
+    async with httpx.AsyncClient(base_url=api_settings.ec2_agent_url, headers=headers, timeout=300.0) as client:
+        response = await client.get("/api/v1/files", params={"session_id": session_id, "file_path": file_path})
+        response.raise_for_status()
+
+
+async def _pooled(session_id: str, file_path: str) -> None:
+    if not await EC2Client().read_file(session_id, file_path):
+        raise RuntimeError("read_file returned nothing")
+
+
+async def _measure(fn, calls: int, concurrency: int, session_id: str, file_path: str) -> dict:
+    latencies: list[float] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _one() -> None:
+        async with slots:
+            t0 = time.perf_counter()
+            await fn(session_id, file_path)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(calls)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "wall_s": wall,
+        "rps": calls / wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    logging.getLogger("rift_server").setLevel(logging.WARNING)  # EC2Client logs every request
+    stats = {"requests": 0, "connections": 0}
+    server = serving = None
+    if args.url:
+        api_settings.ec2_agent_url = args.url
+    else:
+        port = _free_port()
+        server = _CountingServer(
+            uvicorn.Config(_create_app(stats), host="127.0.0.1", port=port, log_level="warning", access_log=False),
+            stats,
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        api_settings.ec2_agent_url = f"http://127.0.0.1:{port}"
+
+    rows = []
+    try:
+        for mode, fn in (("per-call", _per_call), ("pooled", _pooled)):
+            for concurrency in (1, args.concurrency):
+                await _measure(fn, min(20, args.calls), concurrency, args.session_id, args.file_path)  # warm-up
+                before = stats["connections"]
+                result = await _measure(fn, args.calls, concurrency, args.session_id, args.file_path)
+                result.update(mode=mode, concurrency=concurrency, connections=stats["connections"] - before)
+                rows.append(result)
+            await ec2_http.close()
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await serving
+
+    print(f"\n{args.calls} read_file calls against {api_settings.ec2_agent_url}")
+    print(f"{'mode':>9} {'conc':>5} {'req/s':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'conns':>6}")
+    for r in rows:
+        conns = "-" if args.url else str(r["connections"])
+        print(
+            f"{r['mode']:>9} {r['concurrency']:>5} {r['rps']:>8.0f} {r['mean']:>6.2f}ms "
+            f"{r['p50']:>6.2f}ms {r['p95']:>6.2f}ms {conns:>6}"
+        )
+    by_key = {(r["mode"], r["concurrency"]): r for r in rows}
+    for concurrency in (1, args.concurrency):
+        old, new = by_key[("per-call", concurrency)], by_key[("pooled", concurrency)]
+        print(
+            f"concurrency {concurrency}: pooled saves {old['mean'] - new['mean']:.2f}ms per request "
+            f"({old['mean'] / new['mean']:.1f}× faster)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--url", default="", help="Benchmark a running ec2-agent instead of the stand-in")
+    parser.add_argument("--session-id", default="bench")
+    parser.add_argument("--file-path", default="src/calc.py")
+    asyncio.run(main(parser.parse_args()))
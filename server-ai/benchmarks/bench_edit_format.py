@@ -0,0 +1,99 @@
+"""Benchmark — SEARCH/REPLACE edits vs. whole-file rewrites.
+
+Generates synthetic Python modules of increasing size with one injected
+bug, asks the model for a fix in both output formats and reports prompt
+tokens, completion tokens and latency per size. A fix counts as correct
+when the bug line is gone and every other line is unchanged.
+
+Needs SERVER_GROQ_API_KEY; the response cache is bypassed. With --dry-run
+no model is called and the expected minimal answers are measured instead,
+which shows how output size scales with the file in each format.
+
+Usage (from server-ai/):
+    python -m benchmarks.bench_edit_format --sizes 50 200 500 1000 2000 --repeat 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.core.exceptions import EditFormatError
+from src.llm.edit_blocks import parse_edit_blocks
+from src.llm.llm_client import EDIT_SYSTEM_PROMPT, SYSTEM_PROMPT, ask_llm, clean_code_fences
+from src.llm.prompt_builder import build_fix_prompt, count_tokens
+
+PATH = "src/calc.py"
+BUG, FIX = "    return a - b\n", "    return a + b\n"
+
+
+def _module(lines: int) -> tuple[str, int]:
+    """A module of ~`lines` lines with the buggy add() in the middle; returns (source, bug line)."""
+    funcs = []
+    for i in range(max(1, lines // 6)):
+        funcs.append(f"def scale_{i}(value, factor={i + 1}):\n    \"\"\"Scale by {i + 1}.\"\"\"\n    result = value * factor\n    return result\n\n\n")
+    middle = len(funcs) // 2
+    funcs.insert(middle, f"def add(a, b):\n{BUG}\n\n")
+    source = "".join(funcs)
+    return source, source.splitlines().index(BUG.rstrip("\n")) + 1
+
+
+def _apply_exact(source: str, raw: str) -> str | None:
+    try:
+        blocks = parse_edit_blocks(raw, PATH)
+    except EditFormatError:
+        return None
+    for block in blocks:
+        if source.count(block.search) != 1:
+            return None
+        source = source.replace(block.search, block.replace)
+    return source
+
+
+async def _one(size: int, mode: str, dry_run: bool) -> dict:
+    source, bug_line = _module(size)
+    error = {"file": PATH, "line": bug_line, "error_type": "LOGIC", "message": "assert add(2, 3) == 5"}
+    output = f"FAILED tests/test_calc.py::test_add - assert -1 == 5\n  File \"{PATH}\", line {bug_line}, in add"
+    prompt, report = build_fix_prompt(error, "python", source, output, edit_format=mode)
+    expected = source.replace(BUG, FIX)
+
+    t0 = time.monotonic()
+    if dry_run:
+        raw = (
+            f"{PATH}\n<<<<<<< SEARCH\ndef add(a, b):\n{BUG}=======\ndef add(a, b):\n{FIX}>>>>>>> REPLACE"
+            if mode == "search_replace" else expected
+        )
+    else:
+        system = EDIT_SYSTEM_PROMPT if mode == "search_replace" else SYSTEM_PROMPT
+        raw = await ask_llm(prompt, use_cache=False, system=system)
+    latency = time.monotonic() - t0
+
+    fixed = _apply_exact(source, raw) if mode == "search_replace" else clean_code_fences(raw) + "\n"
+    return {
+        "prompt_tokens": report["tokens"],
+        "completion_tokens": count_tokens(raw),
+        "latency": latency,
+        "correct": fixed is not None and fixed.strip() == expected.strip(),
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    print(f"{'lines':>6} {'format':<15} {'prompt':>8} {'output':>8} {'latency':>9} {'correct':>8}")
+    for size in args.sizes:
+        for mode in ("whole_file", "search_replace"):
+            runs = [await _one(size, mode, args.dry_run) for _ in range(args.repeat)]
+            print(
+                f"{size:>6} {mode:<15} "
+                f"{statistics.mean(r['prompt_tokens'] for r in runs):>8.0f} "
+                f"{statistics.mean(r['completion_tokens'] for r in runs):>8.0f} "
+                f"{statistics.median(r['latency'] for r in runs):>8.2f}s "
+                f"{sum(r['correct'] for r in runs):>5}/{len(runs)}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--dry-run", action="store_true", help="Measure expected answers without calling the model")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""Benchmark — LLM scheduler under concurrent runs against the fake Groq server.
+
+Starts `benchmarks.fake_llm_server` in-process, points the LLM client at it
+and fires `--calls` fix-sized requests for each of `--runs` concurrent runs.
+Reports wall time, how evenly the runs were served (each run's finish
+time), failures, and the scheduler's retries, 429s and hedges next to what
+the server saw. No real Groq key is used.
+
+Usage (from server-ai/):
+    python -m benchmarks.bench_llm_scheduler --runs 4 --calls 6 --keys 2 --rpm 20 --tpm 20000
+    python -m benchmarks.bench_llm_scheduler --slow-rate 0.1 --hedge
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+
+import httpx
+import uvicorn
+
+from src.app.config import api_settings
+from src.core.exceptions import LLMError
+from src.llm.llm_client import ask_llm
+from src.llm.metrics import llm_metrics
+from src.llm.scheduler import llm_scheduler
+
+from benchmarks.fake_llm_server import FakeLLMConfig, create_app
+
+PROMPT = "Fix the failing test.\n" + "x = 1\n" * 1500  # ~2.3k tokens
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _run(owner: str, calls: int, t_start: float) -> dict:
+    ok = failed = 0
+    for i in range(calls):
+        try:
+            await ask_llm(f"{PROMPT}\n# {owner} call {i}", use_cache=False, owner=owner)
+            ok += 1
+        except LLMError:
+            failed += 1
+    return {"owner": owner, "ok": ok, "failed": failed, "finished_s": time.monotonic() - t_start}
+
+
+async def main(args: argparse.Namespace) -> None:
+    port = _free_port()
+    config = FakeLLMConfig(
+        rpm=args.rpm, tpm=args.tpm, latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate, slow_ms=args.slow_ms, error_rate=args.error_rate,
+    )
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    keys = [f"fake-key-{i}" for i in range(args.keys)]
+    api_settings.llm_base_url = f"http://127.0.0.1:{port}"
+    api_settings.groq_api_key, api_settings.groq_api_keys = keys[0], keys[1:]
+    api_settings.llm_hedge_enabled = args.hedge
+    api_settings.llm_hedge_min_samples = 5
+    api_settings.llm_hedge_min_delay_ms = args.latency_ms * 2
+
+    try:
+        t0 = time.monotonic()
+        # Each run makes its calls one after another, like the healing loop
+        results = await asyncio.gather(*(_run(f"run-{r}", args.calls, t0) for r in range(args.runs)))
+        wall = time.monotonic() - t0
+        async with httpx.AsyncClient() as http:
+            server_stats = (await http.get(f"http://127.0.0.1:{port}/stats")).json()
+    finally:
+        server.should_exit = True
+        await serving
+
+    finishes = [r["finished_s"] for r in results]
+    print(f"\n{args.runs} runs × {args.calls} calls, {args.keys} key(s), {args.rpm} rpm / {args.tpm} tpm per key")
+    print(f"{'run':>8} {'ok':>4} {'failed':>7} {'finished':>9}")
+    for r in results:
+        print(f"{r['owner']:>8} {r['ok']:>4} {r['failed']:>7} {r['finished_s']:>8.1f}s")
+    print(f"\nwall {wall:.1f}s — finish spread {max(finishes) - min(finishes):.1f}s "
+          f"(stdev {statistics.pstdev(finishes):.1f}s)")
+    snap = llm_metrics.snapshot()
+    print(f"scheduler: retries={snap['retries']} rate_limited={snap['rate_limited']} "
+          f"hedges={snap['hedges']} hedge_wins={snap['hedge_wins']} "
+          f"queue p95={snap['queue_wait_ms']['p95']:.0f}ms latency p95={snap['latency_ms']['p95']:.0f}ms")
+    print(f"server:    {server_stats}")
+    print(f"keys:      {llm_scheduler.snapshot()['keys']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=6)
+    parser.add_argument("--keys", type=int, default=1)
+    parser.add_argument("--rpm", type=int, default=30)
+    parser.add_argument("--tpm", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hedge", action="store_true", help="Enable hedged requests")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,184 @@
+"""Fake Groq server — rate limits, latency tails and failures on demand.
+
+Speaks the part of the Groq (OpenAI-compatible) API that server-ai uses:
+`POST /openai/v1/chat/completions`, streamed or not. Each API key gets its
+own requests/tokens-per-minute bucket; responses carry the same
+`x-ratelimit-*` headers as Groq and an exhausted bucket answers 429 with
+`retry-after`. Latency, a slow tail (to exercise hedging) and random 503s
+are configurable. `GET /stats` reports what the server saw.
+
+Usage (from server-ai/):
+    python -m benchmarks.fake_llm_server --port 8090 --rpm 30 --tpm 6000 --slow-rate 0.1
+    SERVER_LLM_BASE_URL=http://127.0.0.1:8090 SERVER_GROQ_API_KEY=fake-1 ./run.sh
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+COMPLETION = "def add(a, b):\n    return a + b\n"
+
+
+@dataclass
+class FakeLLMConfig:
+    rpm: int = 30
+    tpm: int = 6000
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    slow_rate: float = 0.0  # share of requests that take slow_ms instead
+    slow_ms: float = 5000.0
+    error_rate: float = 0.0  # share of requests answered with 503
+    keys: list[str] = field(default_factory=list)  # empty = accept any key
+    completion: str = COMPLETION
+    chunk_chars: int = 8
+
+
+class _Limiter:
+    """Groq-style bucket: `limit` per minute, refilled continuously."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.level = float(limit)
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self._updated) * self.limit / 60)
+        self._updated = now
+
+    def reset_s(self) -> float:
+        return (self.limit - self.level) * 60 / self.limit
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_app(config: FakeLLMConfig | None = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    app = FastAPI(title="Fake Groq")
+    limiters: dict[str, tuple[_Limiter, _Limiter]] = {}
+    stats: Counter = Counter()
+
+    def _headers(requests: _Limiter, tokens: _Limiter) -> dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(requests.limit),
+            "x-ratelimit-remaining-requests": str(int(requests.level)),
+            "x-ratelimit-reset-requests": f"{requests.reset_s():.2f}s",
+            "x-ratelimit-limit-tokens": str(tokens.limit),
+            "x-ratelimit-remaining-tokens": str(int(tokens.level)),
+            "x-ratelimit-reset-tokens": f"{tokens.reset_s():.2f}s",
+        }
+
+    @app.get("/stats")
+    async def get_stats() -> dict:
+        return dict(stats)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        key = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        body = await request.json()
+        stats["requests"] += 1
+        stats[f"requests:{key[-4:]}"] += 1
+
+        if config.keys and key not in config.keys:
+            stats["401"] += 1
+            return JSONResponse({"error": {"message": "Invalid API Key", "type": "invalid_request_error"}}, 401)
+
+        requests, tokens = limiters.setdefault(key, (_Limiter(config.rpm), _Limiter(config.tpm)))
+        requests.refill()
+        tokens.refill()
+        prompt_tokens = sum(_tokens(m.get("content", "")) for m in body.get("messages", []))
+        completion_tokens = _tokens(config.completion)
+        needed = prompt_tokens + completion_tokens
+
+        if requests.level < 1 or tokens.level < needed:
+            stats["429"] += 1
+            retry_after = max((1 - requests.level) * 60 / requests.limit, (needed - tokens.level) * 60 / tokens.limit)
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                429,
+                headers={**_headers(requests, tokens), "retry-after": str(max(1, round(retry_after)))},
+            )
+        requests.level -= 1
+        tokens.level -= needed
+        headers = _headers(requests, tokens)
+
+        if random.random() < config.error_rate:
+            stats["503"] += 1
+            return JSONResponse({"error": {"message": "Service Unavailable", "type": "internal_server_error"}}, 503)
+
+        slow = random.random() < config.slow_rate
+        stats["slow"] += slow
+        delay = (config.slow_ms if slow else config.latency_ms + random.uniform(-1, 1) * config.jitter_ms) / 1000
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": needed}
+        ident, created, model = f"chatcmpl-{uuid.uuid4().hex[:12]}", int(time.time()), body.get("model", "fake")
+
+        if not body.get("stream"):
+            await asyncio.sleep(max(delay, 0))
+            stats["200"] += 1
+            return JSONResponse(
+                {
+                    "id": ident, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": config.completion},
+                    }],
+                    "usage": usage,
+                },
+                headers=headers,
+            )
+
+        async def _events():
+            text = config.completion
+            pieces = [text[i:i + config.chunk_chars] for i in range(0, len(text), config.chunk_chars)]
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(max(delay, 0) / max(len(pieces), 1))
+                chunk = {
+                    "id": ident, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                if i == len(pieces) - 1:
+                    chunk["choices"][0]["finish_reason"] = "stop"
+                    chunk["x_groq"] = {"id": ident, "usage": usage}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["200"] += 1
+
+        return StreamingResponse(_events(), media_type="text/event-stream", headers=headers)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--rpm", type=int, default=30)
+    parser.add_argument("--tpm", type=int, default=6000)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--keys", nargs="*", default=[], help="Accepted API keys (default: any)")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeLLMConfig(
+        rpm=args.rpm, tpm=args.tpm, latency_ms=args.latency_ms, slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms, error_rate=args.error_rate, keys=args.keys,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
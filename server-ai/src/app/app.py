@@ -39,7 +39,8 @@ async def lifespan(app: FastAPI):
     print(f"Max iterations: {api_settings.max_iterations}")
 
     # Verify EC2 agent is reachable (soft check — don't crash if it's down)
-    from src.services.ec2_client import EC2Client
+    from src.services.ec2_client import EC2Client, ec2_http
+    await ec2_http.open()
     client = EC2Client()
     try:
         await client.ping()
@@ -51,6 +52,11 @@ async def lifespan(app: FastAPI):
     yield  # App is running
 
     # --- Shutdown ---
+    from src.llm.cache import llm_cache
+    llm_cache.close()
+    from src.llm.fix_memory import fix_memory
+    fix_memory.close()
+    await ec2_http.close()
     print("Shutting down...")
 
 
@@ -1,5 +1,7 @@
 """Main Server configuration — Pydantic BaseSettings."""
 
+from typing import Literal
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -36,24 +38,215 @@ class ApiSettings(BaseSettings):
         default="",
         description="API key for authenticating with EC2 agent",
     )
+    ec2_stream_resume_attempts: int = Field(
+        default=3,
+        description="Reconnect attempts for a dropped test-run stream before re-executing",
+    )
+    ec2_max_connections: int = Field(default=100, description="Connections in the shared ec2-agent pool")
+    ec2_max_keepalive_connections: int = Field(
+        default=20,
+        description="Idle connections kept open for reuse between ec2-agent calls",
+    )
+    ec2_keepalive_expiry_seconds: float = Field(default=60.0, description="Close idle pooled connections after this")
+    ec2_http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 to ec2-agent (needs httpx[http2] and an HTTPS endpoint, e.g. behind a TLS proxy)",
+    )
+    ec2_connect_timeout_seconds: float = Field(default=5.0, description="Timeout for opening a connection to ec2-agent")
+    ec2_timeouts: dict[str, float] = Field(
+        default={
+            "default": 30.0,
+            "ping": 5.0,
+            "read_file": 15.0,
+            "read_files": 30.0,
+            "resolve_implementations": 30.0,
+            "search_code": 30.0,  # may build the index on first use
+            "read_repo_map": 30.0,
+            "read_output": 30.0,
+            "get_session": 15.0,
+            "delete_session": 60.0,
+            "create_session": 300.0,  # clone
+            "commit_fix": 120.0,  # push
+            # Apply + Docker test run
+            "execute_tests": 600.0,
+            "execute_stream": 300.0,  # longest silence between streamed events
+            "apply_fix": 600.0,
+            "apply_patch": 600.0,
+            "apply_batch": 600.0,
+            "speculate_fix": 600.0,
+        },
+        description="Read timeout per ec2-agent operation in seconds; unlisted operations use 'default'",
+    )
+    test_output_max_bytes: int = Field(
+        default=1_000_000,
+        description="Bytes of a truncated test output fetched for the fix prompt (the end of it, if larger)",
+    )
 
     # ── LLM (Groq) ──
     groq_api_key: str = Field(
         default="",
         description="Groq API key",
     )
+    groq_api_keys: list[str] = Field(
+        default=[],
+        description="Extra Groq API keys; calls are spread over all keys by remaining rate-limit budget",
+    )
+    llm_base_url: str = Field(
+        default="",
+        description="Override the Groq API base URL (e.g. a local benchmarks.fake_llm_server)",
+    )
     llm_model: str = Field(
         default="llama-3.3-70b-versatile",
         description="Groq model name",
     )
+    llm_routing_enabled: bool = Field(
+        default=True,
+        description="Route fixes across model tiers (fast → llm_model → strong) by bug type and failed attempts",
+    )
+    llm_fast_model: str = Field(
+        default="llama-3.1-8b-instant",
+        description="Fast tier: simple bug types with small prompts, fix explanations",
+    )
+    llm_strong_model: str = Field(
+        default="openai/gpt-oss-120b",
+        description="Strongest tier, reached by escalation after failed attempts",
+    )
+    llm_fast_bug_types: list[str] = Field(
+        default=["LINTING", "IMPORT", "SYNTAX", "INDENTATION"],
+        description="Bug types that start on the fast tier",
+    )
+    llm_fast_max_prompt_tokens: int = Field(
+        default=3000,
+        description="Prompts larger than this skip the fast tier",
+    )
+    llm_model_prices: dict[str, tuple[float, float]] = Field(
+        default={
+            "llama-3.1-8b-instant": (0.05, 0.08),
+            "llama-3.3-70b-versatile": (0.59, 0.79),
+            "openai/gpt-oss-120b": (0.15, 0.75),
+        },
+        description="USD per million (input, output) tokens, for the run's cost report",
+    )
     llm_max_tokens: int = Field(default=4096, description="Max tokens per LLM call")
     llm_temperature: float = Field(default=0.2, description="LLM temperature")
+    llm_prompt_token_budget: int = Field(
+        default=8000,
+        description="Approximate prompt tokens for a fix; test files and test output are sliced to fit",
+    )
+    llm_edit_format: Literal["search_replace", "whole_file"] = Field(
+        default="search_replace",
+        description="How the model returns fixes: SEARCH/REPLACE edit blocks, or the whole corrected file",
+    )
+    fix_screen_max_retries: int = Field(
+        default=1,
+        description="Fresh answers requested when a fix is screened out (unchanged, empty, cut off or shrunk); 0 disables screening",
+    )
+    fix_screen_min_size_ratio: float = Field(
+        default=0.5,
+        description="A whole-file fix keeping fewer than this share of the file's lines is screened out as truncated",
+    )
+    fix_screen_min_lines: int = Field(
+        default=20,
+        description="Files shorter than this are exempt from the size-ratio check",
+    )
+    llm_max_errors_per_fix: int = Field(
+        default=8,
+        description="Errors sharing a fix target that are fixed together in one LLM call",
+    )
+    llm_context_snippets: int = Field(
+        default=3,
+        description="Code snippets retrieved from ec2-agent's search index for each fix prompt (0 disables)",
+    )
+    llm_context_query_chars: int = Field(
+        default=2000,
+        description="Longest search query built from a group's error messages and traces",
+    )
+    llm_repo_map_token_budget: int = Field(
+        default=1200,
+        description="Most prompt tokens spent on the repo map (files and top-level symbols); 0 disables it",
+    )
+    speculative_candidates: int = Field(
+        default=1,
+        description="Candidate fixes generated per fix and raced in forked workspaces on ec2-agent; 1 = off",
+    )
+    speculative_temperatures: list[float] = Field(
+        default=[0.2, 0.6, 0.9, 1.1],
+        description="Temperature of each speculative candidate, in order (cycled when there are more candidates)",
+    )
+    max_parallel_fixes: int = Field(
+        default=3,
+        description="Fix targets (files) fixed concurrently per iteration and verified by one test run; 1 = one at a time",
+    )
+    llm_stream_interval_ms: int = Field(
+        default=150,
+        description="Min interval between llm_delta WebSocket events while a fix is generated",
+    )
+    llm_max_concurrency: int = Field(
+        default=4,
+        description="Max LLM requests in flight per process; extra calls wait for a slot",
+    )
+    llm_requests_per_minute: int = Field(
+        default=30,
+        description="Initial requests-per-minute budget per API key, until Groq's rate-limit headers arrive",
+    )
+    llm_tokens_per_minute: int = Field(
+        default=12000,
+        description="Initial tokens-per-minute budget per API key, until Groq's rate-limit headers arrive",
+    )
+    llm_max_retries: int = Field(
+        default=3,
+        description="Retries for rate-limited (429), 5xx and connection-failed LLM calls",
+    )
+    llm_retry_base_delay_seconds: float = Field(default=1.0, description="Base of the jittered exponential retry backoff")
+    llm_retry_max_delay_seconds: float = Field(default=20.0, description="Cap on a single retry backoff")
+    llm_hedge_enabled: bool = Field(
+        default=False,
+        description="Send a duplicate request when a non-streamed call runs past the model's p95 latency",
+    )
+    llm_hedge_min_samples: int = Field(default=20, description="Latency samples per model before hedging starts")
+    llm_hedge_min_delay_ms: float = Field(default=1500.0, description="Never hedge earlier than this")
+    llm_timeout_seconds: float = Field(
+        default=90.0,
+        description="Timeout for a single LLM call (not counting time waiting for a slot)",
+    )
+    llm_cache_enabled: bool = Field(default=True, description="Reuse responses for identical LLM requests")
+    llm_cache_path: str = Field(
+        default=".cache/llm_cache.db",
+        description="SQLite file backing the LLM response cache",
+    )
+    llm_cache_max_bytes: int = Field(
+        default=200 * 1024 * 1024,
+        description="Total cached response size before least recently used entries are evicted",
+    )
+    llm_cache_max_age_seconds: int = Field(
+        default=7 * 24 * 3600,
+        description="Cached responses older than this are never served",
+    )
+    fix_memory_enabled: bool = Field(
+        default=True,
+        description="Remember patches that fixed an error and try them before the LLM on matching errors",
+    )
+    fix_memory_path: str = Field(
+        default=".cache/fix_memory.db",
+        description="SQLite file backing the fix memory",
+    )
+    fix_memory_max_entries: int = Field(
+        default=5000,
+        description="Remembered patches kept before least recently used ones are evicted",
+    )
 
     # ── Agent ──
     max_iterations: int = Field(
         default=5,
         description="Max LangGraph healing iterations",
     )
+    test_fail_fast_max_failures: int = Field(
+        default=5,
+        description=(
+            "Test runs between the first and the last iteration stop after this many failures "
+            "(\"find next error\"); 0 always runs the whole suite"
+        ),
+    )
 
     @field_validator("log_level")
     @classmethod
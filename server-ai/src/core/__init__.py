@@ -1,17 +1,27 @@
 from src.core.exceptions import (
     EC2AgentError,
     EC2AgentUnreachable,
+    PatchRejectedError,
     SessionCreationError,
     AgentRunError,
     LLMError,
+    LLMTimeoutError,
+    LLMRateLimitError,
+    EditFormatError,
+    DegenerateFixError,
     UnsupportedLanguageError,
 )
 
 __all__ = [
     "EC2AgentError",
     "EC2AgentUnreachable",
+    "PatchRejectedError",
     "SessionCreationError",
     "AgentRunError",
     "LLMError",
+    "LLMTimeoutError",
+    "LLMRateLimitError",
+    "EditFormatError",
+    "DegenerateFixError",
     "UnsupportedLanguageError",
 ]
@@ -6,6 +6,15 @@ class EC2AgentError(Exception):
     status_code = 502  # Bad Gateway
 
 
+class PatchRejectedError(EC2AgentError):
+    """Raised when ec2-agent cannot place an edit (SEARCH text not found)."""
+    status_code = 422
+
+    def __init__(self, message: str, rejected: dict[str, str] | None = None):
+        super().__init__(message)
+        self.rejected = rejected or {}  # batch: fix id → reason, for the fixes ec2-agent could not place
+
+
 class EC2AgentUnreachable(Exception):
     """Raised when ec2-agent cannot be reached."""
     status_code = 503
@@ -26,6 +35,30 @@ class LLMError(Exception):
     status_code = 500
 
 
+class LLMTimeoutError(LLMError):
+    """Raised when an LLM call exceeds its timeout."""
+    status_code = 504  # Gateway Timeout
+
+
+class LLMRateLimitError(LLMError):
+    """Raised when Groq keeps rate limiting an LLM call after all retries."""
+    status_code = 429
+
+
+class EditFormatError(LLMError):
+    """Raised when LLM output does not contain well-formed edit blocks."""
+    status_code = 502
+
+
+class DegenerateFixError(LLMError):
+    """Raised when every answer for a fix was screened out (unchanged, empty, cut off or shrunk)."""
+    status_code = 502
+
+    def __init__(self, message: str, screened: list[dict] | None = None):
+        super().__init__(message)
+        self.screened = screened or []  # one {"reason", "detail", "model", "mode"} per rejected answer
+
+
 class UnsupportedLanguageError(Exception):
     """Raised when requested language is not supported."""
     status_code = 422
@@ -40,6 +40,7 @@ async def agent_run(request: AgentRunRequest) -> AgentRunResponse:
         status=result["status"],
         passed=result["passed"],
         iterations=result["iterations"],
+        llm_calls=result.get("llm_calls", 0),
         message=result["message"],
         run_summary=RunSummary(**result["run_summary"]),
         score_breakdown=ScoreBreakdown(**result["score_breakdown"]),
@@ -48,5 +49,6 @@ async def agent_run(request: AgentRunRequest) -> AgentRunResponse:
         commit_hash=result.get("commit_hash"),
         branch_name=result.get("branch_name"),
         errors_remaining=result.get("errors_remaining", []),
+        model_usage=result.get("model_usage", {}),
         debug_trace=result.get("debug_trace", []),
     )
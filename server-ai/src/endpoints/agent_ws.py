@@ -24,8 +24,10 @@ async def agent_websocket(websocket: WebSocket):
     2. Server streams events back as JSON messages:
        - ``{ type: "step", step, status }``                   — pipeline step status change
        - ``{ type: "log", line, ts }``                        — build log line
+       - ``{ type: "llm_delta", phase, text, ts }``           — model output as it is generated
        - ``{ type: "iteration", iteration, total, status }``  — iteration result
        - ``{ type: "fix", fix: {...} }``                      — fix applied/failed
+       - ``{ type: "fix_explanation", fix: {...} }``          — same fix (by ``id``) with its explanation
        - ``{ type: "complete", result: {...} }``              — final result
        - ``{ type: "error", message }``                       — fatal error
     3. Server closes the connection after ``complete`` or ``error``.
@@ -4,6 +4,10 @@ from fastapi import APIRouter
 
 from src.app.config import api_settings
 from src.app.handlers import handle_endpoint
+from src.llm.cache import llm_cache
+from src.llm.fix_memory import fix_memory
+from src.llm.metrics import llm_metrics
+from src.llm.scheduler import llm_scheduler
 
 router = APIRouter(tags=["Health"])
 
@@ -17,3 +21,20 @@ async def health_check() -> dict:
         "service": api_settings.app_name,
         "version": api_settings.version,
     }
+
+
+@router.get("/health/llm")
+@handle_endpoint
+async def llm_health() -> dict:
+    """LLM client load (in-flight calls, queue depth, queue wait and latency
+    percentiles, retries and hedges), per-key rate-limit budgets, response
+    cache hit/miss/bytes-saved counters and fix memory hit rate."""
+    return {
+        "model": api_settings.llm_model,
+        "max_concurrency": api_settings.llm_max_concurrency,
+        "timeout_seconds": api_settings.llm_timeout_seconds,
+        **llm_metrics.snapshot(),
+        "scheduler": llm_scheduler.snapshot(),
+        "cache": llm_cache.stats(),
+        "fix_memory": fix_memory.stats(),
+    }
@@ -0,0 +1,197 @@
+"""On-disk LLM response cache — skip Groq for prompts we have already answered.
+
+Entries are content-addressed: the key is a SHA-256 over the model,
+temperature, system prompt and user prompt, so any change to one of them
+is a miss. The store is a single SQLite file, trimmed by age and by total
+size (least recently used first) after every write.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.app.config import api_settings
+
+logger = logging.getLogger("rift_server")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    response    TEXT NOT NULL,
+    size_bytes  INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_hit_at REAL NOT NULL,
+    hits        INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_hit ON llm_cache (last_hit_at);
+"""
+
+
+def cache_key(model: str, temperature: float, system: str, prompt: str) -> str:
+    """Content hash identifying one LLM request."""
+    payload = json.dumps([model, temperature, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed response cache, shared by every run in this process.
+
+    All methods are async and run the (short) SQLite work in a thread so the
+    event loop never waits on disk.
+
+    Usage:
+        key = cache_key(model, temperature, system, prompt)
+        cached = await llm_cache.get(key)
+        await llm_cache.put(key, response)
+    """
+
+    def __init__(self):
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return api_settings.llm_cache_enabled
+
+    def _connect(self) -> sqlite3.Connection:
+        """Lazy-initialised connection; creates the file and schema on first use."""
+        if self._conn is None:
+            path = api_settings.llm_cache_path
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            logger.info(f"[LLM-CACHE] Opened {path}")
+        return self._conn
+
+    # ── Public API ────────────────────────────────────────
+
+    async def get(self, key: str) -> str | None:
+        """Return the cached response for `key`, or None (expired entries are misses)."""
+        response = await asyncio.to_thread(self._get, key)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.bytes_saved += len(response.encode("utf-8"))
+        return response
+
+    async def put(self, key: str, response: str) -> None:
+        """Store a response, then evict by age and size."""
+        await asyncio.to_thread(self._put, key, response)
+        self.stores += 1
+
+    async def discard(self, key: str) -> None:
+        """Forget a response (e.g. a fix that turned out not to work)."""
+        await asyncio.to_thread(self._discard, key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters since start-up plus the current store size."""
+        lookups = self.hits + self.misses
+        entries = size = 0
+        if self.enabled and self._conn is not None:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_cache"
+                ).fetchone()
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ── SQLite work (runs in a thread) ────────────────────
+
+    def _get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            response, created_at = row
+            if now - created_at > api_settings.llm_cache_max_age_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+
+            conn.execute(
+                "UPDATE llm_cache SET hits = hits + 1, last_hit_at = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            return response
+
+    def _put(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size_bytes, created_at, last_hit_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            self.evictions += self._evict(conn, now)
+            conn.commit()
+
+    def _discard(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        """Drop expired entries, then least recently used ones until under the size cap."""
+        removed = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?",
+            (now - api_settings.llm_cache_max_age_seconds,),
+        ).rowcount
+
+        (total,) = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM llm_cache").fetchone()
+        excess = total - api_settings.llm_cache_max_bytes
+        if excess > 0:
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size_bytes FROM llm_cache ORDER BY last_hit_at ASC"
+            ):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            removed += len(victims)
+
+        if removed:
+            logger.info(f"[LLM-CACHE] Evicted {removed} entr{'y' if removed == 1 else 'ies'}")
+        return removed
+
+
+# Global singleton — shared by every LLM call in this process
+llm_cache = LLMCache()
@@ -0,0 +1,87 @@
+"""Incremental assembly of an LLM completion.
+
+Streamed completions arrive in arbitrary chunks. `CompletionAssembler`
+cleans them line by line as they come in — markdown fences around the
+code are dropped and an optional leading `TARGET_FILE: <path>` line is
+split off — so the final text is ready the moment the stream ends,
+without a second pass over the whole completion.
+"""
+
+_TARGET_PREFIX = "TARGET_FILE:"
+
+
+class CompletionAssembler:
+    """
+    Builds the cleaned completion from chunks.
+
+    Usage:
+        assembler = CompletionAssembler(detect_target=True)
+        for chunk in stream:
+            assembler.feed(chunk)
+        code = assembler.finish()
+        assembler.target_file  # → "src/app.py" or ""
+    """
+
+    def __init__(self, detect_target: bool = False):
+        self.detect_target = detect_target
+        self.target_file = ""
+        self.raw = ""  # everything fed, unmodified (what the cache stores)
+        self.finish_reason = ""  # set by the caller from the model response: "stop", "length", …
+        self.cache_key = ""  # response cache entry of this answer, if it was looked up there
+        self._partial = ""  # current line, not yet terminated
+        self._lines: list[str] = []
+        self._held: list[str] = []  # trailing blank/fence lines, dropped if nothing follows
+        self._started = False  # first code line seen
+        self._fenced = False
+        self._text: str | None = None
+
+    def feed(self, chunk: str) -> None:
+        """Consume a chunk; complete lines are cleaned immediately."""
+        self.raw += chunk
+        self._partial += chunk
+        while "\n" in self._partial:
+            line, self._partial = self._partial.split("\n", 1)
+            self._line(line)
+
+    def finish(self) -> str:
+        """Flush the last line and return the cleaned text (idempotent)."""
+        if self._text is None:
+            if self._partial:
+                self._line(self._partial)
+                self._partial = ""
+            self._text = "\n".join(self._lines).rstrip()
+        return self._text
+
+    @property
+    def text(self) -> str:
+        return self.finish()
+
+    def _line(self, line: str) -> None:
+        stripped = line.strip()
+
+        if not self._started:
+            if not stripped:
+                return
+            if self.detect_target and not self.target_file and stripped.startswith(_TARGET_PREFIX):
+                self.target_file = stripped[len(_TARGET_PREFIX):].strip()
+                return
+            if stripped.startswith("```") and not self._fenced:
+                self._fenced = True  # opening fence, e.g. ```python
+                return
+            self._started = True
+
+        if not stripped or (self._fenced and stripped == "```"):
+            self._held.append(line)  # closing fence only counts if it is the last thing
+            return
+
+        self._lines.extend(self._held)
+        self._held.clear()
+        self._lines.append(line)
+
+
+def clean_completion(text: str, detect_target: bool = False) -> CompletionAssembler:
+    """Run a complete text through the assembler (non-streaming callers)."""
+    assembler = CompletionAssembler(detect_target)
+    assembler.feed(text)
+    assembler.finish()
+    return assembler
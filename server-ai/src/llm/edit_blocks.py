@@ -0,0 +1,108 @@
+"""SEARCH/REPLACE edit blocks — the compact LLM output format for fixes.
+
+The model answers with one block per change instead of the whole file:
+
+    path/to/file.py
+    <<<<<<< SEARCH
+    exact lines copied from the file
+    =======
+    the lines that replace them
+    >>>>>>> REPLACE
+
+server-ec2's `POST /patch` locates and applies them.
+"""
+
+import re
+from dataclasses import dataclass
+
+from src.core.exceptions import EditFormatError
+
+_SEARCH_RE = re.compile(r"^\s*<{5,9}\s*SEARCH\s*$")
+_DIVIDER_RE = re.compile(r"^\s*={5,9}\s*$")
+_REPLACE_RE = re.compile(r"^\s*>{5,9}\s*REPLACE\s*$")
+
+EDIT_FORMAT_INSTRUCTIONS = """Return ONLY SEARCH/REPLACE blocks — no explanation, no full file. Format:
+
+path/to/file.ext
+<<<<<<< SEARCH
+exact lines copied from the current file (a few lines of context, enough to be unique)
+=======
+the corrected lines
+>>>>>>> REPLACE
+
+Rules: the SEARCH part must match the current file exactly, including indentation.
+Use several small blocks rather than one large block. Use the file's path as shown above each file."""
+
+
+@dataclass
+class EditBlock:
+    path: str
+    search: str
+    replace: str
+
+    def as_payload(self) -> dict:
+        return {"path": self.path, "search": self.search, "replace": self.replace}
+
+
+def parse_edit_blocks(text: str, default_path: str) -> list[EditBlock]:
+    """Parse SEARCH/REPLACE blocks from model output.
+
+    The path is the last non-empty line before a block (markdown fences and
+    "File:" prefixes are ignored); without one, the previous block's path
+    or `default_path` is used.
+
+    Raises EditFormatError if there are no blocks or a block is unterminated.
+    """
+    lines = text.splitlines()
+    blocks: list[EditBlock] = []
+    path = default_path
+    i = 0
+
+    while i < len(lines):
+        if not _SEARCH_RE.match(lines[i]):
+            i += 1
+            continue
+
+        path = _path_before(lines, i) or path
+
+        search: list[str] = []
+        i += 1
+        while i < len(lines) and not _DIVIDER_RE.match(lines[i]):
+            search.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise EditFormatError(f"Unterminated SEARCH block for {path}")
+
+        replace: list[str] = []
+        i += 1
+        while i < len(lines) and not _REPLACE_RE.match(lines[i]):
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise EditFormatError(f"Unterminated REPLACE block for {path}")
+
+        blocks.append(EditBlock(path, _join(search), _join(replace)))
+        i += 1
+
+    if not blocks:
+        raise EditFormatError("Model output contains no SEARCH/REPLACE blocks")
+    return blocks
+
+
+def _path_before(lines: list[str], index: int) -> str:
+    for j in range(index - 1, max(-1, index - 4), -1):
+        if lines[j].strip().startswith("```"):
+            continue  # a code fence ("```python") — the path may be above it
+        candidate = lines[j].strip().strip("`*").strip()
+        if not candidate:
+            continue
+        if candidate.lower().startswith("file:"):
+            candidate = candidate[5:].strip()
+        if _REPLACE_RE.match(candidate) or " " in candidate or "/" not in candidate and "." not in candidate:
+            return ""  # previous block's end or prose, not a path
+        return candidate
+    return ""
+
+
+def _join(lines: list[str]) -> str:
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,250 @@
+"""Fix memory — patches that fixed an error before, tried before asking the LLM.
+
+The same kinds of failure recur across repos and runs: a missing import,
+a typo'd export, a wrong constant in a shared helper. An error is reduced
+to a signature that survives moving between repos (paths, line numbers
+and literal values stripped, quoted identifiers kept, see
+`error_signature`); every search/replace
+patch that cleared an error is stored under its signature, keyed by a
+hash of the code it edits (its SEARCH text).
+
+On a later error with the same signature, a remembered patch is reused
+when all its SEARCH text occurs in the file being fixed — no LLM call.
+Patches that stop working are tried less (successes minus failures).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from src.app.config import api_settings
+
+logger = logging.getLogger("rift_server")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fix_memory (
+    signature    TEXT NOT NULL,
+    context_hash TEXT NOT NULL,
+    edits        TEXT NOT NULL,
+    successes    INTEGER NOT NULL DEFAULT 0,
+    failures     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (signature, context_hash)
+);
+CREATE INDEX IF NOT EXISTS fix_memory_last_used ON fix_memory (last_used_at);
+"""
+
+_LINE_RE = re.compile(r"\bline \d+\b|:\d+(?::\d+)?\b|\(\d+,\s*\d+\)")
+_PATH_RE = re.compile(r"(?:[\w.@-]+[/\\])+[\w.@-]+")
+_QUOTED_RE = re.compile(r"'[^'\n]*'|\"[^\"\n]*\"|`[^`\n]*`")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*")
+_NUMBER_RE = re.compile(r"\b0x[0-9a-f]+\b|-?\b\d+(?:\.\d+)?\b", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """An error message without paths, line numbers or literal values.
+
+    Quoted identifiers (`name 'foo' is not defined`, `Cannot find module
+    'lodash'`) are kept — they are what tells one error from another.
+    """
+    text = _LINE_RE.sub("", message[:500])
+    text = _PATH_RE.sub("<path>", text)
+    text = _QUOTED_RE.sub(_quoted, text)
+    text = _NUMBER_RE.sub("<num>", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _quoted(match: re.Match) -> str:
+    return match.group() if _IDENTIFIER_RE.fullmatch(match.group()[1:-1]) else "<str>"
+
+
+def error_signature(error: dict[str, Any], language: str) -> str:
+    """Identify a class of error across repos and runs."""
+    payload = json.dumps([language, error.get("error_type", ""), normalize_message(error.get("message", ""))])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _squash(text: str) -> str:
+    """Code with indentation and trailing whitespace dropped, for containment checks."""
+    return "\n".join(line.strip() for line in text.strip().splitlines())
+
+
+def context_hash(edits: list[tuple[str, str]]) -> str:
+    """Hash of the code a patch edits."""
+    payload = json.dumps([_squash(search) for search, _ in edits])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FixMemory:
+    """
+    SQLite-backed store of verified patches, shared by every run in this process.
+
+    Usage:
+        edits = await fix_memory.recall(errors, language, target_content)  # [(search, replace)] or None
+        await fix_memory.record(errors, language, edits, success=True)
+    """
+
+    def __init__(self):
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0  # remembered patch reused
+        self.verified = 0  # reused patches that cleared their errors again
+        self.failed = 0  # reused patches that did not
+        self.rejected = 0  # reused patches that no longer applied — the LLM was asked after all
+        self.stores = 0
+
+    @property
+    def enabled(self) -> bool:
+        return api_settings.fix_memory_enabled
+
+    def _connect(self) -> sqlite3.Connection:
+        """Lazy-initialised connection; creates the file and schema on first use."""
+        if self._conn is None:
+            path = api_settings.fix_memory_path
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            logger.info(f"[FIX-MEMORY] Opened {path}")
+        return self._conn
+
+    # ── Public API ────────────────────────────────────────
+
+    async def recall(
+        self, errors: list[dict[str, Any]], language: str, content: str
+    ) -> list[tuple[str, str]] | None:
+        """The best remembered patch for any of `errors` that fits `content`, or None."""
+        if not self.enabled or not content:
+            return None
+        signatures = list(dict.fromkeys(error_signature(e, language) for e in errors))
+        self.lookups += 1
+        try:
+            edits = await asyncio.to_thread(self._recall, signatures, content)
+        except sqlite3.Error as e:
+            logger.warning(f"[FIX-MEMORY] lookup failed: {e}")
+            return None
+        if edits is not None:
+            self.hits += 1
+        return edits
+
+    async def record(
+        self,
+        errors: list[dict[str, Any]],
+        language: str,
+        edits: list[tuple[str, str]],
+        success: bool,
+        recalled: bool = False,
+        rejected: bool = False,
+    ) -> None:
+        """Count a patch's outcome for every error it was applied for.
+
+        Successful patches are stored; a failure only counts against a
+        patch already in memory. `rejected` marks a recalled patch that
+        could not be placed at all.
+        """
+        if recalled:
+            self.verified += success
+            self.failed += not success
+            self.rejected += rejected
+        if not self.enabled or not edits:
+            return
+        signatures = list(dict.fromkeys(error_signature(e, language) for e in errors))
+        try:
+            await asyncio.to_thread(self._record, signatures, edits, success)
+        except sqlite3.Error as e:
+            logger.warning(f"[FIX-MEMORY] store failed: {e}")
+            return
+        self.stores += success
+
+    def stats(self) -> dict:
+        """Lookup counters since start-up plus the current store size."""
+        entries = 0
+        if self.enabled and self._conn is not None:
+            with self._lock:
+                (entries,) = self._conn.execute("SELECT COUNT(*) FROM fix_memory").fetchone()
+        return {
+            "enabled": self.enabled,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "llm_calls_avoided": self.hits - self.rejected,
+            "verified": self.verified,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "stores": self.stores,
+            "entries": entries,
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ── SQLite work (runs in a thread) ────────────────────
+
+    def _recall(self, signatures: list[str], content: str) -> list[tuple[str, str]] | None:
+        squashed = _squash(content)
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                f"SELECT context_hash, edits FROM fix_memory WHERE signature IN ({','.join('?' * len(signatures))}) "
+                "AND successes > failures ORDER BY successes - failures DESC, last_used_at DESC",
+                signatures,
+            ).fetchall()
+            for ctx, raw in rows:
+                edits = [tuple(edit) for edit in json.loads(raw)]
+                if all(_squash(search) in squashed for search, _ in edits):
+                    conn.execute(
+                        "UPDATE fix_memory SET last_used_at = ? WHERE context_hash = ?", (time.time(), ctx)
+                    )
+                    conn.commit()
+                    return edits
+        return None
+
+    def _record(self, signatures: list[str], edits: list[tuple[str, str]], success: bool) -> None:
+        now = time.time()
+        ctx = context_hash(edits)
+        with self._lock:
+            conn = self._connect()
+            if success:
+                conn.executemany(
+                    "INSERT INTO fix_memory (signature, context_hash, edits, successes, failures, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, 1, 0, ?, ?) "
+                    "ON CONFLICT (signature, context_hash) DO UPDATE SET "
+                    "successes = successes + 1, edits = excluded.edits, last_used_at = excluded.last_used_at",
+                    [(sig, ctx, json.dumps(edits), now, now) for sig in signatures],
+                )
+            else:
+                conn.executemany(
+                    "UPDATE fix_memory SET failures = failures + 1 WHERE signature = ? AND context_hash = ?",
+                    [(sig, ctx) for sig in signatures],
+                )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Keep the most recently used `fix_memory_max_entries` patches."""
+        removed = conn.execute(
+            "DELETE FROM fix_memory WHERE rowid IN ("
+            "SELECT rowid FROM fix_memory ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (api_settings.fix_memory_max_entries,),
+        ).rowcount
+        if removed:
+            logger.info(f"[FIX-MEMORY] Evicted {removed} entr{'y' if removed == 1 else 'ies'}")
+
+
+# Global singleton — shared by every run in this process
+fix_memory = FixMemory()
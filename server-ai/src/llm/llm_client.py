@@ -1,93 +1,237 @@
-"""LLM client — Groq for code repair."""
+"""LLM client — Groq for code repair.
+
+Calls go through the async Groq SDK so a slow completion never blocks the
+event loop (other WebSocket runs keep streaming while one waits on the
+model). Admission, fair queueing across runs, rate-limit budgets, retries
+and hedging are handled by `src.llm.scheduler.llm_scheduler`; time spent
+waiting there is recorded in `src.llm.metrics.llm_metrics`. Identical
+requests are answered from the on-disk cache in `src.llm.cache` without
+touching Groq at all.
+
+Passing `on_delta` switches to a streamed completion: each chunk is handed
+to the callback as it arrives and cleaned incrementally by a
+`src.llm.completion.CompletionAssembler`.
+"""
 
 import logging
+import sqlite3
+import time
+from typing import Awaitable, Callable
 
-from groq import Groq
+from groq import AsyncGroq
 
 from src.app.config import api_settings
 from src.core.exceptions import LLMError
+from src.llm.cache import cache_key, llm_cache
+from src.llm.completion import CompletionAssembler, clean_completion
+from src.llm.prompt_builder import count_tokens
+from src.llm.router import ModelLedger
+from src.llm.scheduler import llm_scheduler
 
 logger = logging.getLogger("rift_server")
 
-_client: Groq | None = None
+SYSTEM_PROMPT = (
+    "You are a senior software engineer fixing CI test failures. "
+    "Return ONLY the complete corrected file contents. "
+    "Do not include any explanation, markdown fences, or commentary. "
+    "Just the raw code."
+)
 
+EDIT_SYSTEM_PROMPT = (
+    "You are a senior software engineer fixing CI test failures. "
+    "Return ONLY SEARCH/REPLACE edit blocks that change the files shown. "
+    "Never rewrite a whole file and do not add any explanation."
+)
 
-def _get_client() -> Groq:
-    """Lazy-initialised Groq client."""
-    global _client
-    if _client is None:
-        if not api_settings.groq_api_key:
-            raise LLMError("SERVER_GROQ_API_KEY is not set — cannot call LLM")
-        _client = Groq(api_key=api_settings.groq_api_key)
-    return _client
 
-
-def _clean_output(text: str) -> str:
-    """Strip markdown code fences returned by LLM."""
-    text = text.strip()
-    if text.startswith("```"):
-        lines = text.split("\n")
-        # Remove first line (```python etc.)
-        lines = lines[1:]
-        # Remove closing ```
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        text = "\n".join(lines)
-    return text.strip()
+DeltaFn = Callable[[str], Awaitable[None]]
 
 
 def clean_code_fences(text: str) -> str:
-    """Public alias for stripping markdown fences from code."""
-    return _clean_output(text)
-
-
-def ask_llm(prompt: str) -> str:
+    """Strip markdown code fences returned by LLM."""
+    return clean_completion(text).text
+
+
+async def ask_llm(
+    prompt: str,
+    timeout: float | None = None,
+    use_cache: bool = True,
+    system: str = SYSTEM_PROMPT,
+    on_delta: DeltaFn | None = None,
+    assembler: CompletionAssembler | None = None,
+    model: str | None = None,
+    ledger: ModelLedger | None = None,
+    owner: str = "",
+    temperature: float | None = None,
+) -> str:
     """
     Send a code-repair prompt to Groq LLM and return the fixed code.
 
-    Raises LLMError on failure.
+    `system` selects the output contract: SYSTEM_PROMPT asks for the whole
+    corrected file, EDIT_SYSTEM_PROMPT for SEARCH/REPLACE blocks.
+
+    Served from the response cache when an identical request was answered
+    before, unless `use_cache` is False (e.g. to get a fresh attempt after
+    a cached answer did not work). Otherwise the call is queued in the
+    scheduler under `owner` (the run's session id — runs are served
+    round-robin) until a key has rate-limit budget for it; `timeout`
+    (default `llm_timeout_seconds`) bounds each model call, not the wait.
+    Rate limits, 5xx and connection errors are retried.
+
+    `assembler.finish_reason` tells why the model stopped ("length" = cut
+    off at `llm_max_tokens`; such answers are not cached), and
+    `assembler.cache_key` names the answer's cache entry, so a caller can
+    discard an answer that turned out not to work.
+
+    With `on_delta` the completion is streamed and every chunk is passed to
+    it (a cache hit arrives as one chunk). `assembler` receives the output
+    as it is cleaned — pass one with `detect_target=True` to have a leading
+    TARGET_FILE line split off into `assembler.target_file`. Streamed calls
+    are never hedged and are not retried once output has arrived.
+
+    `model` overrides `llm_model` (see `src.llm.router`) and `temperature`
+    overrides `llm_temperature`; a `ledger` gets the call's latency and
+    token usage.
+
+    Raises LLMTimeoutError if the call times out, LLMRateLimitError if it
+    stays rate limited, LLMError on any other failure.
     """
-    client = _get_client()
+    if not llm_scheduler.configured:
+        # Fail fast, even on a cache hit
+        raise LLMError("SERVER_GROQ_API_KEY is not set — cannot call LLM")
+    timeout = timeout or api_settings.llm_timeout_seconds
+    assembler = assembler or CompletionAssembler()
+    model = model or api_settings.llm_model
+    temperature = api_settings.llm_temperature if temperature is None else temperature
+
+    key = None
+    if use_cache and llm_cache.enabled:
+        key = assembler.cache_key = cache_key(model, temperature, system, prompt)
+        try:
+            cached = await llm_cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"[LLM-CACHE] lookup failed, calling the model: {e}")
+            cached = None
+        if cached is not None:
+            logger.info(f"[LLM-RES] cache hit {key[:12]} ({len(cached)} chars)")
+            if ledger is not None:
+                ledger.record_call(model, 0.0, cached=True)
+            assembler.feed(cached)
+            if on_delta is not None:
+                await on_delta(cached)
+            return assembler.finish()
 
     logger.info("\n" + "#"*60)
     logger.info("[LLM-REQ] Groq chat.completions.create")
-    logger.info(f"[LLM-REQ] model={api_settings.llm_model}  max_tokens={api_settings.llm_max_tokens}  temp={api_settings.llm_temperature}")
+    logger.info(f"[LLM-REQ] model={model}  max_tokens={api_settings.llm_max_tokens}  temp={temperature}")
     logger.info(f"[LLM-REQ] PROMPT ({len(prompt)} chars):\n{prompt}")
     logger.info("#"*60)
 
-    try:
-        import time as _time
-        t0 = _time.monotonic()
-        response = client.chat.completions.create(
-            model=api_settings.llm_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a senior software engineer fixing CI test failures. "
-                        "Return ONLY the complete corrected file contents. "
-                        "Do not include any explanation, markdown fences, or commentary. "
-                        "Just the raw code."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=api_settings.llm_temperature,
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+    prompt_tokens = count_tokens(system + prompt)
+    # Reserved from the key's token budget until the real usage is known
+    reserve = prompt_tokens + api_settings.llm_max_tokens
+
+    async def _complete(client: AsyncGroq):
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
             max_tokens=api_settings.llm_max_tokens,
         )
-        elapsed = (_time.monotonic() - t0) * 1000
+        response = await raw.parse()
+        return response, raw.headers, response.usage.total_tokens if response.usage else None
+
+    async def _stream(client: AsyncGroq):
+        return await _stream_completion(client, model, messages, assembler, on_delta, temperature)
 
-        content = response.choices[0].message.content
-        usage = response.usage
+    t0 = time.monotonic()
+    ok = False
+    try:
+        if on_delta is None:
+            response = await llm_scheduler.run_hedged(owner, model, reserve, _complete, timeout)
+            assembler.feed(response.choices[0].message.content or "")
+            assembler.finish_reason = response.choices[0].finish_reason or ""
+            usage = response.usage
+        else:
+            usage = await llm_scheduler.run(owner, model, reserve, _stream, timeout, stream=True)
+        elapsed = (time.monotonic() - t0) * 1000
+
+        content = assembler.raw
         logger.info("\n" + "-"*60)
-        logger.info(f"[LLM-RES] Groq response ({elapsed:.0f}ms)")
-        logger.info(f"[LLM-RES] usage: prompt_tokens={usage.prompt_tokens}  completion_tokens={usage.completion_tokens}  total={usage.total_tokens}")
+        logger.info(f"[LLM-RES] Groq response ({elapsed:.0f}ms incl. queueing{', streamed' if on_delta else ''})")
+        if usage is not None:
+            logger.info(f"[LLM-RES] usage: prompt_tokens={usage.prompt_tokens}  completion_tokens={usage.completion_tokens}  total={usage.total_tokens}")
         logger.info(f"[LLM-RES] OUTPUT ({len(content)} chars):\n{content[:1000]}{'...<truncated>' if len(content) > 1000 else ''}")
         logger.info("-"*60)
-        return _clean_output(content)
+        ok = True
+        if ledger is not None:
+            if usage is not None:
+                ledger.record_call(model, elapsed, usage.prompt_tokens, usage.completion_tokens)
+            else:
+                ledger.record_call(model, elapsed, prompt_tokens, count_tokens(content))
+        cleaned = assembler.finish()
+        if assembler.finish_reason == "length":
+            # Cut off — not cached, so a retry gets a fresh answer
+            logger.warning(f"[LLM-RES] completion cut off at max_tokens={api_settings.llm_max_tokens}")
+        elif key is not None:
+            try:
+                await llm_cache.put(key, content)
+            except sqlite3.Error as e:
+                logger.warning(f"[LLM-CACHE] store failed: {e}")
+        return cleaned
 
     except LLMError:
         raise
     except Exception as e:
         logger.error(f"[LLM-ERR] LLM call failed: {e}")
         raise LLMError(f"LLM call failed: {e}")
+    finally:
+        if ledger is not None and not ok:
+            ledger.record_call(model, (time.monotonic() - t0) * 1000, failed=True)
+
+
+async def _stream_completion(
+    client: AsyncGroq,
+    model: str,
+    messages: list[dict],
+    assembler: CompletionAssembler,
+    on_delta: DeltaFn,
+    temperature: float,
+):
+    """Consume a streamed completion chunk by chunk.
+
+    Returns (usage, response headers, total tokens) for the scheduler;
+    usage is None unless Groq reports it. A stream that breaks after
+    output was forwarded raises LLMError, which is not retried.
+    """
+    raw = await client.chat.completions.with_raw_response.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=api_settings.llm_max_tokens,
+        stream=True,
+    )
+    stream = await raw.parse()
+    usage = None
+    try:
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    assembler.feed(delta)
+                    await on_delta(delta)
+                if chunk.choices[0].finish_reason:
+                    assembler.finish_reason = chunk.choices[0].finish_reason
+            # Groq reports usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                usage = x_groq.usage
+    except Exception as e:
+        if not assembler.raw:
+            raise
+        raise LLMError(f"LLM stream interrupted after {len(assembler.raw)} chars: {e}")
+    return usage, raw.headers, usage.total_tokens if usage is not None else None
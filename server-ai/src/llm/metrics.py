@@ -0,0 +1,94 @@
+"""In-process LLM call metrics — concurrency, queue wait and latency."""
+
+import statistics
+import time
+from collections import deque
+
+
+class LLMMetrics:
+    """
+    Counters for the LLM client, per server-ai process.
+
+    Queue wait is the time a call spends waiting for admission (a
+    concurrency slot and rate-limit budget) before its request is sent;
+    latency is the model round trip after that. Every attempt counts as a
+    call — retries and hedged duplicates included.
+
+    Usage:
+        llm_metrics.snapshot()  # → dict for /health/llm
+    """
+
+    def __init__(self, window: int = 500):
+        self.started_at = time.time()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._queue_waits: deque[float] = deque(maxlen=window)
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    # ── Recording ─────────────────────────────────────────
+
+    def enter_queue(self) -> None:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def abandon_queue(self) -> None:
+        self.waiting -= 1
+
+    def leave_queue(self, wait_ms: float) -> None:
+        self.waiting -= 1
+        self.in_flight += 1
+        self._queue_waits.append(wait_ms)
+
+    def finish(self, latency_ms: float, ok: bool, timed_out: bool = False) -> None:
+        self.in_flight -= 1
+        self.calls += 1
+        self._latencies.append(latency_ms)
+        if not ok:
+            self.failures += 1
+        if timed_out:
+            self.timeouts += 1
+
+    # ── Reporting ─────────────────────────────────────────
+
+    def snapshot(self) -> dict:
+        """Current counters plus percentiles over the recent window."""
+        return {
+            "uptime_s": round(time.time() - self.started_at),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "queue_wait_ms": _summary(self._queue_waits),
+            "latency_ms": _summary(self._latencies),
+        }
+
+
+def _summary(samples: deque[float]) -> dict:
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    p95 = statistics.quantiles(ordered, n=20)[-1] if len(ordered) >= 20 else ordered[-1]
+    return {
+        "count": len(ordered),
+        "p50": round(statistics.median(ordered), 1),
+        "p95": round(p95, 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+# Global singleton — shared by every LLM call in this process
+llm_metrics = LLMMetrics()
@@ -0,0 +1,520 @@
+"""Prompt assembly under a token budget.
+
+A fix prompt is built from sections with a priority. Each section can
+offer several variants, richest first (e.g. a whole test file, then only
+the functions around the failing line); the builder gives every section,
+in priority order, the richest variant that still fits the remaining
+budget. Required sections are always included.
+
+In whole-file mode the file the model must rewrite is always sent whole —
+it answers with the complete file, so anything cut from the prompt would be
+cut from the repo. In edit mode (SEARCH/REPLACE blocks) the model only
+touches lines it was shown, so the target file may be sliced too.
+"""
+
+import ast
+import logging
+import posixpath
+import re
+from dataclasses import dataclass, field
+
+from src.app.config import api_settings
+from src.llm.edit_blocks import EDIT_FORMAT_INSTRUCTIONS
+
+logger = logging.getLogger("rift_server")
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: words and punctuation marks.
+
+    Close enough to BPE tokenizers on code and logs for budgeting; the
+    model's own tokenizer is not available offline.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+# ═══════════════════════════════════════════════════════════
+# Builder
+# ═══════════════════════════════════════════════════════════
+
+@dataclass
+class PromptSection:
+    name: str
+    variants: list[str]
+    priority: int
+    required: bool = False
+    chosen: int | None = None  # index into variants, None = dropped
+    tokens: int = 0
+
+
+@dataclass
+class PromptBuilder:
+    """
+    Collects prompt sections and renders the ones that fit the budget.
+
+    Usage:
+        builder = PromptBuilder(budget=6000)
+        builder.add("header", header, priority=0, required=True)
+        builder.add("test_file", whole, sliced, priority=3)
+        prompt = builder.build()
+        builder.report()  # → what was kept, sliced or dropped
+    """
+
+    budget: int
+    sections: list[PromptSection] = field(default_factory=list)
+
+    def add(self, name: str, *variants: str, priority: int, required: bool = False) -> None:
+        """Add a section; `variants` go from richest to smallest. Lower priority numbers win."""
+        variants_ = [v for v in variants if v]
+        if variants_:
+            self.sections.append(PromptSection(name, variants_, priority, required))
+
+    def build(self) -> str:
+        """Choose a variant per section by priority, then render in insertion order."""
+        remaining = self.budget
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            section.chosen = None
+            for index, text in enumerate(section.variants):
+                tokens = count_tokens(text)
+                if tokens <= remaining:
+                    section.chosen, section.tokens = index, tokens
+                    break
+            if section.chosen is None and section.required:
+                # Required content goes in even over budget (smallest variant)
+                section.chosen = len(section.variants) - 1
+                section.tokens = count_tokens(section.variants[-1])
+            if section.chosen is not None:
+                remaining -= section.tokens
+
+        return "".join(s.variants[s.chosen] for s in self.sections if s.chosen is not None)
+
+    def report(self) -> dict:
+        """Per-section outcome of the last build: tokens and variant used (0 = richest)."""
+        used = sum(s.tokens for s in self.sections if s.chosen is not None)
+        return {
+            "budget": self.budget,
+            "tokens": used,
+            "sections": {
+                s.name: {"variant": s.chosen, "of": len(s.variants), "tokens": s.tokens}
+                for s in self.sections
+            },
+        }
+
+
+# ═══════════════════════════════════════════════════════════
+# Context slicing
+# ═══════════════════════════════════════════════════════════
+
+def traceback_window(output: str, locations: list[tuple[str, int | None]], radius: int) -> str:
+    """Lines of test output around every mention of the failing files, plus the final summary.
+
+    `locations` are (file path, line number or None) pairs, one per error.
+    Falls back to the last lines of the output when no file is mentioned.
+    """
+    lines = output.splitlines()
+    if not lines:
+        return ""
+
+    keep: set[int] = set(range(max(0, len(lines) - radius), len(lines)))  # summary lives at the end
+    for file_path, line_number in locations:
+        name = file_path.rsplit("/", 1)[-1]
+        hits = [i for i, line in enumerate(lines) if file_path in line or (name and name in line)]
+        if line_number:
+            exact = [i for i in hits if str(line_number) in lines[i]]
+            hits = exact or hits
+        for i in hits:
+            keep.update(range(max(0, i - radius), min(len(lines), i + radius + 1)))
+
+    return _join_ranges(lines, sorted(keep))
+
+
+def enclosing_symbols(
+    source: str, file_path: str, line_number: int | list[int] | None, numbered: bool = True
+) -> str:
+    """Imports plus the top-level definition(s) containing `line_number`.
+
+    `line_number` may be a list to keep the definitions around several
+    errors. Python is parsed with `ast`; JS/TS with a brace scanner.
+    Returns "" when no line can be located, so callers fall back to other
+    variants. Pass `numbered=False` when the model must copy lines verbatim.
+    """
+    numbers = [line_number] if isinstance(line_number, int) else [n for n in line_number or [] if n]
+    if not source or not numbers:
+        return ""
+    if file_path.endswith(".py"):
+        find_spans = _python_spans
+    elif file_path.rsplit(".", 1)[-1] in ("js", "jsx", "ts", "tsx", "mjs", "cjs"):
+        find_spans = _brace_spans
+    else:
+        return ""
+    spans = [span for n in numbers for span in find_spans(source, n) or []]
+    if not spans:
+        return ""
+
+    lines = source.splitlines()
+    keep: set[int] = set()
+    for start, end in spans:
+        keep.update(range(start - 1, min(end, len(lines))))
+    return _join_ranges(lines, sorted(keep), numbered=numbered)
+
+
+def head_lines(text: str, max_lines: int) -> str:
+    """First `max_lines` lines with an omission marker."""
+    lines = text.splitlines()
+    if len(lines) <= max_lines:
+        return text
+    return "\n".join(lines[:max_lines]) + f"\n… <{len(lines) - max_lines} more lines omitted>"
+
+
+# Top-level blocks longer than this are narrowed to the member containing the line
+_MAX_BLOCK_LINES = 60
+
+
+def _python_spans(source: str, line_number: int) -> list[tuple[int, int]] | None:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    spans = []
+    found = False
+    for node in tree.body:
+        start, end = _node_span(node)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            spans.append((start, end))
+        elif start <= line_number <= end:
+            found = True
+            if isinstance(node, ast.ClassDef) and end - start > _MAX_BLOCK_LINES and node.body:
+                # Class header plus only the method around the failing line
+                spans.append((start, _node_span(node.body[0])[0] - 1))
+                spans.extend(
+                    _node_span(child) for child in node.body
+                    if _node_span(child)[0] <= line_number <= _node_span(child)[1]
+                )
+            else:
+                spans.append((start, end))
+    return spans if found else None
+
+
+def _node_span(node: ast.stmt) -> tuple[int, int]:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return start, getattr(node, "end_lineno", None) or node.lineno
+
+
+_JS_IMPORT_RE = re.compile(r"^\s*(import\b|export\s+\*\s+from\b|(const|let|var)\s+.*=\s*require\()")
+
+
+def _brace_spans(source: str, line_number: int) -> list[tuple[int, int]] | None:
+    """Top-level statement spans from brace depth, skipping strings and comments."""
+    lines = source.splitlines()
+    depth_at_start: list[int] = []
+    depth = 0
+    in_block_comment = False
+    quote = ""
+
+    for line in lines:
+        depth_at_start.append(depth)
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            nxt = line[i + 1] if i + 1 < len(line) else ""
+            if in_block_comment:
+                if ch == "*" and nxt == "/":
+                    in_block_comment = False
+                    i += 1
+            elif quote:
+                if ch == "\\":
+                    i += 1
+                elif ch == quote:
+                    quote = ""
+            elif ch == "/" and nxt == "/":
+                break
+            elif ch == "/" and nxt == "*":
+                in_block_comment = True
+                i += 1
+            elif ch in "'\"`":
+                quote = ch
+            elif ch in "{([":
+                depth += 1
+            elif ch in "})]":
+                depth = max(0, depth - 1)
+            i += 1
+        if quote != "`":
+            quote = ""  # only template literals span lines
+
+    if not 1 <= line_number <= len(lines):
+        return None
+
+    def _span(level: int) -> tuple[int, int]:
+        # Walk back to where the enclosing statement at `level` starts, forward to where it ends
+        start = line_number
+        while start > 1 and depth_at_start[start - 1] > level:
+            start -= 1
+        end = line_number
+        while end < len(lines) and depth_at_start[end] > level:
+            end += 1
+        return start, end
+
+    spans = [(i + 1, i + 1) for i, line in enumerate(lines) if depth_at_start[i] == 0 and _JS_IMPORT_RE.match(line)]
+    start, end = _span(0)
+    spans.append((start, start))
+    # Narrow a long block (e.g. describe()) to the innermost-needed statement around the line
+    level, inner = 0, (start, end)
+    while inner[1] - inner[0] > _MAX_BLOCK_LINES and level < depth_at_start[line_number - 1]:
+        level += 1
+        inner = _span(level)
+    spans.extend([inner, (end, end)])
+    return spans
+
+
+def render_repo_map(
+    files: dict[str, list[str]], focus: set[str] | None = None, symbols: bool = True, tests: bool = True
+) -> str:
+    """Repo map text: one path per line, its symbols indented below.
+
+    Only files in a `focus` directory get their symbols (all when None);
+    `tests=False` leaves test files out, `symbols=False` lists paths only.
+    """
+    out: list[str] = []
+    for path, outline in files.items():
+        if not tests and any(x in path.lower() for x in ("test", "spec", "__test__")):
+            continue
+        out.append(path)
+        if symbols and (focus is None or posixpath.dirname(path) in focus):
+            out.extend("  " + symbol for symbol in outline)
+    return "\n".join(out)
+
+
+def _join_ranges(lines: list[str], indexes: list[int], numbered: bool = False) -> str:
+    """Render the kept line indexes, marking each gap."""
+    out: list[str] = []
+    previous = -1
+    for i in indexes:
+        if i - previous > 1:
+            out.append(f"… <{i - previous - 1} lines omitted>")
+        out.append(f"{i + 1:>5} | {lines[i]}" if numbered else lines[i])
+        previous = i
+    if previous < len(lines) - 1:
+        out.append(f"… <{len(lines) - 1 - previous} lines omitted>")
+    return "\n".join(out)
+
+
+# ═══════════════════════════════════════════════════════════
+# Fix prompt
+# ═══════════════════════════════════════════════════════════
+
+def _fenced(path: str, content: str) -> str:
+    ext = path.rsplit(".", 1)[-1] if "." in path else ""
+    return f"```{ext}\n{content}\n```"
+
+
+def build_fix_prompt(
+    error: dict,
+    language: str,
+    file_content: str,
+    raw_output: str,
+    impl_path: str = "",
+    impl_content: str = "",
+    budget: int | None = None,
+    edit_format: str = "whole_file",
+    related_errors: list[dict] | None = None,
+    related_files: dict[str, str] | None = None,
+    snippets: list[dict] | None = None,
+    repo_map: dict[str, list[str]] | None = None,
+    retry_note: str = "",
+) -> tuple[str, dict]:
+    """Assemble the code-repair prompt for an error within the token budget.
+
+    `file_content` is the file the error points at. When that is a test
+    file and `impl_content` was found, the implementation is the fix
+    target (sent whole) and the test file becomes sliceable context.
+
+    `edit_format` is "whole_file" (answer with the full corrected file) or
+    "search_replace" (answer with edit blocks; the target may be sliced).
+
+    `related_errors` share the same fix target and are fixed in the same
+    answer (see `src.services.error_groups`); `related_files` holds the
+    contents of other files they point at, sent as sliceable context.
+
+    `repo_map` ({path: [symbol, …]}) is sent as an overview of the project,
+    sliced down to `llm_repo_map_token_budget` tokens.
+
+    `retry_note` says what was wrong with a screened-out earlier answer
+    (see `src.services.fix_screen`); it is always sent.
+
+    `snippets` are code search hits for the error messages (see
+    `EC2Client.search_code`); they only fill budget left by everything else.
+
+    Returns (prompt, report) where report describes what was kept.
+    """
+    from src.services.error_groups import is_test_path  # src.services imports this module
+
+    file_path = error.get("file", "unknown")
+    line_number = error.get("line")
+    is_test_file = is_test_path(file_path)
+    edit_mode = edit_format == "search_replace"
+    errors = [error, *(related_errors or [])]
+    file_lines = [e.get("line") for e in errors if e.get("file", "unknown") == file_path and e.get("line")]
+    locations = [(e.get("file", "unknown"), e.get("line")) for e in errors]
+
+    if not is_test_file:
+        test_file_hint = ""
+    elif edit_mode:
+        test_file_hint = (
+            "\nNOTE: The file reported in the error is a TEST file. "
+            "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
+            "Write your edits against the IMPLEMENTATION file. Do NOT modify the test file."
+        )
+    else:
+        test_file_hint = (
+            "\nNOTE: The file reported in the error is a TEST file. "
+            "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
+            "You must fix the IMPLEMENTATION file and return its full corrected contents.\n"
+            "Output EXACTLY one line first: TARGET_FILE: <path/to/impl/file>\n"
+            "then output the complete corrected implementation file contents on the next lines.\n"
+            "Do NOT modify the test file. Do NOT wrap code in markdown fences."
+        )
+
+    builder = PromptBuilder(budget=budget or api_settings.llm_prompt_token_budget)
+
+    if len(errors) == 1:
+        header = f"""CI pipeline failed. Fix the issue with a MINIMAL change.
+
+=== ERROR INFO ===
+File: {file_path}
+Language: {language}
+Error Type: {error.get('error_type', 'LOGIC')}
+Line: {line_number or 'unknown'}
+Message: {error.get('message', '')}
+Full Trace: {error.get('full_trace') or 'None'}
+{test_file_hint}
+"""
+    else:
+        listing = "".join(
+            f"""
+--- Error {i} of {len(errors)} ---
+File: {e.get('file', 'unknown')}
+Error Type: {e.get('error_type', 'LOGIC')}
+Line: {e.get('line') or 'unknown'}
+Message: {e.get('message', '')}
+"""
+            + (f"Full Trace: {e['full_trace'][:800]}\n" if e.get("full_trace") else "")
+            for i, e in enumerate(errors, 1)
+        )
+        header = f"""CI pipeline failed with {len(errors)} errors that share one fix target.
+Fix ALL of them in this one answer, each with a MINIMAL change.
+
+=== ERROR INFO ===
+Language: {language}
+{listing}{test_file_hint}
+"""
+    builder.add("header", header, priority=0, required=True)
+    if retry_note:
+        builder.add("retry_note", f"=== PREVIOUS ANSWER REJECTED ===\n{retry_note}\n\n", priority=0, required=True)
+
+    # The error's own file: whole if it is the rewrite target, sliceable otherwise
+    file_title = f"=== TEST FILE CONTENTS ({file_path}) ===\n"
+    if not file_content:
+        builder.add("file", file_title + "(file content unavailable)", priority=1, required=True)
+    elif edit_mode and not (is_test_file and impl_content):
+        # Edit target: the model copies SEARCH text from it, so no line numbers
+        symbols = enclosing_symbols(file_content, file_path, file_lines, numbered=False)
+        builder.add(
+            "file",
+            file_title + _fenced(file_path, file_content),
+            file_title + _fenced(file_path, symbols) if symbols else "",
+            priority=1,
+            required=True,
+        )
+    elif is_test_file and impl_content:
+        symbols = enclosing_symbols(file_content, file_path, file_lines)
+        builder.add(
+            "file",
+            file_title + _fenced(file_path, file_content),
+            file_title + _fenced(file_path, symbols) if symbols else "",
+            file_title + _fenced(file_path, head_lines(file_content, 60)),
+            priority=3,
+            required=True,
+        )
+    else:
+        builder.add("file", file_title + _fenced(file_path, file_content), priority=1, required=True)
+
+    if impl_content and impl_path:
+        builder.add(
+            "impl_file",
+            f"\n\n=== IMPLEMENTATION FILE ({impl_path}) ===\n" + _fenced(impl_path, impl_content),
+            priority=1,
+            required=True,
+        )
+
+    for i, (path, content) in enumerate((related_files or {}).items()):
+        title = f"\n\n=== RELATED FILE CONTENTS ({path}) ===\n"
+        lines = [e.get("line") for e in errors if e.get("file") == path and e.get("line")]
+        symbols = enclosing_symbols(content, path, lines)
+        builder.add(
+            f"related_{i + 1}",
+            title + _fenced(path, content),
+            title + _fenced(path, symbols) if symbols else "",
+            title + _fenced(path, head_lines(content, 40)),
+            priority=4,
+        )
+
+    if repo_map and api_settings.llm_repo_map_token_budget > 0:
+        # Full map, then without tests, then symbols only near the failure, then bare paths
+        focus = {posixpath.dirname(p) for p, _ in locations} | ({posixpath.dirname(impl_path)} if impl_path else set())
+        title = "\n\n=== REPOSITORY MAP (files and top-level symbols) ===\n"
+        variants = [
+            render_repo_map(repo_map),
+            render_repo_map(repo_map, tests=False),
+            render_repo_map(repo_map, focus, tests=False),
+            head_lines(render_repo_map(repo_map, symbols=False, tests=False), 80),
+        ]
+        builder.add(
+            "repo_map",
+            *dict.fromkeys(
+                title + v for v in variants if v and count_tokens(v) <= api_settings.llm_repo_map_token_budget
+            ),
+            priority=4,
+        )
+
+    for i, hit in enumerate(snippets or []):
+        path = hit.get("path", "")
+        title = f"\n\n=== POSSIBLY RELEVANT CODE ({path}, lines {hit.get('start_line')}-{hit.get('end_line')}) ===\n"
+        builder.add(
+            f"snippet_{i + 1}",
+            title + _fenced(path, hit.get("snippet", "")),
+            title + _fenced(path, head_lines(hit.get("snippet", ""), 12)),
+            priority=5 + i,
+        )
+
+    output_title = "\n\n=== TEST OUTPUT ===\n"
+    if raw_output:
+        builder.add(
+            "test_output",
+            output_title + f"```\n{raw_output}\n```",
+            output_title + f"```\n{traceback_window(raw_output, locations, 40)}\n```",
+            output_title + f"```\n{traceback_window(raw_output, locations, 12)}\n```",
+            output_title + f"```\n{traceback_window(raw_output, locations, 4)}\n```",
+            priority=2,
+            required=True,
+        )
+    else:
+        builder.add("test_output", output_title + "(no test output available)", priority=2, required=True)
+
+    builder.add(
+        "footer",
+        "\n\n" + EDIT_FORMAT_INSTRUCTIONS if edit_mode else
+        "\n\nReturn ONLY the complete corrected file contents with no explanation, no markdown fences, no commentary.",
+        priority=0,
+        required=True,
+    )
+
+    prompt = builder.build()
+    report = builder.report()
+    logger.info(
+        f"[PROMPT] {report['tokens']}/{report['budget']} tokens — "
+        + ", ".join(f"{name}:v{s['variant']}/{s['of']}" for name, s in report["sections"].items())
+    )
+    return prompt, report
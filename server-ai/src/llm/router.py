@@ -0,0 +1,174 @@
+"""Model routing — pick a Groq model per fix and escalate when fixes do not hold.
+
+Models are arranged in tiers: fast → standard (`llm_model`) → strong.
+Simple bug types (LINTING, IMPORT, ...) with a small prompt start on the
+fast tier, everything else on the standard tier. Each earlier attempt at
+the same error that did not make it go away moves the next attempt one
+tier up.
+
+`ModelLedger` is the per-run record behind that: every LLM call (latency,
+tokens, cost) and every fix attempt, which is marked verified or failed
+once the next test run shows whether its error is gone.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple
+
+from src.app.config import api_settings
+
+
+class Route(NamedTuple):
+    model: str
+    tier: int
+    reason: str
+
+
+def error_key(error: dict[str, Any]) -> str:
+    """Identify an error across test runs (line numbers and values may shift)."""
+    message = re.sub(r"\d+", "N", error.get("message", ""))[:200]
+    return f"{error.get('file', '')}|{error.get('error_type', '')}|{message}"
+
+
+class ModelRouter:
+    """
+    Chooses the model for a fix.
+
+    Usage:
+        route = model_router.route(bug_type="LINTING", prompt_tokens=900, failed_attempts=0)
+        text = await ask_llm(prompt, model=route.model)
+    """
+
+    @property
+    def tiers(self) -> list[str]:
+        models = [api_settings.llm_fast_model, api_settings.llm_model, api_settings.llm_strong_model]
+        return list(dict.fromkeys(m for m in models if m))
+
+    @property
+    def fast_model(self) -> str:
+        """Cheapest model — also used for side tasks such as fix explanations."""
+        return self.tiers[0] if api_settings.llm_routing_enabled else api_settings.llm_model
+
+    def route(self, bug_type: str | list[str], prompt_tokens: int, failed_attempts: int = 0) -> Route:
+        """Pick a model; a list of bug types (a grouped fix) is simple only if all of them are."""
+        if not api_settings.llm_routing_enabled:
+            return Route(api_settings.llm_model, 0, "routing disabled")
+
+        bug_types = list(dict.fromkeys([bug_type] if isinstance(bug_type, str) else bug_type))
+        label = "/".join(bug_types)
+        tiers = self.tiers
+        standard = tiers.index(api_settings.llm_model)
+        simple = all(t in api_settings.llm_fast_bug_types for t in bug_types)
+        if simple and prompt_tokens <= api_settings.llm_fast_max_prompt_tokens:
+            base, reason = 0, f"{label} with a small prompt"
+        else:
+            base = standard
+            reason = f"{label}, ~{prompt_tokens} prompt tokens" if simple else label
+
+        tier = min(base + failed_attempts, len(tiers) - 1)
+        if failed_attempts:
+            reason += f"; escalated after {failed_attempts} failed attempt{'s' if failed_attempts > 1 else ''}"
+        return Route(tiers[tier], tier, reason)
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    fix_attempts: int = 0
+    fixes_verified: int = 0
+
+
+@dataclass
+class ModelLedger:
+    """
+    Per-run model usage and fix outcomes.
+
+    Usage:
+        ledger.record_call(model, latency_ms, prompt_tokens, completion_tokens)
+        ledger.note_attempt(error, model)   # after applying a fix
+        ledger.resolve(errors, complete)    # after every test run
+        ledger.failed_attempts(error)       # → escalation level for the router
+        ledger.summary()                    # → run result
+    """
+
+    models: dict[str, ModelStats] = field(default_factory=dict)
+    _failures: Counter = field(default_factory=Counter, init=False, repr=False)
+    _pending: list[tuple[str, str]] = field(default_factory=list, init=False, repr=False)  # (error key, model)
+
+    def record_call(
+        self,
+        model: str,
+        latency_ms: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached: bool = False,
+        failed: bool = False,
+    ) -> None:
+        stats = self.models.setdefault(model, ModelStats())
+        stats.calls += 1
+        stats.cache_hits += cached
+        stats.errors += failed
+        stats.latency_ms += latency_ms
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        price_in, price_out = api_settings.llm_model_prices.get(model, (0.0, 0.0))
+        stats.cost_usd += (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+    def note_attempt(self, error: dict[str, Any], model: str) -> None:
+        """A fix for `error` was applied with `model`; judged by the next `resolve`."""
+        self.models.setdefault(model, ModelStats()).fix_attempts += 1
+        self._pending.append((error_key(error), model))
+
+    def resolve(self, errors: list[dict[str, Any]], complete: bool = True) -> None:
+        """Mark pending attempts verified if their error is gone from this test run.
+
+        A run that stopped early (fail-fast, `complete=False`) may not have
+        reached an attempt's test: attempts whose error did not show up stay
+        pending until a run that does.
+        """
+        remaining = {error_key(e) for e in errors}
+        unresolved = []
+        for key, model in self._pending:
+            if key in remaining:
+                self._failures[key] += 1
+            elif complete:
+                self.models[model].fixes_verified += 1
+            else:
+                unresolved.append((key, model))
+        self._pending = unresolved
+
+    def failed_attempts(self, error: dict[str, Any]) -> int:
+        return self._failures[error_key(error)]
+
+    def summary(self) -> dict[str, Any]:
+        models = {
+            model: {
+                "calls": s.calls,
+                "cache_hits": s.cache_hits,
+                "errors": s.errors,
+                "avg_latency_ms": round(s.latency_ms / s.calls) if s.calls else 0,
+                "prompt_tokens": s.prompt_tokens,
+                "completion_tokens": s.completion_tokens,
+                "cost_usd": round(s.cost_usd, 6),
+                "fix_attempts": s.fix_attempts,
+                "fixes_verified": s.fixes_verified,
+                "success_rate": round(s.fixes_verified / s.fix_attempts, 3) if s.fix_attempts else None,
+            }
+            for model, s in self.models.items()
+        }
+        return {
+            "models": models,
+            "total_calls": sum(s.calls for s in self.models.values()),
+            "total_cost_usd": round(sum(s.cost_usd for s in self.models.values()), 6),
+        }
+
+
+# Global singleton — import this everywhere
+model_router = ModelRouter()
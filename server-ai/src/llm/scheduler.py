@@ -0,0 +1,438 @@
+"""LLM scheduler — rate-limit aware admission, fair queueing, retries and hedging.
+
+Every Groq request passes through `llm_scheduler`:
+
+  * Admission: each API key has a requests- and tokens-per-minute budget
+    (`RateBudget`), refilled continuously and resynced from the
+    `x-ratelimit-*` headers of every response. A call is sent only when
+    some key can afford it, so concurrent runs queue here instead of
+    collecting 429s from Groq.
+  * Fairness: waiting calls are grouped by owner (the agent run's session)
+    and served round-robin, so one run with many calls cannot starve the
+    others. At most `llm_max_concurrency` calls are in flight.
+  * Retries: 429s, 5xx responses and connection errors are retried with
+    jittered exponential backoff, on whichever key has budget left. A 429
+    also blocks its key until the `retry-after` Groq sends.
+  * Key pool: `groq_api_key` plus `groq_api_keys`; a key Groq rejects as
+    unauthorised is dropped from the pool.
+  * Hedging (`llm_hedge_enabled`): a non-streamed call still running after
+    the model's p95 latency gets a duplicate request; the first answer wins
+    and the other is cancelled.
+
+Set `llm_base_url` to point at `benchmarks.fake_llm_server` for local tests.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import statistics
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Mapping
+
+from groq import APIConnectionError, APITimeoutError, AsyncGroq, AuthenticationError, InternalServerError, RateLimitError
+
+from src.app.config import api_settings
+from src.core.exceptions import LLMError, LLMRateLimitError, LLMTimeoutError
+from src.llm.metrics import llm_metrics
+
+logger = logging.getLogger("rift_server")
+
+# (result, response headers, tokens actually used or None)
+CallFn = Callable[[AsyncGroq], Awaitable[tuple[Any, Mapping[str, str], int | None]]]
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Seconds from a rate-limit header: `"12"`, `"7.66s"`, `"2m59.56s"`, `"250ms"`."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION.findall(value)
+        return sum(float(n) * _UNITS[unit] for n, unit in parts) if parts else None
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """One rate-limit dimension (requests or tokens), refilled continuously."""
+
+    def __init__(self, capacity: float, window_s: float = 60.0):
+        self.capacity = capacity
+        self.level = capacity
+        self.rate = capacity / window_s  # units per second
+
+    def refill(self, elapsed: float) -> None:
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait(self, amount: float) -> float:
+        """Seconds until `amount` is available (oversized amounts wait for a full bucket)."""
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def sync(self, limit: float | None, remaining: float | None, reset_s: float | None) -> None:
+        """Adopt the provider's view; the bucket refills to `limit` by `reset_s`."""
+        if not limit or limit <= 0 or remaining is None:
+            return
+        self.capacity = limit
+        self.level = min(self.level, remaining)
+        if reset_s and limit > remaining:
+            self.rate = (limit - remaining) / reset_s
+
+
+class RateBudget:
+    """
+    Requests- and tokens-per-minute budget for one API key.
+
+    Starts from `llm_requests_per_minute` / `llm_tokens_per_minute` and
+    follows the `x-ratelimit-*` headers once responses arrive.
+
+    Usage:
+        if budget.wait(tokens) == 0:
+            budget.take(tokens)
+            ...                                    # send the request
+            budget.settle(tokens, usage.total_tokens)
+            budget.sync(response.headers)
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = _Bucket(float(requests_per_minute))
+        self.tokens = _Bucket(float(tokens_per_minute))
+        self.blocked_until = 0.0  # monotonic time; set by a 429's retry-after
+        self._updated = time.monotonic()
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        elapsed, self._updated = now - self._updated, now
+        self.requests.refill(elapsed)
+        self.tokens.refill(elapsed)
+        return now
+
+    def wait(self, tokens: int) -> float:
+        """Seconds before a request of `tokens` fits the budget (0 = send now)."""
+        now = self._refill()
+        return max(self.blocked_until - now, self.requests.wait(1), self.tokens.wait(tokens), 0.0)
+
+    def take(self, tokens: int) -> None:
+        self._refill()
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Return the unused part of a reservation once actual usage is known."""
+        self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+
+    def sync(self, headers: Mapping[str, str], throttled: bool = False) -> None:
+        """Update from response headers; `throttled` for a 429 (blocks the key until reset)."""
+        self._refill()
+        self.requests.sync(
+            _header_float(headers, "x-ratelimit-limit-requests"),
+            _header_float(headers, "x-ratelimit-remaining-requests"),
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.tokens.sync(
+            _header_float(headers, "x-ratelimit-limit-tokens"),
+            _header_float(headers, "x-ratelimit-remaining-tokens"),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+        if throttled:
+            retry_after = parse_duration(headers.get("retry-after")) or api_settings.llm_retry_base_delay_seconds
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {
+            "requests_left": round(self.requests.level, 1),
+            "requests_limit": self.requests.capacity,
+            "tokens_left": round(self.tokens.level),
+            "tokens_limit": self.tokens.capacity,
+            "blocked_s": round(max(self.blocked_until - time.monotonic(), 0.0), 1),
+        }
+
+
+@dataclass(eq=False)
+class ApiKey:
+    label: str  # safe to log: index and last 4 characters
+    client: AsyncGroq
+    budget: RateBudget
+    disabled: bool = False
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tokens: int
+    future: asyncio.Future = field(repr=False)
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    cap = min(api_settings.llm_retry_max_delay_seconds, api_settings.llm_retry_base_delay_seconds * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+class LLMScheduler:
+    """
+    Admits, queues, retries and hedges LLM requests for this process.
+
+    Usage:
+        result = await llm_scheduler.run(owner=session_id, model=model, tokens=est, call=fn, timeout=90)
+        result = await llm_scheduler.run_hedged(...)   # same, with a duplicate request past p95
+    """
+
+    def __init__(self):
+        self._keys: list[ApiKey] = []
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()  # owner → waiting calls, round-robin order
+        self._timer: asyncio.TimerHandle | None = None
+        self._latencies: dict[str, deque[float]] = {}  # model → recent non-streamed latencies (ms)
+        self.in_flight = 0
+
+    @staticmethod
+    def _secrets() -> list[str]:
+        return list(dict.fromkeys(k for k in [api_settings.groq_api_key, *api_settings.groq_api_keys] if k))
+
+    @property
+    def configured(self) -> bool:
+        """Whether any API key is set."""
+        return bool(self._keys or self._secrets())
+
+    @property
+    def keys(self) -> list[ApiKey]:
+        """The key pool, created on first use."""
+        if not self._keys:
+            secrets = self._secrets()
+            if not secrets:
+                raise LLMError("SERVER_GROQ_API_KEY is not set — cannot call LLM")
+            self._keys = [
+                ApiKey(
+                    label=f"key{i + 1}…{secret[-4:]}",
+                    # Retries are ours (across keys, with budgets) — not the SDK's
+                    client=AsyncGroq(
+                        api_key=secret,
+                        base_url=api_settings.llm_base_url or None,
+                        timeout=api_settings.llm_timeout_seconds,
+                        max_retries=0,
+                    ),
+                    budget=RateBudget(api_settings.llm_requests_per_minute, api_settings.llm_tokens_per_minute),
+                )
+                for i, secret in enumerate(secrets)
+            ]
+        return self._keys
+
+    # ── Admission ─────────────────────────────────────────
+
+    def _pick_key(self, tokens: int) -> tuple[ApiKey, float]:
+        """The key that can send soonest (most tokens left on ties)."""
+        active = [k for k in self.keys if not k.disabled]
+        if not active:
+            raise LLMError("Every Groq API key was rejected — cannot call LLM")
+        return min(((k, k.budget.wait(tokens)) for k in active), key=lambda kw: (kw[1], -kw[0].budget.tokens.level))
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting calls, one owner at a time."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queues and self.in_flight < api_settings.llm_max_concurrency:
+            owner, waiters = next(iter(self._queues.items()))
+            waiter = waiters[0]
+            if waiter.future.done():  # cancelled while queued
+                waiters.popleft()
+                if not waiters:
+                    del self._queues[owner]
+                continue
+            try:
+                key, wait = self._pick_key(waiter.tokens)
+            except LLMError as e:
+                waiters.popleft()
+                waiter.future.set_exception(e)
+                continue
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            key.budget.take(waiter.tokens)
+            self.in_flight += 1
+            waiter.future.set_result(key)
+
+    async def _acquire(self, owner: str, tokens: int) -> ApiKey:
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(owner, deque()).append(waiter)
+        self._dispatch()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(waiter.future.result(), tokens, None)  # granted just as we were cancelled
+            else:
+                queue = self._queues.get(owner)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[owner]
+            raise
+
+    def _release(self, key: ApiKey, reserved: int, used: int | None) -> None:
+        self.in_flight -= 1
+        if used is not None:
+            key.budget.settle(reserved, used)
+        self._dispatch()
+
+    # ── Execution ─────────────────────────────────────────
+
+    async def run(
+        self,
+        owner: str,
+        model: str,
+        tokens: int,
+        call: CallFn,
+        timeout: float,
+        stream: bool = False,
+        sent: asyncio.Event | None = None,
+    ) -> Any:
+        """Run `call` with an admitted client, retrying transient failures.
+
+        `tokens` is reserved from the key's budget up front and settled
+        against real usage afterwards. `timeout` bounds each attempt, not
+        the time spent queued or backing off. `sent` is set once a request
+        has been admitted and sent.
+
+        Raises LLMTimeoutError on a timeout, LLMRateLimitError when every
+        attempt was rate limited, LLMError for other exhausted retries.
+        Non-transient errors (bad request, ...) propagate unchanged.
+        """
+        attempts = api_settings.llm_max_retries + 1
+        last_error: Exception | None = None
+        for attempt in range(attempts):
+            t_queued = time.monotonic()
+            llm_metrics.enter_queue()
+            try:
+                key = await self._acquire(owner or "-", tokens)
+            except BaseException:
+                llm_metrics.abandon_queue()
+                raise
+            wait_ms = (time.monotonic() - t_queued) * 1000
+            llm_metrics.leave_queue(wait_ms)
+            if wait_ms >= 100:
+                logger.info(f"[LLM-REQ] waited {wait_ms:.0f}ms for admission ({key.label})")
+            if sent is not None:
+                sent.set()
+
+            t0 = time.monotonic()
+            ok = timed_out = False
+            used = None
+            try:
+                async with asyncio.timeout(timeout):
+                    result, headers, used = await call(key.client)
+                key.budget.sync(headers)
+                ok = True
+                if not stream:
+                    self._latencies.setdefault(model, deque(maxlen=200)).append((time.monotonic() - t0) * 1000)
+                return result
+            except (TimeoutError, APITimeoutError):
+                timed_out = True
+                logger.error(f"[LLM-ERR] LLM call timed out after {timeout:g}s")
+                raise LLMTimeoutError(f"LLM call timed out after {timeout:g}s")
+            except RateLimitError as e:
+                key.budget.sync(e.response.headers, throttled=True)
+                llm_metrics.rate_limited += 1
+                last_error = e
+            except AuthenticationError as e:
+                key.disabled = True
+                logger.error(f"[LLM-ERR] {key.label} rejected ({e}) — removed from the key pool")
+                last_error = e
+            except (InternalServerError, APIConnectionError) as e:
+                last_error = e
+            finally:
+                self._release(key, tokens, used)
+                llm_metrics.finish((time.monotonic() - t0) * 1000, ok=ok, timed_out=timed_out)
+
+            if attempt + 1 < attempts:
+                delay = _backoff(attempt)
+                logger.warning(
+                    f"[LLM-RETRY] attempt {attempt + 1}/{attempts} on {key.label} failed "
+                    f"({type(last_error).__name__}: {last_error}) — retrying in {delay:.1f}s"
+                )
+                llm_metrics.retries += 1
+                await asyncio.sleep(delay)
+
+        if isinstance(last_error, RateLimitError):
+            raise LLMRateLimitError(f"LLM rate limited after {attempts} attempts: {last_error}")
+        raise LLMError(f"LLM call failed after {attempts} attempts: {last_error}")
+
+    def hedge_delay(self, model: str) -> float | None:
+        """Seconds after which a call to `model` is hedged, or None (disabled / too few samples)."""
+        samples = self._latencies.get(model)
+        if not api_settings.llm_hedge_enabled or not samples or len(samples) < api_settings.llm_hedge_min_samples:
+            return None
+        p95 = statistics.quantiles(samples, n=20, method="inclusive")[-1]
+        return max(p95, api_settings.llm_hedge_min_delay_ms) / 1000
+
+    async def run_hedged(self, owner: str, model: str, tokens: int, call: CallFn, timeout: float) -> Any:
+        """`run`, plus a duplicate request if the first is slower than the model's p95.
+
+        Only for non-streamed calls — the result must not have been
+        partially consumed when the loser is cancelled.
+        """
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return await self.run(owner, model, tokens, call, timeout)
+
+        sent = asyncio.Event()
+        primary = asyncio.create_task(self.run(owner, model, tokens, call, timeout, sent=sent))
+        # The clock starts when the request goes out, not while it waits for admission
+        sending = asyncio.create_task(sent.wait())
+        await asyncio.wait({primary, sending}, return_when=asyncio.FIRST_COMPLETED)
+        sending.cancel()
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        logger.info(f"[LLM-REQ] no answer after {delay * 1000:.0f}ms (p95) — hedging with a second request")
+        llm_metrics.hedges += 1
+        hedge = asyncio.create_task(self.run(owner, model, tokens, call, timeout))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            llm_metrics.hedge_wins += 1
+                        return task.result()
+            return primary.result()  # both failed — report the original error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        """Key budgets and queue depth per owner, for /health/llm."""
+        return {
+            "in_flight": self.in_flight,
+            "queued": {owner: len(waiters) for owner, waiters in self._queues.items()},
+            "keys": {
+                k.label: {**k.budget.snapshot(), "disabled": k.disabled} for k in self._keys
+            },
+            "hedge_delay_ms": {
+                model: round(delay * 1000) for model in self._latencies if (delay := self.hedge_delay(model))
+            },
+        }
+
+
+# Global singleton — import this everywhere
+llm_scheduler = LLMScheduler()
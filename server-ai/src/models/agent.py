@@ -26,10 +26,16 @@ class FixApplied(BaseModel):
     """One row in the Fixes Applied table."""
 
     file: str = Field(..., description="File path that was fixed")
+    files: list[str] = Field(default_factory=list, description="Every file the fix wrote (edit-mode fixes may touch several)")
     bug_type: str = Field(..., description="LINTING | SYNTAX | LOGIC | TYPE_ERROR | IMPORT | INDENTATION")
     line_number: int | None = Field(default=None, description="Line number of the error")
     commit_message: str = Field(default="", description="Commit message for this fix")
     status: str = Field(default="fixed", description="fixed | failed")
+    errors_covered: int = Field(default=1, description="Errors with the same fix target fixed by this one change")
+    screened: list[dict] = Field(
+        default_factory=list,
+        description="Model answers rejected before the workspace was touched: {reason, detail, model, mode}",
+    )
 
 
 class CITimelineEntry(BaseModel):
@@ -74,6 +80,7 @@ class AgentRunResponse(BaseModel):
     status: str = Field(..., description="passed | failed | partial_fix")
     passed: bool
     iterations: int
+    llm_calls: int = Field(default=0, description="LLM calls made during the run (fixes and explanations)")
     message: str = ""
 
     # Dashboard sections
@@ -87,5 +94,8 @@ class AgentRunResponse(BaseModel):
     branch_name: str | None = None
     errors_remaining: list[dict] = []
 
+    # Per-model LLM calls, latency, tokens, cost and fix success rate
+    model_usage: dict = Field(default_factory=dict, description="ModelLedger summary for this run")
+
     # Full debug trace: every API call with request + response payloads
     debug_trace: list[dict] = Field(default_factory=list, description="Ordered list of API call events")
@@ -5,7 +5,7 @@ import time
 from datetime import datetime, timezone
 
 from src.state.graph_state import GraphState
-from src.services.ec2_client import EC2Client
+from src.services.ec2_client import EC2Client, fail_fast_limit
 
 logger = logging.getLogger("rift_server")
 
@@ -19,11 +19,13 @@ async def execute_tests(state: GraphState) -> GraphState:
     logger.info(f"[GRAPH] session_id={state['session_id']}  branch={state.get('branch','main')}")
     logger.info(f"{'*'*60}")
 
+    max_failures = fail_fast_limit(iteration, state.get("max_iterations", 5))
     request_payload = {
         "session_id": state["session_id"],
         "branch": state.get("branch", "main"),
         "install_command": state.get("install_command"),
         "test_command": state.get("test_command"),
+        "max_failures": max_failures,
     }
 
     t0 = time.monotonic()
@@ -33,6 +35,7 @@ async def execute_tests(state: GraphState) -> GraphState:
         install_command=state.get("install_command"),
         test_command=state.get("test_command"),
         branch=state.get("branch", "main"),
+        max_failures=max_failures,
     )
     elapsed_ms = (time.monotonic() - t0) * 1000
 
@@ -48,7 +51,11 @@ async def execute_tests(state: GraphState) -> GraphState:
     state["errors"] = errors
     state["passed"] = passed
     state["iteration"] = iteration
-    state["raw_output"] = result.get("raw_output", "")
+    # The fix prompt needs the whole traceback, not just the head/tail excerpt
+    state["raw_output"] = result.get("raw_output", "") if passed else await client.test_output(state["session_id"], result)
+    if state.get("model_ledger") is not None:
+        # Did the previous fixes hold? (a fail-fast run that stopped early cannot tell for all of them)
+        state["model_ledger"].resolve(errors, complete=(result.get("fail_fast") or {}).get("complete", True))
 
     # Track total unique failures detected (on first run)
     if iteration == 1:
@@ -82,8 +89,9 @@ async def execute_tests(state: GraphState) -> GraphState:
             "passed": result.get("passed", 0),
             "failed": result.get("failed", 0),
             "errors": errors,
-            "raw_output": result.get("raw_output", ""),
+            "output": result.get("output"),  # full text stays on the agent: GET /outputs/{id}
             "duration": result.get("duration"),
+            "fail_fast": result.get("fail_fast"),
         },
         "summary": f"{'PASSED' if passed else 'FAILED'} — {len(errors)} error(s)",
     })
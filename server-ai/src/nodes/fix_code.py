@@ -4,9 +4,12 @@ import logging
 import time
 from datetime import datetime, timezone
 
+from src.app.config import api_settings
 from src.state.graph_state import GraphState
-from src.llm.llm_client import ask_llm, clean_code_fences
 from src.services.ec2_client import EC2Client
+from src.services.fix_batch import FixBatch, proposal_paths
+from src.services.fix_generator import FixGenerator
+from src.services.speculation import SpeculativeFix
 
 logger = logging.getLogger("rift_server")
 
@@ -17,147 +20,88 @@ async def fix_code(state: GraphState) -> GraphState:
     if state["passed"]:
         return state
 
-    error = state["current_error"]
-    file_path = error.get("file", "unknown")
+    groups = state.get("current_groups") or [state["current_group"]]
+    if len(groups) > 1:
+        return await _fix_in_parallel(state, groups)
+
+    group = state["current_group"]
+    error = group.error
     bug_type = error.get("error_type", "LOGIC")
     line_number = error.get("line")
-    error_message = error.get("message", "")
     iteration = state.get("iteration", 0)
 
     logger.info(f"\n{'~'*60}")
     logger.info(f"[GRAPH] fix_code  iteration={iteration}")
-    logger.info(f"[GRAPH] target: {file_path}  bug_type={bug_type}  line={line_number}")
-    logger.info(f"[GRAPH] error message: {error_message}")
+    logger.info(f"[GRAPH] target: {group.target_path}  errors={len(group.errors)}  bug_type={bug_type}  line={line_number}")
+    for e in group.errors:
+        logger.info(f"[GRAPH] error: {e.get('file')}:{e.get('line')} {e.get('message', '')[:160]}")
     logger.info(f"{'~'*60}")
 
     client = EC2Client()
 
-    # ── Read current file content from the repo (gives LLM full context) ──
-    current_file_content = await client.read_file(state["session_id"], file_path)
-    raw_output = state.get("raw_output", "")
-    language = state.get("language", "")
-
-    # Determine file extension hint
-    ext = file_path.rsplit(".", 1)[-1] if "." in file_path else ""
-    is_test_file = any(x in file_path.lower() for x in ("test", "spec", "__test__"))
-
-    file_block = f"```{ext}\n{current_file_content}\n```" if current_file_content else "(file content unavailable)"
-
-    # For test files, try to find and read the implementation file
-    impl_file_content = ""
-    impl_file_path = ""
-    if is_test_file:
-        # Common patterns: src/tests/foo.test.ts -> src/foo.ts or src/index.ts
-        # Extract possible impl paths from the test file imports
-        possible_impl_paths = []
-        if "../index" in current_file_content:
-            possible_impl_paths.append("src/index.ts")
-            possible_impl_paths.append("src/index.js")
-        
-        # Try to extract import paths from the file
-        try:
-            if 'from "' in current_file_content:
-                # Extract imports like: import { app } from "../index"
-                for line in current_file_content.split("\n"):
-                    if 'from "' in line and "../" in line:
-                        import_part = line.split('from "')[1].split('"')[0]
-                        if import_part.startswith("../"):
-                            rel_path = import_part.replace("../", "src/")
-                            possible_impl_paths.append(rel_path + ".ts")
-                            possible_impl_paths.append(rel_path + ".js")
-        except (IndexError, ValueError):
-            pass  # Skip if parsing fails
-        
-        # Also try removing test/spec from path
-        impl_guess = file_path.replace("/tests/", "/").replace(".test.", ".").replace(".spec.", ".")
-        if impl_guess != file_path:
-            possible_impl_paths.append(impl_guess)
-        
-        # Try to read each possible implementation file
-        for impl_path in possible_impl_paths:
-            content = await client.read_file(state["session_id"], impl_path)
-            if content:
-                impl_file_content = content
-                impl_file_path = impl_path
-                logger.info(f"[GRAPH] Found implementation file: {impl_path}")
-                break
-
-    impl_block = ""
-    if impl_file_content and impl_file_path:
-        impl_ext = impl_file_path.rsplit(".", 1)[-1] if "." in impl_file_path else ""
-        impl_block = f"\n\n=== IMPLEMENTATION FILE ({impl_file_path}) ===\n```{impl_ext}\n{impl_file_content}\n```"
-
-    test_output_block = f"```\n{raw_output[:3000]}{'...<truncated>' if len(raw_output) > 3000 else ''}\n```" if raw_output else "(no test output available)"
-
-    test_file_hint = (
-        "\nNOTE: The file reported in the error is a TEST file. "
-        "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
-        "You must fix the IMPLEMENTATION file and return its full corrected contents.\n"
-        "Output EXACTLY one line first: TARGET_FILE: <path/to/impl/file>\n"
-        "then output the complete corrected implementation file contents on the next lines.\n"
-        "Do NOT modify the test file. Do NOT wrap code in markdown fences."
-        if is_test_file else ""
+    # ── LLM call + apply via EC2 agent (edit blocks, whole-file fallback) ──
+    # File contents and the implementation behind a failing test were read by select_error
+    generator = FixGenerator.for_group(
+        client,
+        state["session_id"],
+        group,
+        state.get("language", ""),
+        state.get("raw_output", ""),
+        install_command=state.get("install_command"),
+        test_command=state.get("test_command"),
+        ledger=state.get("model_ledger"),
     )
+    speculation = SpeculativeFix(generator, api_settings.speculative_candidates)
+    proposal = await generator.recall()
+    speculative = api_settings.speculative_candidates > 1 and proposal is None
+    if speculative:
+        proposals = await speculation.propose()
+        proposal = proposals[0]
+        llm_ms = max(p.llm_ms for p in proposals)  # candidates are generated concurrently
+    else:
+        proposal = proposal or await generator.propose()
+        llm_ms = proposal.llm_ms
+    actual_file_path = proposal.file_path
 
-    prompt = f"""CI pipeline failed. Fix the issue with a MINIMAL change.
-
-=== ERROR INFO ===
-File: {file_path}
-Language: {language}
-Error Type: {bug_type}
-Line: {line_number or 'unknown'}
-Message: {error_message}
-Full Trace: {error.get('full_trace') or 'None'}
-{test_file_hint}
-=== TEST FILE CONTENTS ({file_path}) ===
-{file_block}{impl_block}
-
-=== FULL TEST OUTPUT ===
-{test_output_block}
-
-Return ONLY the complete corrected file contents with no explanation, no markdown fences, no commentary."""
-
-    # ── LLM call ──
-    t_llm = time.monotonic()
-    raw_fixed = ask_llm(prompt)
-    llm_ms = (time.monotonic() - t_llm) * 1000
-
-    # Check if LLM redirected to a different file (for test-file errors)
-    fixed_code = raw_fixed
-    actual_file_path = file_path
-    if is_test_file and "TARGET_FILE:" in raw_fixed[:100]:
-        lines = raw_fixed.split("\n", 1)
-        first_line = lines[0].strip()
-        if first_line.startswith("TARGET_FILE:"):
-            suggested_path = first_line.replace("TARGET_FILE:", "").strip()
-            if suggested_path:
-                actual_file_path = suggested_path
-                fixed_code = lines[1] if len(lines) > 1 else ""
-                # Strip markdown fences that LLM often adds after TARGET_FILE:
-                fixed_code = clean_code_fences(fixed_code)
-                logger.info(f"[GRAPH] LLM redirected fix → {actual_file_path}")
-
-    logger.info(f"[GRAPH] LLM returned {len(fixed_code)} chars in {llm_ms:.0f}ms  (target: {actual_file_path})")
-
-    # ── Apply fix via EC2 agent ──
-    apply_request = {
-        "session_id": state["session_id"],
-        "file_path": actual_file_path,
-        "fix_content": f"<{len(fixed_code)} chars>",
-        "install_command": state.get("install_command"),
-        "test_command": state.get("test_command"),
-    }
+    logger.info(
+        f"[GRAPH] LLM returned {len(proposal.raw)} chars in {llm_ms:.0f}ms  "
+        f"(target: {actual_file_path}, format: {proposal.mode}, model: {proposal.model})"
+    )
 
     t_apply = time.monotonic()
-    result = await client.apply_fix(
-        session_id=state["session_id"],
-        file_path=actual_file_path,
-        fix_content=fixed_code,
-        install_command=state.get("install_command"),
-        test_command=state.get("test_command"),
-    )
+    if speculative:
+        applied, result = await speculation.apply(proposals)
+    else:
+        applied, result = await generator.apply(proposal)
     apply_ms = (time.monotonic() - t_apply) * 1000
+    if speculative:
+        proposal = applied
+    elif applied is not proposal:
+        # Rejected edits were retried as a whole-file fix — count that LLM call as LLM time
+        apply_ms -= applied.llm_ms
+        llm_ms += applied.llm_ms
+        proposal = applied
+    actual_file_path = proposal.file_path
+    if state.get("file_cache") is not None:
+        state["file_cache"].invalidate(proposal_paths(proposal))
     fix_success = result.get("success", False)
+    if state.get("model_ledger") is not None:
+        for e in group.errors:
+            state["model_ledger"].note_attempt(e, proposal.model)
+
+    if proposal.mode == "search_replace":
+        apply_request = {
+            "session_id": state["session_id"],
+            "edits": [f"{e.path}: -{len(e.search)}/+{len(e.replace)} chars" for e in proposal.edits],
+        }
+    else:
+        apply_request = {
+            "session_id": state["session_id"],
+            "file_path": actual_file_path,
+            "fix_content": f"<{len(proposal.content)} chars>",
+        }
+    apply_request["install_command"] = state.get("install_command")
+    apply_request["test_command"] = state.get("test_command")
 
     logger.info(f"[GRAPH] apply_fix: success={fix_success}  file_updated={result.get('file_updated')}  ({apply_ms:.0f}ms)")
     logger.info(f"[GRAPH] apply_fix message: {result.get('message','')}")
@@ -171,17 +115,21 @@ Return ONLY the complete corrected file contents with no explanation, no markdow
     fixes: list = state.get("fixes_applied", [])
     fixes.append({
         "file": actual_file_path,
+        "files": sorted(proposal_paths(proposal)),
         "bug_type": bug_type,
         "line_number": line_number,
         "commit_message": commit_msg,
         "status": "fixed" if fix_success else "failed",
+        "errors_covered": len(group.errors),
+        "screened": proposal.screened,
     })
     state["fixes_applied"] = fixes
 
     # Track unique fixed files
     fixed_files: list[str] = state.get("fixed_files", [])
-    if actual_file_path not in fixed_files:
-        fixed_files.append(actual_file_path)
+    for path in fixes[-1]["files"]:
+        if path not in fixed_files:
+            fixed_files.append(path)
     state["fixed_files"] = fixed_files
 
     # Append to debug trace
@@ -193,21 +141,159 @@ Return ONLY the complete corrected file contents with no explanation, no markdow
         "timestamp": ts,
         "duration_ms": round(llm_ms + apply_ms),
         "llm": {
-            "model": "llama-3.3-70b-versatile",
-            "prompt_chars": len(prompt),
-            "output_chars": len(fixed_code),
+            "model": proposal.model,
+            "edit_format": proposal.mode,
+            "errors_covered": len(group.errors),
+            "fallback_reason": proposal.fallback_reason or None,
+            "finish_reason": proposal.finish_reason or None,
+            "screened": proposal.screened,
+            "prompt_chars": len(proposal.prompt),
+            "prompt_tokens_est": proposal.prompt_report["tokens"],
+            "prompt_sections": proposal.prompt_report["sections"],
+            "output_chars": len(proposal.raw),
             "duration_ms": round(llm_ms),
-            "prompt_preview": prompt[:400],
-            "output_preview": fixed_code[:400],
+            "prompt_preview": proposal.prompt[:400],
+            "output_preview": proposal.raw[:400],
         },
+        "speculation": speculation.report or None,
         "request": apply_request,
         "response": {
             "success": fix_success,
             "file_updated": result.get("file_updated"),
             "message": result.get("message"),
+            "diff": result.get("diff"),
+            "test_result": result.get("test_result", {}),
+        },
+        "summary": f"{'OK' if fix_success else 'FAILED'} — fixed {actual_file_path} ({bug_type}, {len(group.errors)} error(s))",
+    })
+    state["debug_trace"] = trace
+
+    return state
+
+
+async def _fix_in_parallel(state: GraphState, groups: list) -> GraphState:
+    """Fix independent targets concurrently; one ec2-agent /fix/batch call and one test run."""
+    iteration = state.get("iteration", 0)
+    ledger = state.get("model_ledger")
+
+    logger.info(f"\n{'~'*60}")
+    logger.info(f"[GRAPH] fix_code  iteration={iteration}  parallel targets={len(groups)}")
+    for group in groups:
+        logger.info(f"[GRAPH] target: {group.target_path}  errors={len(group.errors)}")
+    logger.info(f"{'~'*60}")
+
+    client = EC2Client()
+    generators = [
+        FixGenerator.for_group(
+            client,
+            state["session_id"],
+            group,
+            state.get("language", ""),
+            state.get("raw_output", ""),
+            install_command=state.get("install_command"),
+            test_command=state.get("test_command"),
+            ledger=ledger,
+        )
+        for group in groups
+    ]
+
+    t0 = time.monotonic()
+    outcomes, result = await FixBatch(
+        client,
+        state["session_id"],
+        generators,
+        install_command=state.get("install_command"),
+        test_command=state.get("test_command"),
+    ).run()
+    duration_ms = (time.monotonic() - t0) * 1000
+    if state.get("file_cache") is not None:
+        state["file_cache"].invalidate(set().union(*(proposal_paths(o.proposal) for o in outcomes if o.applied)))
+
+    fixes: list = state.get("fixes_applied", [])
+    fixed_files: list[str] = state.get("fixed_files", [])
+    for group, outcome in zip(groups, outcomes):
+        error = group.error
+        bug_type = error.get("error_type", "LOGIC")
+        line_number = error.get("line")
+        if outcome.status == "deferred":
+            logger.info(f"[GRAPH] deferred {group.target_path}: {outcome.reason}")
+            continue
+        if not outcome.applied:
+            fixes.append({
+                "file": error.get("file", "unknown"),
+                "bug_type": bug_type,
+                "line_number": line_number,
+                "commit_message": "",
+                "status": "failed",
+                "errors_covered": len(group.errors),
+                "screened": outcome.screened,
+            })
+            continue
+
+        file_path = outcome.proposal.file_path
+        if ledger is not None:
+            for e in group.errors:
+                ledger.note_attempt(e, outcome.proposal.model)
+        commit_msg = f"[AI-AGENT] Fix {bug_type} in {file_path}"
+        if line_number:
+            commit_msg += f" at line {line_number}"
+        fixes.append({
+            "file": file_path,
+            "files": sorted(proposal_paths(outcome.proposal)),
+            "bug_type": bug_type,
+            "line_number": line_number,
+            "commit_message": commit_msg,
+            "status": outcome.status,
+            "errors_covered": len(group.errors),
+        })
+        for path in fixes[-1]["files"]:
+            if path not in fixed_files:
+                fixed_files.append(path)
+    state["fixes_applied"] = fixes
+    state["fixed_files"] = fixed_files
+
+    logger.info(f"[GRAPH] apply_batch: success={result.get('success')}  ({duration_ms:.0f}ms)")
+    logger.info(f"[GRAPH] apply_batch message: {result.get('message', '')}")
+
+    trace: list = state.get("debug_trace", [])
+    trace.append({
+        "stage": "fix_code",
+        "iteration": iteration,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms),
+        "batch": [
+            {
+                "target": group.target_path,
+                "status": outcome.status,
+                "reason": outcome.reason or None,
+                "errors_covered": len(group.errors),
+                "model": outcome.proposal.model if outcome.proposal else None,
+                "edit_format": outcome.proposal.mode if outcome.proposal else None,
+                "file": outcome.proposal.file_path if outcome.proposal else None,
+                "llm_ms": round(outcome.proposal.llm_ms) if outcome.proposal else None,
+                "prompt_tokens_est": outcome.proposal.prompt_report["tokens"] if outcome.proposal else None,
+                "output_chars": len(outcome.proposal.raw) if outcome.proposal else None,
+                "screened": outcome.proposal.screened if outcome.proposal else outcome.screened,
+            }
+            for group, outcome in zip(groups, outcomes)
+        ],
+        "request": {
+            "session_id": state["session_id"],
+            "fixes": len([o for o in outcomes if o.applied]),
+            "install_command": state.get("install_command"),
+            "test_command": state.get("test_command"),
+        },
+        "response": {
+            "success": result.get("success"),
+            "file_updated": result.get("file_updated"),
+            "message": result.get("message"),
+            "diff": result.get("diff"),
             "test_result": result.get("test_result", {}),
         },
-        "summary": f"{'OK' if fix_success else 'FAILED'} — fixed {actual_file_path} ({bug_type})",
+        "summary": (
+            f"{'OK' if result.get('success') else 'FAILED'} — "
+            f"{len([o for o in outcomes if o.status == 'fixed'])}/{len(groups)} parallel fix(es) cleared their errors"
+        ),
     })
     state["debug_trace"] = trace
 
@@ -1,13 +1,26 @@
-"""select_error node — picks the first unresolved error to fix next."""
+"""select_error node — picks the errors to fix next, grouped by fix target."""
 
+from src.app.config import api_settings
 from src.state.graph_state import GraphState
+from src.services.ec2_client import EC2Client
+from src.services.error_groups import group_errors
+from src.services.file_cache import FileCache
 
 
 async def select_error(state: GraphState) -> GraphState:
-    """Set current_error to the first error in the list."""
+    """Group errors by the file the fix must change; select up to `max_parallel_fixes` groups.
+
+    Every error in a group is fixed by one LLM call; the selected groups
+    target different files and are fixed concurrently with one test run.
+    current_group is the first group, current_error its first error.
+    """
 
     if state["passed"] or not state["errors"]:
         return state
 
-    state["current_error"] = state["errors"][0]
+    files = state.get("file_cache") or FileCache(EC2Client(), state["session_id"])
+    groups = await group_errors(files, state["errors"])
+    state["current_groups"] = groups[:max(1, api_settings.max_parallel_fixes)]
+    state["current_group"] = groups[0]
+    state["current_error"] = groups[0].error
     return state
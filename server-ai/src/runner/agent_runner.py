@@ -10,7 +10,9 @@ from typing import Any
 
 from src.app.config import api_settings
 from src.graph.healing_graph import build_graph
+from src.llm.router import ModelLedger
 from src.services.ec2_client import EC2Client
+from src.services.file_cache import FileCache
 
 logger = logging.getLogger("rift_server")
 
@@ -110,6 +112,8 @@ async def run_agent(
         "errors": [],
         "passed": False,
         "current_error": None,
+        "current_group": None,
+        "current_groups": [],
         "iteration": 0,
         "max_iterations": max_iterations or api_settings.max_iterations,
         "fixes_applied": [],
@@ -118,6 +122,8 @@ async def run_agent(
         "fixed_files": [],
         "commit_hash": None,
         "raw_output": "",
+        "model_ledger": ModelLedger(),
+        "file_cache": FileCache(client, session_id),
         "debug_trace": [],   # graph nodes will append to this
     }
 
@@ -147,6 +153,7 @@ async def run_agent(
                     file_path=file_path,
                     commit_message=commit_msg,
                     branch_name=branch_name,
+                    file_paths=fix.get("files"),
                 )
                 commit_ms = (time.monotonic() - t_commit) * 1000
                 logger.info(f"[RUNNER] commit: success={commit_result.get('success')}  hash={commit_result.get('commit_hash')}  ({commit_ms:.0f}ms)")
@@ -157,7 +164,10 @@ async def run_agent(
                     "stage": "commit_fix",
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "duration_ms": round(commit_ms),
-                    "request": {"session_id": session_id, "file_path": file_path, "commit_message": commit_msg, "branch_name": branch_name},
+                    "request": {
+                        "session_id": session_id, "file_path": file_path, "file_paths": fix.get("files"),
+                        "commit_message": commit_msg, "branch_name": branch_name,
+                    },
                     "response": commit_result,
                     "summary": f"commit {commit_result.get('commit_hash','?')[:8]} — {file_path}",
                 })
@@ -203,6 +213,7 @@ async def run_agent(
         "status": "passed" if passed else ("partial_fix" if total_fixes > 0 else "failed"),
         "passed": passed,
         "iterations": final_state["iteration"],
+        "llm_calls": final_state["model_ledger"].summary()["total_calls"],
         "message": "All tests passing." if passed else f"{len(errors_remaining)} error(s) remain.",
         "run_summary": run_summary,
         "score_breakdown": score,
@@ -211,6 +222,7 @@ async def run_agent(
         "commit_hash": commit_hash,
         "branch_name": branch_name if commit_hash else None,
         "errors_remaining": errors_remaining,
+        "model_usage": final_state["model_ledger"].summary(),
         "debug_trace": full_debug_trace,
     }
 
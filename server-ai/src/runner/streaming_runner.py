@@ -1,5 +1,7 @@
 """streaming_runner — runs the healing pipeline with real-time WebSocket log streaming."""
 
+import asyncio
+import json
 import logging
 import re
 import time
@@ -7,9 +9,16 @@ from datetime import datetime, timezone
 from typing import Any, Awaitable, Callable
 
 from src.app.config import api_settings
+from src.core.exceptions import DegenerateFixError
 from src.endpoints.pr import CreatePRRequest, create_pull_request
-from src.llm.llm_client import ask_llm, clean_code_fences
-from src.services.ec2_client import EC2Client
+from src.llm.llm_client import ask_llm
+from src.llm.router import ModelLedger, model_router
+from src.services.ec2_client import EC2Client, fail_fast_limit
+from src.services.error_groups import ErrorGroup, group_errors
+from src.services.file_cache import FileCache
+from src.services.fix_batch import FixBatch, FixOutcome, proposal_paths
+from src.services.fix_generator import MEMORY_MODEL, FixGenerator, FixProposal
+from src.services.speculation import SpeculativeFix
 
 logger = logging.getLogger("rift_server")
 
@@ -30,6 +39,28 @@ async def _noop(_event: dict[str, Any]) -> None:
     pass
 
 
+class _DeltaForwarder:
+    """Batches streamed LLM text into `llm_delta` events, at most one per interval."""
+
+    def __init__(self, emit: LogFn, phase: str):
+        self._emit = emit
+        self._phase = phase
+        self._buffer = ""
+        self._last = 0.0
+        self._interval = api_settings.llm_stream_interval_ms / 1000
+
+    async def __call__(self, text: str) -> None:
+        self._buffer += text
+        if time.monotonic() - self._last >= self._interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._buffer:
+            text, self._buffer = self._buffer, ""
+            self._last = time.monotonic()
+            await self._emit({"type": "llm_delta", "phase": self._phase, "text": text, "ts": _ts()})
+
+
 async def run_streaming(
     *,
     repo_url: str,
@@ -49,6 +80,43 @@ async def run_streaming(
     ``log`` is an async callback that receives event dicts to forward to the
     WebSocket client.  If *None*, logging is silently skipped.
     """
+    # Fix id → background explanation; the commit stage awaits the ones it commits
+    explanation_tasks: dict[int, asyncio.Task] = {}
+    try:
+        return await _run_pipeline(
+            repo_url=repo_url,
+            language=language,
+            install_command=install_command,
+            test_command=test_command,
+            branch=branch,
+            branch_name=branch_name,
+            max_iterations=max_iterations,
+            session_id=session_id,
+            github_token=github_token,
+            log=log,
+            explanation_tasks=explanation_tasks,
+        )
+    finally:
+        # A run that failed or lost its client leaves no LLM calls behind
+        for task in explanation_tasks.values():
+            task.cancel()
+
+
+async def _run_pipeline(
+    *,
+    repo_url: str,
+    language: str,
+    install_command: str | None,
+    test_command: str | None,
+    branch: str,
+    branch_name: str | None,
+    max_iterations: int | None,
+    session_id: str | None,
+    github_token: str | None,
+    log: LogFn | None,
+    explanation_tasks: dict[int, asyncio.Task],
+) -> dict[str, Any]:
+    """Body of `run_streaming`; background explanations go into `explanation_tasks`."""
     emit = log or _noop
     start = time.time()
     client = EC2Client()
@@ -61,6 +129,8 @@ async def run_streaming(
     fixes_applied: list[dict[str, Any]] = []
     ci_timeline: list[dict[str, Any]] = []
     fixed_files: list[str] = []
+    # Per-model latency/tokens/cost and fix outcomes; drives escalation
+    ledger = ModelLedger()
 
     # ── 1. Clone (skip if session_id already provided) ────────────────────
     if session_id:
@@ -94,12 +164,55 @@ async def run_streaming(
                 time_taken=time.time() - start, repo_url=repo_url,
             )
 
+    async def _record_fix(group: ErrorGroup, proposal: FixProposal, fix_ok: bool, diff: str) -> None:
+        """Add an applied fix to the table, report it and start its explanation."""
+        current_error = group.error
+        fix_entry: dict[str, Any] = {
+            "id": len(fixes_applied),
+            "file": proposal.file_path,
+            "files": sorted(proposal_paths(proposal)),
+            "model": proposal.model,
+            "bug_type": current_error.get("error_type", "LOGIC"),
+            "line_number": current_error.get("line"),
+            "commit_message": "",
+            "status": "fixed" if fix_ok else "failed",
+            "error_message": current_error.get("message", ""),
+            "errors_covered": len(group.errors),
+            "screened": proposal.screened,
+            "description": "",
+            "explanation": {"root_cause": "", "changes_made": "", "impact": ""},
+        }
+        _describe_fix(fix_entry)
+        fixes_applied.append(fix_entry)
+        await emit({"type": "fix", "fix": fix_entry})
+
+        # ── Structured explanation — generated while the next test run goes ──
+        if fix_ok:
+            # Edit-based fixes come back with a diff, which says more than the new file
+            if diff:
+                change_text = f"Diff of the fix (first 3000 chars):\n{diff[:3000]}"
+            else:
+                change_text = (
+                    f"Original code (first 1500 chars):\n{group.file_content[:1500]}\n\n"
+                    f"Fixed code (first 1500 chars):\n{proposal.content[:1500]}"
+                )
+            explanation_tasks[fix_entry["id"]] = asyncio.create_task(
+                _explain_in_background(fix_entry, change_text, emit, ledger, session_id)
+            )
+            await emit({"type": "log", "line": f"  Generating fix explanation for {proposal.file_path} in the background…", "ts": _ts()})
+
+        for path in fix_entry["files"]:
+            if path not in fixed_files:
+                fixed_files.append(path)
+
     # ── 2. Healing loop ──────────────────────────────────────────────────
     iteration = 0
     passed = False
     errors: list[dict] = []
     raw_output = ""
     total_failures = 0
+    # Session files read while gathering context; a fix invalidates the files it wrote
+    files = FileCache(client, session_id)
 
     while iteration < max_iters:
         iteration += 1
@@ -118,6 +231,9 @@ async def run_streaming(
             await emit({"type": "log", "line": f"  $ {install_command}", "ts": _ts()})
         if test_command:
             await emit({"type": "log", "line": f"  $ {test_command}", "ts": _ts()})
+        max_failures = fail_fast_limit(iteration, max_iters)
+        if max_failures:
+            await emit({"type": "log", "line": f"  Fail-fast: stopping at the first {max_failures} failure(s)", "ts": _ts()})
 
         # Real-time streaming callback — forwards each Docker output line to WebSocket
         async def _on_stream_line(phase: str, line: str) -> None:
@@ -131,6 +247,7 @@ async def run_streaming(
                 test_command=test_command,
                 branch=branch,
                 on_line=_on_stream_line,
+                max_failures=max_failures,
             )
         except Exception as e:
             await emit({"type": "log", "line": f"  ERROR: {e}", "ts": _ts()})
@@ -140,7 +257,9 @@ async def run_streaming(
 
         errors = result.get("errors", [])
         passed = result.get("status") == "success"
-        raw_output = result.get("raw_output", "")
+        # The fix prompt needs the whole traceback, not just the head/tail excerpt
+        raw_output = result.get("raw_output", "") if passed else await client.test_output(session_id, result)
+        ledger.resolve(errors, complete=(result.get("fail_fast") or {}).get("complete", True))
 
         # ── Detect "no tests collected" early and abort with a clear error ──
         # Covers pytest ("collected 0 items", "no tests ran") and
@@ -207,7 +326,12 @@ async def run_streaming(
             await emit({"type": "step", "step": step_name, "status": "done"})
             break
 
-        await emit({"type": "log", "line": f"  ✗ {len(errors)} error(s) found", "ts": _ts()})
+        partial = (result.get("fail_fast") or {}).get("complete") is False
+        await emit({
+            "type": "log",
+            "line": f"  ✗ {len(errors)} error(s) found" + (" (fail-fast: the run stopped early)" if partial else ""),
+            "ts": _ts(),
+        })
         await emit({"type": "step", "step": step_name, "status": "done"})
 
         if not errors:
@@ -218,223 +342,137 @@ async def run_streaming(
         await emit({"type": "log", "line": "", "ts": _ts()})
         await emit({"type": "log", "line": "▶ Analyzing failures…", "ts": _ts()})
 
-        current_error = errors[0]
-        file_path = current_error.get("file", "unknown")
-        bug_type = current_error.get("error_type", "LOGIC")
-        line_number = current_error.get("line")
-        error_message = current_error.get("message", "")
+        async def _analysis_log(line: str) -> None:
+            await emit({"type": "log", "line": f"  {line}", "ts": _ts()})
 
-        loc = f" at line {line_number}" if line_number else ""
-        await emit({"type": "log", "line": f"  Error: {bug_type} in {file_path}{loc}", "ts": _ts()})
-        if error_message:
-            await emit({"type": "log", "line": f"  {error_message.split(chr(10))[0][:200]}", "ts": _ts()})
+        # Errors that share a fix target are fixed together by one LLM call;
+        # independent targets are fixed concurrently and verified by one test run
+        groups = await group_errors(files, errors, on_log=_analysis_log)
+        batch = groups[:max(1, api_settings.max_parallel_fixes)]
+
+        if len(batch) > 1:
+            await emit({
+                "type": "log",
+                "line": f"  {len(errors)} error(s) across {len(groups)} fix target(s) — fixing {', '.join(g.target_path for g in batch)} in parallel",
+                "ts": _ts(),
+            })
+        elif len(groups) > 1 or len(batch[0].errors) > 1:
+            await emit({
+                "type": "log",
+                "line": f"  {len(errors)} error(s) across {len(groups)} fix target(s) — fixing {batch[0].target_path} ({len(batch[0].errors)} error(s)) in one call",
+                "ts": _ts(),
+            })
+        for group in batch:
+            for e in group.errors:
+                loc = f" at line {e['line']}" if e.get("line") else ""
+                await emit({"type": "log", "line": f"  Error: {e.get('error_type', 'LOGIC')} in {e.get('file', 'unknown')}{loc}", "ts": _ts()})
+                if e.get("message"):
+                    await emit({"type": "log", "line": f"  {e['message'].split(chr(10))[0][:200]}", "ts": _ts()})
 
         await emit({"type": "step", "step": "analyzing", "status": "done"})
 
         # ── Fix ───────────────────────────────────────────────────────────
         await emit({"type": "step", "step": "fixing", "status": "running"})
         await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({"type": "log", "line": "▶ Generating AI fix…", "ts": _ts()})
-
-        current_content = await client.read_file(session_id, file_path)
-        await emit({"type": "log", "line": f"  Reading {file_path} ({len(current_content)} chars)", "ts": _ts()})
-
-        is_test = any(x in file_path.lower() for x in ("test", "spec", "__test__"))
-        ext = file_path.rsplit(".", 1)[-1] if "." in file_path else ""
-        file_block = f"```{ext}\n{current_content}\n```" if current_content else "(unavailable)"
-
-        # Attempt to locate the implementation file when the error is in a test
-        impl_content = ""
-        impl_path = ""
-        if is_test:
-            await emit({"type": "log", "line": "  Test file detected — locating implementation…", "ts": _ts()})
-            possible: list[str] = []
-            if current_content:
-                if "../index" in current_content:
-                    possible.extend(["src/index.ts", "src/index.js"])
-                try:
-                    for cline in current_content.split("\n"):
-                        if 'from "' in cline and "../" in cline:
-                            imp = cline.split('from "')[1].split('"')[0]
-                            if imp.startswith("../"):
-                                rel = imp.replace("../", "src/")
-                                possible.extend([rel + ".ts", rel + ".js"])
-                except (IndexError, ValueError):
-                    pass
-            guess = (
-                file_path
-                .replace("/tests/", "/")
-                .replace(".test.", ".")
-                .replace(".spec.", ".")
-            )
-            if guess != file_path:
-                possible.append(guess)
-            for p in possible:
-                content = await client.read_file(session_id, p)
-                if content:
-                    impl_content, impl_path = content, p
-                    await emit({"type": "log", "line": f"  Found implementation: {p}", "ts": _ts()})
-                    break
-
-        impl_block = ""
-        if impl_content and impl_path:
-            iext = impl_path.rsplit(".", 1)[-1] if "." in impl_path else ""
-            impl_block = (
-                f"\n\n=== IMPLEMENTATION FILE ({impl_path}) ===\n"
-                f"```{iext}\n{impl_content}\n```"
-            )
-
-        output_block = (
-            f"```\n{raw_output[:3000]}{'…<truncated>' if len(raw_output) > 3000 else ''}\n```"
-            if raw_output
-            else "(no output)"
-        )
+        await emit({
+            "type": "log",
+            "line": "▶ Generating AI fix…" if len(batch) == 1 else f"▶ Generating {len(batch)} AI fixes in parallel…",
+            "ts": _ts(),
+        })
 
-        test_hint = (
-            "\nNOTE: The file reported in the error is a TEST file. "
-            "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
-            "You must fix the IMPLEMENTATION file and return its full corrected contents.\n"
-            "Output EXACTLY one line first: TARGET_FILE: <path/to/impl/file>\n"
-            "then output the complete corrected implementation file contents.\n"
-            "Do NOT modify the test file. Do NOT wrap code in markdown fences."
-            if is_test
-            else ""
-        )
+        for group in batch:
+            await emit({"type": "log", "line": f"  Reading {group.file_path} ({len(group.file_content)} chars)", "ts": _ts()})
 
-        prompt = (
-            "CI pipeline failed. Fix the issue with a MINIMAL change.\n\n"
-            f"=== ERROR INFO ===\nFile: {file_path}\nLanguage: {language}\n"
-            f"Error Type: {bug_type}\nLine: {line_number or 'unknown'}\n"
-            f"Message: {error_message}\n"
-            f"Full Trace: {current_error.get('full_trace') or 'None'}\n"
-            f"{test_hint}\n"
-            f"=== TEST FILE CONTENTS ({file_path}) ===\n{file_block}{impl_block}\n\n"
-            f"=== FULL TEST OUTPUT ===\n{output_block}\n\n"
-            "Return ONLY the complete corrected file contents with no explanation, "
-            "no markdown fences, no commentary."
+        if len(batch) > 1:
+            outcomes = await _fix_in_parallel(
+                client, session_id, batch, language, raw_output, install_command, test_command, emit, ledger,
+            )
+            for group, outcome in zip(batch, outcomes):
+                target = group.target_path
+                if outcome.status == "deferred":
+                    await emit({"type": "log", "line": f"  ↷ [{target}] deferred to the next iteration — {outcome.reason}", "ts": _ts()})
+                    continue
+                if not outcome.applied:
+                    await emit({"type": "log", "line": f"  ✗ [{target}] {outcome.reason}", "ts": _ts()})
+                    fixes_applied.append(_failed_fix(len(fixes_applied), group, outcome.reason, outcome.screened))
+                    continue
+                for e in group.errors:
+                    ledger.note_attempt(e, outcome.proposal.model)
+                await _record_fix(group, outcome.proposal, outcome.status == "fixed", outcome.diff)
+                status_word = "✓ Fix applied" if outcome.status == "fixed" else "✗ Fix failed"
+                await emit({"type": "log", "line": f"  {status_word} — {outcome.proposal.file_path}", "ts": _ts()})
+            if outcomes:
+                files.invalidate(set().union(*(proposal_paths(o.proposal) for o in outcomes if o.applied)))
+            else:
+                files.invalidate()  # the batch failed part-way; anything may have been written
+
+            applied = any(o.applied for o in outcomes)
+            await emit({"type": "step", "step": "fixing", "status": "done" if applied else "error"})
+            if not applied:
+                break
+            continue
+
+        group = batch[0]
+        deltas = _DeltaForwarder(emit, phase="fix")
+        speculative = api_settings.speculative_candidates > 1
+
+        async def _fix_log(line: str) -> None:
+            await deltas.flush()  # keep streamed text ahead of the log line that follows it
+            await emit({"type": "log", "line": f"  {line}", "ts": _ts()})
+
+        generator = FixGenerator.for_group(
+            client,
+            session_id,
+            group,
+            language,
+            raw_output,
+            install_command=install_command,
+            test_command=test_command,
+            on_log=_fix_log,
+            on_delta=None if speculative else deltas,  # concurrent candidates would interleave
+            ledger=ledger,
         )
-
-        await emit({"type": "log", "line": "  Calling AI model…", "ts": _ts()})
-        t_llm = time.monotonic()
+        speculation = SpeculativeFix(generator, api_settings.speculative_candidates, on_log=_fix_log)
 
         try:
-            raw_fixed = ask_llm(prompt)
+            proposal = await generator.recall()
+            speculative = speculative and proposal is None  # a remembered patch is tried on its own
+            if proposal is None:
+                await emit({"type": "log", "line": "  Calling AI model…", "ts": _ts()})
+                if speculative:
+                    proposals = await speculation.propose()
+                    proposal = proposals[0]
+                else:
+                    proposal = await generator.propose()
+            await deltas.flush()
         except Exception as e:
+            await deltas.flush()
             await emit({"type": "log", "line": f"  ERROR: LLM failed — {e}", "ts": _ts()})
-            fixes_applied.append({
-                "file": file_path, "bug_type": bug_type,
-                "line_number": line_number, "commit_message": "",
-                "status": "failed",
-                "error_message": error_message,
-                "description": f"AI could not generate a fix: {e}",
-            })
+            fixes_applied.append(_failed_fix(
+                len(fixes_applied), group, f"AI could not generate a fix: {e}",
+                e.screened if isinstance(e, DegenerateFixError) else None,
+            ))
             await emit({"type": "step", "step": "fixing", "status": "error"})
             break
 
-        llm_ms = (time.monotonic() - t_llm) * 1000
-        await emit({
-            "type": "log",
-            "line": f"  AI response received ({len(raw_fixed)} chars, {llm_ms:.0f}ms)",
-            "ts": _ts(),
-        })
-
-        # Handle TARGET_FILE redirect for test-file errors
-        fixed_code = raw_fixed
-        actual_file = file_path
-        if is_test and "TARGET_FILE:" in raw_fixed[:100]:
-            lines = raw_fixed.split("\n", 1)
-            first = lines[0].strip()
-            if first.startswith("TARGET_FILE:"):
-                suggested = first.replace("TARGET_FILE:", "").strip()
-                if suggested:
-                    actual_file = suggested
-                    fixed_code = lines[1] if len(lines) > 1 else ""
-                    fixed_code = clean_code_fences(fixed_code)
-                    await emit({"type": "log", "line": f"  Redirected fix → {actual_file}", "ts": _ts()})
-
-        await emit({"type": "log", "line": f"  Applying fix to {actual_file}…", "ts": _ts()})
-
+        fix_result: dict = {}
         try:
-            fix_result = await client.apply_fix(
-                session_id=session_id,
-                file_path=actual_file,
-                fix_content=fixed_code,
-                install_command=install_command,
-                test_command=test_command,
-            )
+            if speculative:
+                proposal, fix_result = await speculation.apply(proposals)
+            else:
+                proposal, fix_result = await generator.apply(proposal)
             fix_ok = fix_result.get("success", False)
+            files.invalidate(proposal_paths(proposal))
         except Exception as e:
             fix_ok = False
+            files.invalidate()
             await emit({"type": "log", "line": f"  ERROR: apply failed — {e}", "ts": _ts()})
+        for e in group.errors:
+            ledger.note_attempt(e, proposal.model)
 
-        # ── Generate structured explanation ──────────────────────────────
-        explanation = {
-            "root_cause": "",
-            "changes_made": "",
-            "impact": "",
-        }
-
-        if fix_ok:
-            await emit({"type": "log", "line": "  Generating fix explanation…", "ts": _ts()})
-            try:
-                explain_prompt = (
-                    "You are an expert code reviewer. A CI test failure was fixed by AI. "
-                    "Provide a clear, concise explanation in EXACTLY this JSON format (no markdown, no extra text):\n\n"
-                    '{"root_cause": "<1-2 sentences: what was wrong in the original code>", '
-                    '"changes_made": "<1-2 sentences: what specific changes were made to fix it>", '
-                    '"impact": "<1 sentence: what tests now pass because of this fix>"}\n\n'
-                    f"Error type: {bug_type}\n"
-                    f"Error message: {error_message[:300]}\n"
-                    f"File fixed: {actual_file}\n"
-                    f"Line: {line_number or 'unknown'}\n\n"
-                    f"Original code (first 1500 chars):\n{current_content[:1500]}\n\n"
-                    f"Fixed code (first 1500 chars):\n{fixed_code[:1500]}"
-                )
-                raw_explain = ask_llm(explain_prompt)
-                # Try to parse JSON from the response
-                import json as _json
-                # Strip any markdown fences
-                cleaned = raw_explain.strip()
-                if cleaned.startswith("```"):
-                    cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-                parsed = _json.loads(cleaned)
-                explanation["root_cause"] = parsed.get("root_cause", "")[:300]
-                explanation["changes_made"] = parsed.get("changes_made", "")[:300]
-                explanation["impact"] = parsed.get("impact", "")[:200]
-                await emit({"type": "log", "line": "  ✓ Explanation generated", "ts": _ts()})
-            except Exception as e:
-                logger.warning(f"[Runner] Explanation generation failed: {e}")
-                # Fall back to generic description
-                explanation["root_cause"] = error_message[:200] if error_message else "Unknown error"
-                explanation["changes_made"] = f"AI applied a code fix to {actual_file}"
-                explanation["impact"] = "Test failures resolved"
-
-        # Build commit message from explanation
-        commit_msg = f"fix({actual_file}): {explanation['root_cause'][:80]}" if explanation["root_cause"] else f"[AI-AGENT] Fix {bug_type} in {actual_file}"
-        if line_number and not explanation["root_cause"]:
-            commit_msg += f" at line {line_number}"
-
-        # Build human-readable description
-        desc = explanation["root_cause"] or (
-            f"{bug_type} error in {actual_file}: {error_message[:120]}. AI applied a fix."
-        )
-
-        fix_entry: dict[str, Any] = {
-            "file": actual_file,
-            "bug_type": bug_type,
-            "line_number": line_number,
-            "commit_message": commit_msg,
-            "status": "fixed" if fix_ok else "failed",
-            "error_message": error_message,
-            "description": desc,
-            "explanation": explanation,
-        }
-        fixes_applied.append(fix_entry)
-
-        if actual_file not in fixed_files:
-            fixed_files.append(actual_file)
-
-        await emit({"type": "fix", "fix": fix_entry})
+        await _record_fix(group, proposal, fix_ok, fix_result.get("diff", ""))
+        if speculation.report:
+            fixes_applied[-1]["speculation"] = speculation.report
 
         status_word = "✓ Fix applied" if fix_ok else "✗ Fix failed"
         await emit({"type": "log", "line": f"  {status_word}", "ts": _ts()})
@@ -456,6 +494,11 @@ async def run_streaming(
         for fix in fixes_applied:
             if fix.get("status") != "fixed":
                 continue
+            task = explanation_tasks.pop(fix["id"], None)
+            if task is not None:
+                if not task.done():
+                    await emit({"type": "log", "line": f"  Waiting for the explanation of {fix['file']}…", "ts": _ts()})
+                await task
             fp = fix["file"]
             cm = fix.get("commit_message", f"[AI-AGENT] Fix {fp}")
             await emit({"type": "log", "line": f"  $ git commit -m \"{cm}\"", "ts": _ts()})
@@ -466,6 +509,7 @@ async def run_streaming(
                     commit_message=cm,
                     branch_name=branch_name,
                     github_token=github_token,
+                    file_paths=fix.get("files"),
                 )
                 if commit_result.get("success"):
                     commit_hash = commit_result.get("commit_hash")
@@ -550,6 +594,9 @@ async def run_streaming(
             await emit({"type": "step", "step": "pr_creation", "status": "error"})
 
     # ── 4. Summary ────────────────────────────────────────────────────────
+    if explanation_tasks:
+        # Fixes that were not committed still get their explanation in the result
+        await asyncio.gather(*explanation_tasks.values())
     time_taken = time.time() - start
     total_fixed = len([f for f in fixes_applied if f["status"] == "fixed"])
 
@@ -562,6 +609,39 @@ async def run_streaming(
         ),
         "ts": _ts(),
     })
+    usage = ledger.summary()
+    await emit({
+        "type": "log",
+        "line": (
+            f"  {iteration} iteration(s), {usage['total_calls']} LLM call(s) — "
+            f"{sum(f.get('errors_covered', 1) for f in fixes_applied)} error(s) addressed in {len(fixes_applied)} fix(es)"
+        ),
+        "ts": _ts(),
+    })
+    raced = [f["speculation"] for f in fixes_applied if (f.get("speculation") or {}).get("winner") is not None]
+    if raced:
+        await emit({
+            "type": "log",
+            "line": (
+                f"  Speculation: {len(raced)} fix(es) green in {sum(r['time_to_green_seconds'] for r in raced):.1f}s "
+                f"vs ≥{sum(r['sequential_seconds'] for r in raced):.1f}s testing candidates one at a time"
+            ),
+            "ts": _ts(),
+        })
+    recalled = sum(f.get("model") == MEMORY_MODEL for f in fixes_applied)
+    if recalled:
+        await emit({
+            "type": "log",
+            "line": f"  Fix memory: {recalled} fix(es) reused — {recalled} LLM call(s) avoided",
+            "ts": _ts(),
+        })
+    if usage["total_calls"]:
+        per_model = ", ".join(f"{m} ×{s['calls']}" for m, s in usage["models"].items())
+        await emit({
+            "type": "log",
+            "line": f"  Models: {per_model} — ${usage['total_cost_usd']:.4f}",
+            "ts": _ts(),
+        })
 
     return _build_result(
         session_id=session_id,
@@ -576,9 +656,148 @@ async def run_streaming(
         repo_url=repo_url,
         total_failures=total_failures,
         total_fixed=total_fixed,
+        model_usage=usage,
+        llm_calls=usage["total_calls"],
     )
 
 
+async def _fix_in_parallel(
+    client: EC2Client,
+    session_id: str,
+    groups: list[ErrorGroup],
+    language: str,
+    raw_output: str,
+    install_command: str | None,
+    test_command: str | None,
+    emit: LogFn,
+    ledger: ModelLedger,
+) -> list[FixOutcome]:
+    """Fix independent targets concurrently with one test run; [] if the batch failed outright."""
+
+    def _group_log(target: str):
+        async def _log(line: str) -> None:
+            await emit({"type": "log", "line": f"  [{target}] {line}", "ts": _ts()})
+        return _log
+
+    generators = [
+        FixGenerator.for_group(
+            client,
+            session_id,
+            group,
+            language,
+            raw_output,
+            install_command=install_command,
+            test_command=test_command,
+            on_log=_group_log(group.target_path),
+            ledger=ledger,
+        )
+        for group in groups
+    ]
+
+    async def _batch_log(line: str) -> None:
+        await emit({"type": "log", "line": f"  {line}", "ts": _ts()})
+
+    await emit({"type": "log", "line": f"  Calling AI model for {len(groups)} targets…", "ts": _ts()})
+    try:
+        outcomes, _result = await FixBatch(
+            client, session_id, generators, install_command, test_command, on_log=_batch_log
+        ).run()
+    except Exception as e:
+        await emit({"type": "log", "line": f"  ERROR: apply failed — {e}", "ts": _ts()})
+        return []
+
+    return outcomes
+
+
+def _failed_fix(fix_id: int, group: ErrorGroup, description: str, screened: list[dict] | None = None) -> dict[str, Any]:
+    """Fix table row for a fix that could not be generated or applied."""
+    current_error = group.error
+    return {
+        "id": fix_id,
+        "file": current_error.get("file", "unknown"), "bug_type": current_error.get("error_type", "LOGIC"),
+        "line_number": current_error.get("line"), "commit_message": "",
+        "status": "failed",
+        "error_message": current_error.get("message", ""),
+        "screened": screened or [],
+        "description": description,
+    }
+
+
+def _describe_fix(fix: dict[str, Any]) -> None:
+    """Derive commit message and description from the fix's explanation (generic until it arrives)."""
+    explanation = fix["explanation"]
+    file_path, bug_type, line_number = fix["file"], fix["bug_type"], fix["line_number"]
+
+    # Build commit message from explanation
+    commit_msg = f"fix({file_path}): {explanation['root_cause'][:80]}" if explanation["root_cause"] else f"[AI-AGENT] Fix {bug_type} in {file_path}"
+    if line_number and not explanation["root_cause"]:
+        commit_msg += f" at line {line_number}"
+    fix["commit_message"] = commit_msg
+
+    # Build human-readable description
+    fix["description"] = explanation["root_cause"] or (
+        f"{bug_type} error in {file_path}: {fix['error_message'][:120]}. AI applied a fix."
+    )
+
+
+async def _explain_fix(
+    fix: dict[str, Any], change_text: str, ledger: ModelLedger, session_id: str
+) -> dict[str, str]:
+    """Ask the LLM for root cause / changes / impact; generic text if that fails."""
+    error_message = fix["error_message"]
+    try:
+        explain_prompt = (
+            "You are an expert code reviewer. A CI test failure was fixed by AI. "
+            "Provide a clear, concise explanation in EXACTLY this JSON format (no markdown, no extra text):\n\n"
+            '{"root_cause": "<1-2 sentences: what was wrong in the original code>", '
+            '"changes_made": "<1-2 sentences: what specific changes were made to fix it>", '
+            '"impact": "<1 sentence: what tests now pass because of this fix>"}\n\n'
+            f"Error type: {fix['bug_type']}\n"
+            f"Error message: {error_message[:300]}\n"
+            f"File fixed: {fix['file']}\n"
+            f"Line: {fix['line_number'] or 'unknown'}\n\n"
+            f"{change_text}"
+        )
+        raw_explain = await ask_llm(
+            explain_prompt, model=model_router.fast_model, ledger=ledger, owner=session_id
+        )
+        # Strip any markdown fences, then parse the JSON
+        cleaned = raw_explain.strip()
+        if cleaned.startswith("```"):
+            cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+        parsed = json.loads(cleaned)
+        return {
+            "root_cause": parsed.get("root_cause", "")[:300],
+            "changes_made": parsed.get("changes_made", "")[:300],
+            "impact": parsed.get("impact", "")[:200],
+        }
+    except Exception as e:
+        logger.warning(f"[Runner] Explanation generation failed: {e}")
+        # Fall back to generic description
+        return {
+            "root_cause": error_message[:200] if error_message else "Unknown error",
+            "changes_made": f"AI applied a code fix to {fix['file']}",
+            "impact": "Test failures resolved",
+        }
+
+
+async def _explain_in_background(
+    fix: dict[str, Any], change_text: str, emit: LogFn, ledger: ModelLedger, session_id: str
+) -> dict[str, str]:
+    """Fill in a fix's explanation and report it as a `fix_explanation` event.
+
+    Never raises (short of cancellation): the commit stage awaits this task.
+    """
+    fix["explanation"] = await _explain_fix(fix, change_text, ledger, session_id)
+    _describe_fix(fix)
+    try:
+        await emit({"type": "fix_explanation", "fix": fix})
+        await emit({"type": "log", "line": f"  ✓ Explanation generated for {fix['file']}", "ts": _ts()})
+    except Exception as e:
+        logger.warning(f"[Runner] Could not report the explanation of {fix['file']}: {e}")
+    return fix["explanation"]
+
+
 def _build_result(
     *,
     session_id: str,
@@ -593,12 +812,15 @@ def _build_result(
     repo_url: str,
     total_failures: int = 0,
     total_fixed: int = 0,
+    model_usage: dict[str, Any] | None = None,
+    llm_calls: int = 0,
 ) -> dict[str, Any]:
     return {
         "session_id": session_id,
         "status": "passed" if passed else ("partial_fix" if total_fixed > 0 else "failed"),
         "passed": passed,
         "iterations": iteration,
+        "llm_calls": llm_calls,
         "fixes_applied": fixes_applied,
         "ci_timeline": ci_timeline,
         "errors_remaining": errors_remaining,
@@ -608,4 +830,5 @@ def _build_result(
         "repo_url": repo_url,
         "total_failures": total_failures,
         "total_fixed": total_fixed,
+        "model_usage": model_usage or {},
     }
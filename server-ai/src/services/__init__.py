@@ -1,3 +1,4 @@
 from src.services.ec2_client import EC2Client
+from src.services.fix_generator import FixGenerator, FixProposal
 
-__all__ = ["EC2Client"]
+__all__ = ["EC2Client", "FixGenerator", "FixProposal"]
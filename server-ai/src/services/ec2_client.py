@@ -1,5 +1,7 @@
 """HTTP client for talking to the EC2 agent service."""
 
+import asyncio
+import importlib.util
 import json
 import logging
 import time
@@ -8,7 +10,7 @@ from typing import Awaitable, Callable
 import httpx
 
 from src.app.config import api_settings
-from src.core.exceptions import EC2AgentError, EC2AgentUnreachable
+from src.core.exceptions import EC2AgentError, EC2AgentUnreachable, PatchRejectedError
 
 logger = logging.getLogger("rift_server")
 
@@ -33,27 +35,118 @@ def _log_response(operation: str, status: int, body: dict | str, duration_ms: fl
     logger.info("-"*60)
 
 
+def _timeout(operation: str) -> httpx.Timeout:
+    """Timeout for one ec2-agent operation (`ec2_timeouts`), with the shared connect timeout."""
+    seconds = api_settings.ec2_timeouts.get(operation, api_settings.ec2_timeouts.get("default", 30.0))
+    return httpx.Timeout(seconds, connect=api_settings.ec2_connect_timeout_seconds)
+
+
+def fail_fast_limit(iteration: int, max_iterations: int) -> int | None:
+    """`max_failures` for an iteration's test run, or None for the whole suite.
+
+    Runs in between only need the next errors to fix. The first run
+    (every failure, for the report) and the last one (the confirmation)
+    cover the whole suite — and so does any run that passes.
+    """
+    if iteration <= 1 or iteration >= max_iterations:
+        return None
+    return api_settings.test_fail_fast_max_failures or None
+
+
+class EC2HttpPool:
+    """
+    Process-wide connection pool to ec2-agent.
+
+    Every `EC2Client` sends through the same `httpx.AsyncClient`, so
+    requests reuse kept-alive connections instead of paying TCP (and TLS)
+    setup per call. The FastAPI lifespan opens it and closes it on
+    shutdown; outside the app (scripts, benchmarks) it is created on
+    first use. A client is bound to the event loop it was created on, so
+    a new loop gets a new client.
+
+    Usage:
+        await ec2_http.open()      # lifespan startup
+        client = ec2_http.client()
+        await ec2_http.close()     # lifespan shutdown
+    """
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.http2 = False
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._discard()
+            self._client, self._loop = self._create(), loop
+        return self._client
+
+    async def open(self) -> None:
+        self.client()
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = self._loop = None
+
+    def _discard(self) -> None:
+        """Let go of a client bound to another event loop, closing it if that loop still runs.
+
+        A client whose loop has already ended (`asyncio.run` returned) can
+        no longer be closed from here; dropping it releases its connections
+        when it is collected.
+        """
+        old, loop = self._client, self._loop
+        self._client = self._loop = None
+        if old is None or old.is_closed:
+            return
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(old.aclose(), loop)
+        else:
+            logger.info("[EC2] Dropping the connection pool of a finished event loop")
+
+    def _create(self) -> httpx.AsyncClient:
+        headers = {}
+        if api_settings.ec2_agent_api_key:
+            headers["X-API-Key"] = api_settings.ec2_agent_api_key
+        self.http2 = api_settings.ec2_http2
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("[EC2] ec2_http2 is set but the h2 package is missing (pip install 'httpx[http2]') — using HTTP/1.1")
+            self.http2 = False
+        client = httpx.AsyncClient(
+            base_url=api_settings.ec2_agent_url.rstrip("/"),
+            headers=headers,
+            http2=self.http2,
+            timeout=_timeout("default"),
+            limits=httpx.Limits(
+                max_connections=api_settings.ec2_max_connections,
+                max_keepalive_connections=api_settings.ec2_max_keepalive_connections,
+                keepalive_expiry=api_settings.ec2_keepalive_expiry_seconds,
+            ),
+        )
+        logger.info(
+            f"[EC2] Connection pool to {client.base_url} (max {api_settings.ec2_max_connections}, "
+            f"keep-alive {api_settings.ec2_max_keepalive_connections}, {'HTTP/2' if self.http2 else 'HTTP/1.1'})"
+        )
+        return client
+
+
+# Global singleton — every EC2Client shares its connections
+ec2_http = EC2HttpPool()
+
+
 class EC2Client:
     """
     Async HTTP client wrapping all ec2-agent API calls.
 
+    Cheap to construct: requests go through the shared `ec2_http` pool.
     All methods raise EC2AgentError on non-2xx responses,
     or EC2AgentUnreachable if the agent cannot be reached.
     """
 
     def __init__(self):
         self.base_url = api_settings.ec2_agent_url.rstrip("/")
-        self.headers = {}
-        if api_settings.ec2_agent_api_key:
-            self.headers["X-API-Key"] = api_settings.ec2_agent_api_key
-
-    def _client(self) -> httpx.AsyncClient:
-        """Create an async HTTP client with shared config."""
-        return httpx.AsyncClient(
-            base_url=self.base_url,
-            headers=self.headers,
-            timeout=300.0,  # Long timeout — Docker test runs can take time
-        )
 
     async def ping(self) -> bool:
         """Check ec2-agent health. Raises EC2AgentUnreachable on failure."""
@@ -61,12 +154,12 @@ class EC2Client:
         _log_request("GET", url)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.get("/api/v1/health")
-                response.raise_for_status()
-                body = response.json()
-                _log_response("ping", response.status_code, body, (time.monotonic()-t0)*1000)
-                return True
+            client = ec2_http.client()
+            response = await client.get("/api/v1/health", timeout=_timeout("ping"))
+            response.raise_for_status()
+            body = response.json()
+            _log_response("ping", response.status_code, body, (time.monotonic()-t0)*1000)
+            return True
         except httpx.ConnectError as e:
             raise EC2AgentUnreachable(
                 f"Cannot reach EC2 agent at {self.base_url}: {e}"
@@ -86,12 +179,12 @@ class EC2Client:
         _log_request("POST", url, params=params)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/sessions", params=params)
-                self._raise_for_status(response, "create_session")
-                body = response.json()
-                _log_response("create_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.post("/api/v1/sessions", params=params, timeout=_timeout("create_session"))
+            self._raise_for_status(response, "create_session")
+            body = response.json()
+            _log_response("create_session", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -103,24 +196,27 @@ class EC2Client:
         install_command: str | None = None,
         test_command: str | None = None,
         branch: str = "main",
+        max_failures: int | None = None,
     ) -> dict:
-        """POST /api/v1/execute — run tests for a session."""
+        """POST /api/v1/execute — run tests for a session (fail-fast with `max_failures`)."""
         payload: dict = {"session_id": session_id, "branch": branch}
         if install_command:
             payload["install_command"] = install_command
         if test_command:
             payload["test_command"] = test_command
+        if max_failures:
+            payload["max_failures"] = max_failures
 
         url = f"{self.base_url}/api/v1/execute"
         _log_request("POST", url, payload=payload)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/execute", json=payload)
-                self._raise_for_status(response, "execute_tests")
-                body = response.json()
-                _log_response("execute_tests", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.post("/api/v1/execute", json=payload, timeout=_timeout("execute_tests"))
+            self._raise_for_status(response, "execute_tests")
+            body = response.json()
+            _log_response("execute_tests", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -133,11 +229,18 @@ class EC2Client:
         test_command: str | None = None,
         branch: str = "main",
         on_line: "Callable[[str, str], Awaitable[None]] | None" = None,
+        max_failures: int | None = None,
     ) -> dict:
         """POST /api/v1/execute/stream — run tests with real-time SSE streaming.
 
+        The EC2 agent persists every event of the run, so if the connection
+        drops mid-run we reconnect to GET /api/v1/execute/stream/{run_id}
+        with the last seen event id and carry on — the suite is only
+        re-executed (via blocking /execute) if the run cannot be resumed.
+
         Args:
             on_line: async callback(phase, line) called for each output line in real-time.
+            max_failures: Fail-fast — stop the run after this many failures.
 
         Returns:
             The final structured test result dict (same shape as execute_tests).
@@ -147,50 +250,110 @@ class EC2Client:
             payload["install_command"] = install_command
         if test_command:
             payload["test_command"] = test_command
+        if max_failures:
+            payload["max_failures"] = max_failures
 
         url = f"{self.base_url}/api/v1/execute/stream"
         _log_request("POST", url, payload=payload)
 
-        result: dict = {}
+        cursor: dict = {"run_id": None, "last_event_id": None, "result": {}, "done": False}
 
         try:
-            async with httpx.AsyncClient(
-                base_url=self.base_url,
-                headers=self.headers,
-                timeout=300.0,
-            ) as client:
-                async with client.stream("POST", "/api/v1/execute/stream", json=payload) as response:
-                    if not response.is_success:
-                        # Fall back to non-streaming
-                        logger.warning(f"[EC2] Streaming endpoint returned {response.status_code}, falling back")
-                        return await self.execute_tests(session_id, install_command, test_command, branch)
-
-                    async for raw_line in response.aiter_lines():
-                        if not raw_line.startswith("data: "):
-                            continue
-                        try:
-                            event = json.loads(raw_line[6:])
-                        except json.JSONDecodeError:
-                            continue
-
-                        event_type = event.get("type")
-
-                        if event_type == "log" and on_line:
-                            await on_line(event.get("phase", ""), event.get("line", ""))
-                        elif event_type == "result":
-                            result = event.get("data", {})
-                        elif event_type == "done":
-                            break
-
-        except (httpx.ConnectError, httpx.StreamError) as e:
-            logger.warning(f"[EC2] Streaming failed ({e}), falling back to blocking execute")
-            return await self.execute_tests(session_id, install_command, test_command, branch)
-
-        if not result:
+            client = ec2_http.client()
+            stream = client.stream("POST", "/api/v1/execute/stream", json=payload, timeout=_timeout("execute_stream"))
+            async with stream as response:
+                if not response.is_success:
+                    # Fall back to non-streaming
+                    logger.warning(f"[EC2] Streaming endpoint returned {response.status_code}, falling back")
+                    return await self.execute_tests(session_id, install_command, test_command, branch, max_failures)
+
+                await self._consume_sse(response, cursor, on_line)
+
+        except (httpx.TransportError, httpx.StreamError) as e:
+            if not cursor["run_id"]:
+                logger.warning(f"[EC2] Streaming failed before the run started ({e}), falling back to blocking execute")
+                return await self.execute_tests(session_id, install_command, test_command, branch, max_failures)
+            logger.warning(f"[EC2] Stream for run {cursor['run_id']} dropped ({e}), resuming")
+
+        if not cursor["done"] and cursor["run_id"]:
+            await self._resume_stream(session_id, cursor, on_line)
+
+        if not cursor["result"]:
             logger.warning("[EC2] No result from streaming, falling back")
-            return await self.execute_tests(session_id, install_command, test_command, branch)
+            return await self.execute_tests(session_id, install_command, test_command, branch, max_failures)
 
-        return result
+        return cursor["result"]
+
+    async def _resume_stream(
+        self,
+        session_id: str,
+        cursor: dict,
+        on_line: "Callable[[str, str], Awaitable[None]] | None",
+    ) -> None:
+        """Reconnect to an in-flight run and replay events after the cursor."""
+        run_id = cursor["run_id"]
+        path = f"/api/v1/execute/stream/{run_id}"
+
+        for attempt in range(1, api_settings.ec2_stream_resume_attempts + 1):
+            headers = {}
+            if cursor["last_event_id"]:
+                headers["Last-Event-ID"] = cursor["last_event_id"]
+            _log_request("GET", f"{self.base_url}{path}", params={
+                "session_id": session_id, "last_event_id": cursor["last_event_id"], "attempt": attempt,
+            })
+            try:
+                stream = ec2_http.client().stream(
+                    "GET", path, params={"session_id": session_id}, headers=headers, timeout=_timeout("execute_stream")
+                )
+                async with stream as response:
+                    if not response.is_success:
+                        logger.warning(f"[EC2] Resume of run {run_id} returned {response.status_code}")
+                        return
+                    await self._consume_sse(response, cursor, on_line)
+            except (httpx.TransportError, httpx.StreamError) as e:
+                logger.warning(f"[EC2] Resume attempt {attempt} for run {run_id} failed: {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            if cursor["done"]:
+                return
+
+    @staticmethod
+    async def _consume_sse(
+        response: httpx.Response,
+        cursor: dict,
+        on_line: "Callable[[str, str], Awaitable[None]] | None",
+    ) -> None:
+        """Read SSE events into `cursor`, tracking the last event id for resumption."""
+        event_id: str | None = None
+        async for raw_line in response.aiter_lines():
+            if raw_line.startswith("id: "):
+                event_id = raw_line[4:].strip()
+                continue
+            if not raw_line.startswith("data: "):
+                continue
+            try:
+                event = json.loads(raw_line[6:])
+            except json.JSONDecodeError:
+                continue
+
+            if event_id:
+                cursor["last_event_id"] = event_id
+                event_id = None
+
+            event_type = event.get("type")
+
+            if event_type == "run":
+                cursor["run_id"] = event.get("run_id")
+            elif event_type == "log" and on_line:
+                await on_line(event.get("phase", ""), event.get("line", ""))
+            elif event_type == "result":
+                cursor["result"] = event.get("data", {})
+            elif event_type == "error":
+                logger.warning(f"[EC2] Run reported an error: {event.get('message')}")
+            elif event_type == "done":
+                cursor["done"] = True
+                break
 
     async def apply_fix(
         self,
@@ -219,12 +382,142 @@ class EC2Client:
         _log_request("POST", url, payload=log_payload)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/fix", json=payload)
-                self._raise_for_status(response, "apply_fix")
-                body = response.json()
-                _log_response("apply_fix", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.post("/api/v1/fix", json=payload, timeout=_timeout("apply_fix"))
+            self._raise_for_status(response, "apply_fix")
+            body = response.json()
+            _log_response("apply_fix", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
+        except (EC2AgentError, EC2AgentUnreachable):
+            raise
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+
+    async def apply_patch(
+        self,
+        session_id: str,
+        edits: list[dict],
+        install_command: str | None = None,
+        test_command: str | None = None,
+    ) -> dict:
+        """POST /api/v1/patch — apply SEARCH/REPLACE edits and run tests.
+
+        Raises PatchRejectedError when an edit cannot be located; nothing is
+        written in that case.
+        """
+        payload: dict = {"session_id": session_id, "edits": edits}
+        if install_command:
+            payload["install_command"] = install_command
+        if test_command:
+            payload["test_command"] = test_command
+
+        log_payload = dict(payload)
+        log_payload["edits"] = [
+            f"{e['path']}: -{len(e['search'])}/+{len(e['replace'])} chars" for e in edits
+        ]
+        url = f"{self.base_url}/api/v1/patch"
+        _log_request("POST", url, payload=log_payload)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.post("/api/v1/patch", json=payload, timeout=_timeout("apply_patch"))
+            if response.status_code == 422:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except Exception:
+                    detail = response.text
+                raise PatchRejectedError(f"EC2 agent [apply_patch] 422: {detail}")
+            self._raise_for_status(response, "apply_patch")
+            body = response.json()
+            _log_response("apply_patch", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
+        except (EC2AgentError, EC2AgentUnreachable):
+            raise
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+
+    async def apply_batch(
+        self,
+        session_id: str,
+        fixes: list[dict],
+        install_command: str | None = None,
+        test_command: str | None = None,
+    ) -> dict:
+        """POST /api/v1/fix/batch — apply independent fixes together and run tests once.
+
+        Each fix is `{"id", "edits"}` or `{"id", "file_path", "fix_content"}`.
+        Raises PatchRejectedError (with `.rejected` naming the fixes) when
+        edits cannot be located; nothing is written in that case.
+        """
+        payload: dict = {"session_id": session_id, "fixes": fixes}
+        if install_command:
+            payload["install_command"] = install_command
+        if test_command:
+            payload["test_command"] = test_command
+
+        log_payload = dict(payload)
+        log_payload["fixes"] = [
+            {
+                "id": f["id"],
+                **(
+                    {"edits": [f"{e['path']}: -{len(e['search'])}/+{len(e['replace'])} chars" for e in f["edits"]]}
+                    if f.get("edits")
+                    else {"file_path": f["file_path"], "fix_content": f"<{len(f['fix_content'])} chars>"}
+                ),
+            }
+            for f in fixes
+        ]
+        url = f"{self.base_url}/api/v1/fix/batch"
+        _log_request("POST", url, payload=log_payload)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.post("/api/v1/fix/batch", json=payload, timeout=_timeout("apply_batch"))
+            if response.status_code == 422:
+                try:
+                    detail = response.json().get("detail", response.text)
+                except Exception:
+                    detail = response.text
+                rejected = detail.get("rejected", {}) if isinstance(detail, dict) else {}
+                message = detail.get("message", detail) if isinstance(detail, dict) else detail
+                raise PatchRejectedError(f"EC2 agent [apply_batch] 422: {message}", rejected)
+            self._raise_for_status(response, "apply_batch")
+            body = response.json()
+            _log_response("apply_batch", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
+        except (EC2AgentError, EC2AgentUnreachable):
+            raise
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+
+    async def speculate_fix(
+        self,
+        session_id: str,
+        candidates: list[dict],
+        test_command: str | None = None,
+    ) -> dict:
+        """POST /api/v1/fix/speculate — race candidate fixes in forked workspaces.
+
+        Candidates use the `apply_batch` fix format. The first whose tests
+        pass is written to the workspace (`promoted`); the response reports
+        every candidate and time-to-green against testing them one by one.
+        """
+        payload: dict = {"session_id": session_id, "candidates": candidates}
+        if test_command:
+            payload["test_command"] = test_command
+
+        log_payload = dict(payload)
+        log_payload["candidates"] = [f"{c['id']}: {'edits' if c.get('edits') else c['file_path']}" for c in candidates]
+        url = f"{self.base_url}/api/v1/fix/speculate"
+        _log_request("POST", url, payload=log_payload)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.post("/api/v1/fix/speculate", json=payload, timeout=_timeout("speculate_fix"))
+            self._raise_for_status(response, "speculate_fix")
+            body = response.json()
+            _log_response("speculate_fix", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -237,26 +530,33 @@ class EC2Client:
         commit_message: str,
         branch_name: str = "fix/greenbranch",
         github_token: str | None = None,
+        file_paths: list[str] | None = None,
     ) -> dict:
-        """POST /api/v1/commit — create branch, commit, push."""
+        """POST /api/v1/commit — create branch, commit, push.
+
+        `file_paths` lists every file a multi-file fix wrote; they are
+        committed together with `file_path`.
+        """
         payload = {
             "session_id": session_id,
             "file_path": file_path,
             "commit_message": commit_message,
             "branch_name": branch_name,
         }
+        if file_paths:
+            payload["file_paths"] = file_paths
         if github_token:
             payload["github_token"] = github_token
         url = f"{self.base_url}/api/v1/commit"
         _log_request("POST", url, payload=payload)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/commit", json=payload)
-                self._raise_for_status(response, "commit_fix")
-                body = response.json()
-                _log_response("commit_fix", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.post("/api/v1/commit", json=payload, timeout=_timeout("commit_fix"))
+            self._raise_for_status(response, "commit_fix")
+            body = response.json()
+            _log_response("commit_fix", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -268,12 +568,12 @@ class EC2Client:
         _log_request("DELETE", url)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.delete(f"/api/v1/sessions/{session_id}")
-                self._raise_for_status(response, "delete_session")
-                body = response.json()
-                _log_response("delete_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.delete(f"/api/v1/sessions/{session_id}", timeout=_timeout("delete_session"))
+            self._raise_for_status(response, "delete_session")
+            body = response.json()
+            _log_response("delete_session", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -285,12 +585,12 @@ class EC2Client:
         _log_request("GET", url)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.get(f"/api/v1/sessions/{session_id}")
-                self._raise_for_status(response, "get_session")
-                body = response.json()
-                _log_response("get_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
+            client = ec2_http.client()
+            response = await client.get(f"/api/v1/sessions/{session_id}", timeout=_timeout("get_session"))
+            self._raise_for_status(response, "get_session")
+            body = response.json()
+            _log_response("get_session", response.status_code, body, (time.monotonic()-t0)*1000)
+            return body
         except (EC2AgentError, EC2AgentUnreachable):
             raise
         except httpx.ConnectError as e:
@@ -306,17 +606,166 @@ class EC2Client:
         _log_request("GET", url, params=params)
         t0 = time.monotonic()
         try:
-            async with self._client() as client:
-                response = await client.get("/api/v1/files", params=params)
-                body = response.json()
-                _log_response("read_file", response.status_code, body, (time.monotonic()-t0)*1000)
-                if response.is_success:
-                    return body.get("content", "")
-                return ""
+            client = ec2_http.client()
+            response = await client.get("/api/v1/files", params=params, timeout=_timeout("read_file"))
+            body = response.json()
+            _log_response("read_file", response.status_code, body, (time.monotonic()-t0)*1000)
+            if response.is_success:
+                return body.get("content", "")
+            return ""
         except Exception as exc:
             logger.warning(f"[EC2-RES] read_file failed (non-fatal): {exc}")
             return ""
 
+    async def resolve_implementations(self, session_id: str, file_path: str) -> list[str]:
+        """GET /api/v1/files/implementations — implementation modules a test file imports.
+
+        Resolved from ec2-agent's import graph of the workspace, most likely
+        first. Returns [] on failure.
+        """
+        url = f"{self.base_url}/api/v1/files/implementations"
+        params = {"session_id": session_id, "file_path": file_path}
+        _log_request("GET", url, params=params)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.get(
+                "/api/v1/files/implementations", params=params, timeout=_timeout("resolve_implementations")
+            )
+            body = response.json()
+            _log_response("resolve_implementations", response.status_code, body, (time.monotonic()-t0)*1000)
+            if response.is_success:
+                return body.get("implementations", [])
+            return []
+        except Exception as exc:
+            logger.warning(f"[EC2-RES] resolve_implementations failed (non-fatal): {exc}")
+            return []
+
+    async def search_code(
+        self, session_id: str, query: str, k: int, exclude: list[str] | None = None
+    ) -> list[dict]:
+        """GET /api/v1/files/search — top-k code snippets for a query from ec2-agent's BM25 index.
+
+        Each result is {"path", "start_line", "end_line", "score", "snippet"};
+        `exclude` leaves out files the caller already has. Returns [] on failure.
+        """
+        url = f"{self.base_url}/api/v1/files/search"
+        params = {"session_id": session_id, "query": query, "k": k, "exclude": exclude or []}
+        _log_request("GET", url, params={**params, "query": f"<{len(query)} chars>"})
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.get("/api/v1/files/search", params=params, timeout=_timeout("search_code"))
+            body = response.json()
+            if response.is_success:
+                results = body.get("results", [])
+                _log_response(
+                    "search_code", response.status_code,
+                    f"{len(results)} snippet(s) from {body.get('indexed_files', 0)} indexed file(s)",
+                    (time.monotonic()-t0)*1000,
+                )
+                return results
+            _log_response("search_code", response.status_code, body, (time.monotonic()-t0)*1000)
+            return []
+        except Exception as exc:
+            logger.warning(f"[EC2-RES] search_code failed (non-fatal): {exc}")
+            return []
+
+    async def read_repo_map(self, session_id: str) -> dict[str, list[str]]:
+        """GET /api/v1/files/map — every code file with its top-level symbols.
+
+        Returns {path: [symbol line, …]} (class members indented by two
+        spaces), or {} on failure.
+        """
+        url = f"{self.base_url}/api/v1/files/map"
+        params = {"session_id": session_id}
+        _log_request("GET", url, params=params)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.get("/api/v1/files/map", params=params, timeout=_timeout("read_repo_map"))
+            body = response.json()
+            if response.is_success:
+                _log_response(
+                    "read_repo_map", response.status_code,
+                    f"{body.get('file_count', 0)} file(s), {body.get('parsed', 0)} parsed, {body.get('cached', 0)} cached",
+                    (time.monotonic()-t0)*1000,
+                )
+                return body.get("files", {})
+            _log_response("read_repo_map", response.status_code, body, (time.monotonic()-t0)*1000)
+            return {}
+        except Exception as exc:
+            logger.warning(f"[EC2-RES] read_repo_map failed (non-fatal): {exc}")
+            return {}
+
+    async def read_files(self, session_id: str, paths: list[str]) -> dict[str, dict | None]:
+        """POST /api/v1/files/batch — read many files in one round trip.
+
+        Returns {path: {"content", "sha256", "size_bytes"}} with None for
+        files that do not exist.
+        """
+        payload = {"session_id": session_id, "paths": paths}
+        url = f"{self.base_url}/api/v1/files/batch"
+        _log_request("POST", url, payload=payload)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.post("/api/v1/files/batch", json=payload, timeout=_timeout("read_files"))
+            self._raise_for_status(response, "read_files")
+            body = response.json()
+            _log_response(
+                "read_files", response.status_code,
+                f"{body.get('found', 0)} of {len(paths)} file(s) found",
+                (time.monotonic()-t0)*1000,
+            )
+            return body.get("files", {})
+        except (EC2AgentError, EC2AgentUnreachable):
+            raise
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+
+    async def read_output(
+        self, session_id: str, output_id: str, offset: int = 0, length: int | None = None
+    ) -> str:
+        """GET /api/v1/outputs/{output_id} — fetch a stored test output (or a byte range of it)."""
+        url = f"{self.base_url}/api/v1/outputs/{output_id}"
+        params = {"session_id": session_id, "offset": offset}
+        if length is not None:
+            params["length"] = length
+        _log_request("GET", url, params=params)
+        t0 = time.monotonic()
+        try:
+            client = ec2_http.client()
+            response = await client.get(f"/api/v1/outputs/{output_id}", params=params, timeout=_timeout("read_output"))
+            self._raise_for_status(response, "read_output")
+            _log_response(
+                "read_output", response.status_code,
+                f"{len(response.content)} of {response.headers.get('X-Output-Size')} bytes",
+                (time.monotonic()-t0)*1000,
+            )
+            return response.content.decode("utf-8", errors="replace")
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+
+    async def test_output(self, session_id: str, result: dict) -> str:
+        """A test run's output for the fix prompt.
+
+        Test responses only carry a head/tail excerpt (`raw_output`); when it
+        is truncated, the stored output is fetched — its last
+        `test_output_max_bytes` if larger — so tracebacks in the middle are
+        not lost. Falls back to the excerpt if the fetch fails.
+        """
+        ref = result.get("output") or {}
+        raw_output = result.get("raw_output", "")
+        if not ref.get("truncated"):
+            return raw_output
+        offset = max(0, ref.get("size_bytes", 0) - api_settings.test_output_max_bytes)
+        try:
+            return await self.read_output(session_id, ref["output_id"], offset=offset)
+        except (EC2AgentError, EC2AgentUnreachable, httpx.HTTPError, KeyError) as e:
+            logger.warning(f"[EC2] Could not fetch test output {ref.get('output_id')}, using the excerpt: {e}")
+            return raw_output
+
     # ── Internal ──────────────────────────────────────────
 
     def _raise_for_status(self, response: httpx.Response, operation: str) -> None:
@@ -0,0 +1,188 @@
+"""Error grouping — errors that one fix should resolve together.
+
+Errors are grouped by the file the fix has to change: the file the error
+points at, or for a failing test the implementation file it exercises
+(resolved by ec2-agent's import graph, else guessed from its imports and
+file name). Five failing assertions against the same module then cost one
+LLM call and one test run instead of five.
+
+Each group also carries the repo map (files and their top-level symbols)
+and the code snippets ec2-agent's search index ranks
+highest for its error messages — helpers, fixtures or config the failing
+code does not import but the fix may need.
+"""
+
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from src.app.config import api_settings
+from src.services.file_cache import FileCache
+
+logger = logging.getLogger("rift_server")
+
+LogFn = Callable[[str], Awaitable[None]]
+
+_PY_IMPORT_RE = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE)
+
+
+def is_test_path(file_path: str) -> bool:
+    return any(x in file_path.lower() for x in ("test", "spec", "__test__"))
+
+
+@dataclass
+class ErrorGroup:
+    """Errors sharing one fix target, with the file contents the prompt needs."""
+
+    errors: list[dict[str, Any]]
+    file_path: str  # file the first error points at
+    file_content: str
+    impl_path: str = ""  # implementation behind a failing test, when found
+    impl_content: str = ""
+    # Other files the grouped errors point at (e.g. a second test file for the same module)
+    related_files: dict[str, str] = field(default_factory=dict)
+    # Code search hits for the error messages: {"path", "start_line", "end_line", "score", "snippet"}
+    snippets: list[dict[str, Any]] = field(default_factory=list)
+    # Every code file with its top-level symbols, shared by all groups of a run
+    repo_map: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def error(self) -> dict[str, Any]:
+        """The first error — used for routing, commit messages and the fix table."""
+        return self.errors[0]
+
+    @property
+    def target_path(self) -> str:
+        return self.impl_path if is_test_path(self.file_path) and self.impl_content else self.file_path
+
+
+def implementation_candidates(file_path: str, content: str) -> list[str]:
+    """Guessed paths for the implementation a test file exercises, from its name and imports.
+
+    Fallback for what ec2-agent's import graph could not resolve.
+    """
+    possible: list[str] = []
+    if content:
+        # Common patterns: src/tests/foo.test.ts -> src/foo.ts or src/index.ts
+        if "../index" in content:
+            possible.extend(["src/index.ts", "src/index.js"])
+        try:
+            # Imports like: import { app } from "../index"
+            for line in content.split("\n"):
+                if 'from "' in line and "../" in line:
+                    imp = line.split('from "')[1].split('"')[0]
+                    if imp.startswith("../"):
+                        rel = imp.replace("../", "src/")
+                        possible.extend([rel + ".ts", rel + ".js"])
+        except (IndexError, ValueError):
+            pass  # Skip if parsing fails
+        if file_path.endswith(".py"):
+            # Python: from src.calc import add -> src/calc.py
+            for match in _PY_IMPORT_RE.finditer(content):
+                module = (match.group(1) or match.group(2)).lstrip(".")
+                if "." in module or module.startswith("src"):
+                    possible.append(module.replace(".", "/") + ".py")
+    # Also try removing test/spec from the path
+    guess = file_path.replace("/tests/", "/").replace(".test.", ".").replace(".spec.", ".")
+    if guess != file_path:
+        possible.append(guess)
+    name = file_path.rsplit("/", 1)[-1]
+    if name.startswith("test_") and name.endswith(".py"):
+        possible.extend([name[5:], f"src/{name[5:]}"])
+    return list(dict.fromkeys(possible))
+
+
+async def candidate_paths(files: FileCache, file_path: str, content: str) -> list[str]:
+    """Where a test file's implementation may live: the import graph's answer, then guesses."""
+    resolved = await files.client.resolve_implementations(files.session_id, file_path)
+    return list(dict.fromkeys([*resolved, *implementation_candidates(file_path, content)]))
+
+
+async def find_implementation(
+    files: FileCache, file_path: str, content: str, possible: list[str] | None = None
+) -> tuple[str, str]:
+    """Locate the implementation a test file exercises; returns (path, content) or ("", "")."""
+    if possible is None:
+        possible = await candidate_paths(files, file_path, content)
+    found = await files.read_many(possible)
+    for path in possible:
+        if found[path]:
+            return path, found[path]
+    return "", ""
+
+
+def search_query(errors: list[dict[str, Any]]) -> str:
+    """Code search query for a group: its error messages, then their traces."""
+    parts = [e.get("message", "") for e in errors] + [e.get("full_trace") or "" for e in errors]
+    return "\n".join(p for p in parts if p)[:api_settings.llm_context_query_chars]
+
+
+async def search_snippets(files: FileCache, group: ErrorGroup) -> list[dict[str, Any]]:
+    """Top `llm_context_snippets` search hits for a group, outside the files its prompt already holds."""
+    query = search_query(group.errors)
+    if api_settings.llm_context_snippets <= 0 or not query:
+        return []
+    exclude = [group.file_path, *([group.impl_path] if group.impl_path else []), *group.related_files]
+    return await files.client.search_code(files.session_id, query, api_settings.llm_context_snippets, exclude)
+
+
+async def group_errors(
+    files: FileCache,
+    errors: list[dict[str, Any]],
+    on_log: LogFn | None = None,
+) -> list[ErrorGroup]:
+    """Group errors by fix target, in order of first appearance.
+
+    The files the errors point at are read in one request; the failing
+    tests' implementations are resolved concurrently and every candidate
+    path read in a second request. Code search then runs for every group
+    concurrently, alongside fetching the repo map.
+    A group holds at most `llm_max_errors_per_fix` errors; the rest come
+    back in the next test run if the fix did not cover them.
+    """
+    error_files = list(dict.fromkeys(e.get("file", "unknown") for e in errors))
+    contents = await files.read_many(error_files)
+    test_files = [f for f in error_files if is_test_path(f)]
+    candidates = dict(zip(
+        test_files, await asyncio.gather(*(candidate_paths(files, f, contents[f]) for f in test_files))
+    ))
+    # Prefetch every candidate at once; find_implementation then hits the cache
+    await files.read_many(path for f in test_files for path in candidates[f])
+
+    resolved: dict[str, tuple[str, str, str]] = {}  # error file → (content, impl path, impl content)
+    for file_path in error_files:
+        impl_path = impl_content = ""
+        if is_test_path(file_path):
+            impl_path, impl_content = await find_implementation(
+                files, file_path, contents[file_path], candidates[file_path]
+            )
+            if impl_path and on_log is not None:
+                await on_log(f"Found implementation: {impl_path} (for {file_path})")
+        resolved[file_path] = (contents[file_path], impl_path, impl_content)
+
+    groups: dict[str, ErrorGroup] = {}
+    for error in errors:
+        file_path = error.get("file", "unknown")
+        content, impl_path, impl_content = resolved[file_path]
+
+        target = impl_path if impl_content else file_path
+        group = groups.get(target)
+        if group is None:
+            groups[target] = ErrorGroup([error], file_path, content, impl_path, impl_content)
+        elif len(group.errors) < api_settings.llm_max_errors_per_fix:
+            group.errors.append(error)
+            if file_path not in (group.file_path, group.target_path):
+                group.related_files[file_path] = content
+
+    result = list(groups.values())
+    *found_snippets, outline = await asyncio.gather(*(search_snippets(files, g) for g in result), files.repo_map())
+    for group, snippets in zip(result, found_snippets):
+        group.snippets = snippets
+        group.repo_map = outline
+    logger.info(
+        f"[GROUP] {len(errors)} error(s) → {len(result)} fix target(s): "
+        + ", ".join(f"{g.target_path} ×{len(g.errors)}" for g in result)
+    )
+    return result
@@ -0,0 +1,105 @@
+"""Per-run file cache — session files read from ec2-agent at most once between fixes.
+
+Gathering context for a fix reads the files the errors point at plus every
+path an implementation might live at. Through a `FileCache` all paths not
+yet cached are fetched with one `POST /files/batch` call, and files no fix
+has written since are served from memory on the next iteration.
+
+The cache only knows what the run tells it: after applying a fix, call
+`invalidate` with the paths it wrote (or with nothing, to drop everything).
+The repo map (`GET /files/map`) is cached the same way and dropped on any
+invalidation.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Iterable
+
+from src.core.exceptions import EC2AgentError
+from src.services.ec2_client import EC2Client
+
+logger = logging.getLogger("rift_server")
+
+
+@dataclass
+class CachedFile:
+    content: str  # "" for a file that does not exist
+    sha256: str | None = None  # None for a missing file
+
+
+class FileCache:
+    """
+    Files of one session, cached until a fix writes them.
+
+    Usage:
+        files = FileCache(client, session_id)
+        contents = await files.read_many(["src/a.py", "src/b.py"])  # one round trip; "" if missing
+        content = await files.read("src/a.py")                      # cached
+        files.invalidate(["src/a.py"])                              # after a fix wrote it
+    """
+
+    def __init__(self, client: EC2Client, session_id: str):
+        self.client = client
+        self.session_id = session_id
+        self._files: dict[str, CachedFile] = {}
+        self._repo_map: dict[str, list[str]] | None = None
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+
+    async def read(self, path: str) -> str:
+        """Content of `path`, or "" if it does not exist."""
+        return (await self.read_many([path]))[path]
+
+    async def read_many(self, paths: Iterable[str]) -> dict[str, str]:
+        """Contents of every path ("" for missing files); uncached ones in one request."""
+        paths = list(dict.fromkeys(paths))
+        wanted = [p for p in paths if p not in self._files]
+        self.hits += len(paths) - len(wanted)
+        self.misses += len(wanted)
+        if wanted:
+            await self._fetch(wanted)
+        return {p: self._files[p].content if p in self._files else "" for p in paths}
+
+    def digest(self, path: str) -> str | None:
+        """sha256 of a cached file's content (None if missing or not cached)."""
+        cached = self._files.get(path)
+        return cached.sha256 if cached else None
+
+    async def repo_map(self) -> dict[str, list[str]]:
+        """Every code file of the session with its top-level symbols ({} if unavailable)."""
+        if self._repo_map is None:
+            self.round_trips += 1
+            self._repo_map = await self.client.read_repo_map(self.session_id)
+        return self._repo_map
+
+    def invalidate(self, paths: Iterable[str] | None = None) -> None:
+        """Forget `paths` (every file if None) — they changed on ec2-agent."""
+        self._repo_map = None
+        if paths is None:
+            self._files.clear()
+            return
+        for path in paths:
+            self._files.pop(path, None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "round_trips": self.round_trips, "cached": len(self._files)}
+
+    async def _fetch(self, paths: list[str]) -> None:
+        self.round_trips += 1
+        try:
+            found = await self.client.read_files(self.session_id, paths)
+        except EC2AgentError as e:
+            # Older agent without /files/batch — read one by one and cache nothing,
+            # since read_file cannot tell a missing file from a failed read
+            logger.warning(f"[FILES] batch read failed ({e}), reading {len(paths)} file(s) one by one")
+            contents = await asyncio.gather(*(self.client.read_file(self.session_id, p) for p in paths))
+            self.round_trips += len(paths)
+            for path, content in zip(paths, contents):
+                if content:
+                    self._files[path] = CachedFile(content)
+            return
+        for path in paths:
+            entry = found.get(path)
+            self._files[path] = CachedFile(entry["content"], entry.get("sha256")) if entry else CachedFile("")
@@ -0,0 +1,183 @@
+"""Parallel fixes — independent fix targets fixed together in one iteration.
+
+Each `ErrorGroup` targets a different file, so their fixes do not depend on
+each other: the LLM calls run concurrently, every answer is applied with a
+single `POST /fix/batch` and the suite runs once for all of them.
+
+Two answers may still collide — a test-file fix redirected to an
+implementation another group targets, or edit blocks naming a file outside
+the group. The first fix (in group order) keeps the file; the later one is
+deferred, and its errors come back in the next test run.
+
+A fix counts as fixed when none of its errors remain in that test run,
+since the suite as a whole can still fail on the other fixes' errors.
+Targets with a patch in fix memory skip their LLM call.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from src.core.exceptions import DegenerateFixError, PatchRejectedError
+from src.services.ec2_client import EC2Client
+from src.services.fix_generator import FixGenerator, FixProposal
+
+logger = logging.getLogger("rift_server")
+
+LogFn = Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class FixOutcome:
+    """What became of one generator's fix in a batch."""
+
+    generator: FixGenerator
+    proposal: FixProposal | None = None
+    status: str = "pending"  # pending → fixed | failed | deferred
+    applied: bool = False  # written and tested (a failed fix may still have been applied)
+    reason: str = ""  # why it was not applied
+    diff: str = ""
+    screened: list[dict] = field(default_factory=list)  # rejected answers, when none was left to apply
+
+    def drop(self, status: str, reason: str) -> None:
+        self.status, self.reason = status, reason
+
+
+def proposal_paths(proposal: FixProposal) -> set[str]:
+    """Files a proposal writes."""
+    if proposal.mode == "search_replace":
+        return {e.path for e in proposal.edits}
+    return {proposal.file_path}
+
+
+def batch_payload(fix_id: str, proposal: FixProposal) -> dict:
+    if proposal.mode == "search_replace":
+        return {"id": fix_id, "edits": [e.as_payload() for e in proposal.edits]}
+    return {"id": fix_id, "file_path": proposal.file_path, "fix_content": proposal.content}
+
+
+class FixBatch:
+    """
+    Proposes fixes for several targets concurrently and applies them with one test run.
+
+    Usage:
+        batch = FixBatch(client, session_id, generators, on_log=log)
+        outcomes, result = await batch.run()   # result is {} if nothing was applied
+    """
+
+    def __init__(
+        self,
+        client: EC2Client,
+        session_id: str,
+        generators: list[FixGenerator],
+        install_command: str | None = None,
+        test_command: str | None = None,
+        on_log: LogFn | None = None,
+    ):
+        self.client = client
+        self.session_id = session_id
+        self.install_command = install_command
+        self.test_command = test_command
+        self._on_log = on_log
+        self.outcomes = [FixOutcome(g) for g in generators]
+
+    async def run(self) -> tuple[list[FixOutcome], dict]:
+        await self._propose(self.outcomes, recall=True)
+        self._resolve_conflicts()
+
+        while True:
+            pending = {str(i): o for i, o in enumerate(self.outcomes) if o.status == "pending"}
+            if not pending:
+                await self._log("No fix could be applied")
+                return self.outcomes, {}
+            files = sorted(set().union(*(proposal_paths(o.proposal) for o in pending.values())))
+            await self._log(f"Applying {len(pending)} fix(es) to {', '.join(files)} — one test run…")
+            try:
+                result = await self.client.apply_batch(
+                    session_id=self.session_id,
+                    fixes=[batch_payload(fix_id, o.proposal) for fix_id, o in pending.items()],
+                    install_command=self.install_command,
+                    test_command=self.test_command,
+                )
+                break
+            except PatchRejectedError as e:
+                if not e.rejected:
+                    raise
+                # Nothing was written: regenerate rejected edits as whole files
+                # (recalled patches from scratch), drop the rest
+                retry, recalled = [], []
+                for fix_id, reason in e.rejected.items():
+                    outcome = pending[fix_id]
+                    target = outcome.generator.target_path
+                    if outcome.proposal.recalled:
+                        await self._log(f"{target}: remembered patch rejected ({reason}) — asking the LLM")
+                        await outcome.generator.forget(outcome.proposal)
+                        recalled.append(outcome)
+                    elif outcome.proposal.mode == "search_replace":
+                        await self._log(f"{target}: edits rejected ({reason}) — retrying as a whole-file fix")
+                        retry.append(outcome)
+                    else:
+                        outcome.drop("failed", reason)
+                for outcome in recalled:
+                    outcome.proposal = None
+                await asyncio.gather(self._propose(retry, "whole_file"), self._propose(recalled))
+                self._resolve_conflicts()
+
+        await self._attribute(result)
+        return self.outcomes, result
+
+    async def _propose(self, outcomes: list[FixOutcome], edit_format: str | None = None, recall: bool = False) -> None:
+        """LLM calls for every outcome at once (unless fix memory has a patch); a
+        failed call fails only its own fix."""
+
+        async def _one(outcome: FixOutcome) -> None:
+            previous = outcome.proposal
+            try:
+                if recall:
+                    outcome.proposal = await outcome.generator.recall()
+                    if outcome.proposal is not None:
+                        return
+                outcome.proposal = await outcome.generator.propose(
+                    edit_format,
+                    fallback_reason=previous.fallback_reason if previous else "",
+                    model=previous.model if previous else None,
+                )
+            except Exception as e:
+                if isinstance(e, DegenerateFixError):
+                    outcome.screened = e.screened
+                outcome.drop("failed", f"AI could not generate a fix: {e}")
+                await self._log(f"{outcome.generator.target_path}: ERROR: LLM failed — {e}")
+
+        await asyncio.gather(*(_one(o) for o in outcomes))
+
+    def _resolve_conflicts(self) -> None:
+        """Keep the first fix touching each file; defer later ones touching the same file."""
+        owners: dict[str, FixOutcome] = {}
+        for outcome in self.outcomes:
+            if outcome.status != "pending":
+                continue
+            paths = proposal_paths(outcome.proposal)
+            clash = sorted(p for p in paths if p in owners)
+            if clash:
+                first = owners[clash[0]].generator.target_path
+                outcome.drop("deferred", f"{', '.join(clash)} is also changed by the fix for {first}")
+                logger.info(f"[BATCH] deferred fix for {outcome.generator.target_path}: {outcome.reason}")
+                continue
+            owners.update(dict.fromkeys(paths, outcome))
+
+    async def _attribute(self, result: dict) -> None:
+        """Fixed if the suite passed or none of the fix's errors are left."""
+        diffs = {f["id"]: f.get("diff", "") for f in result.get("fixes", [])}
+        for i, outcome in enumerate(self.outcomes):
+            if outcome.status != "pending":
+                continue
+            outcome.applied = True
+            outcome.diff = diffs.get(str(i), "")
+            outcome.status = "fixed" if outcome.generator.cleared(result) else "failed"
+            await outcome.generator.settle(outcome.proposal, result)
+
+    async def _log(self, line: str) -> None:
+        logger.info(f"[BATCH] {line}")
+        if self._on_log is not None:
+            await self._on_log(line)
@@ -0,0 +1,456 @@
+"""Fix generation — prompt the LLM for one error and apply its answer via ec2-agent.
+
+Shared by the LangGraph `fix_code` node and the streaming runner. A
+generator covers one `ErrorGroup` — every error that shares a fix target
+is fixed by the same answer.
+
+With `llm_edit_format = "search_replace"` the model answers with
+SEARCH/REPLACE blocks (see `src.llm.edit_blocks`), which ec2-agent places
+with `POST /patch`. Output tokens then scale with the size of the change
+rather than the size of the file. If the blocks are malformed or cannot be
+located in the file, the same error is retried once as a whole-file
+rewrite through `POST /fix`.
+
+The model comes from `src.llm.router.model_router`; pass the run's
+`ModelLedger` so earlier failed attempts at the same error escalate it.
+
+Every answer is screened before it reaches ec2-agent
+(`src.services.fix_screen`): one that is cut off, empty, unchanged or
+missing most of the file is asked for again with a note on what was wrong.
+
+Before any of that, `recall` looks for a patch that fixed an error with the
+same signature in an earlier run (`src.llm.fix_memory`); `settle` feeds
+each applied fix's outcome back into that memory.
+"""
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from src.app.config import api_settings
+from src.core.exceptions import DegenerateFixError, EditFormatError, PatchRejectedError
+from src.llm.cache import llm_cache
+from src.llm.edit_blocks import EditBlock, parse_edit_blocks
+from src.llm.completion import CompletionAssembler
+from src.llm.fix_memory import fix_memory
+from src.llm.llm_client import EDIT_SYSTEM_PROMPT, SYSTEM_PROMPT, DeltaFn, ask_llm
+from src.llm.prompt_builder import build_fix_prompt
+from src.llm.router import ModelLedger, error_key, model_router
+from src.services.ec2_client import EC2Client
+from src.services.error_groups import ErrorGroup, is_test_path
+from src.services.fix_screen import retry_note, screen
+
+logger = logging.getLogger("rift_server")
+
+LogFn = Callable[[str], Awaitable[None]]
+
+MEMORY_MODEL = "fix-memory"  # FixProposal.model of a patch recalled from fix memory
+
+
+@dataclass
+class FixProposal:
+    """One LLM answer for an error, parsed but not yet applied."""
+
+    mode: str  # search_replace | whole_file
+    file_path: str  # file the fix changes (first edited file in edit mode)
+    raw: str
+    prompt: str
+    prompt_report: dict
+    llm_ms: float
+    content: str = ""  # whole_file: the corrected file
+    edits: list[EditBlock] = field(default_factory=list)  # search_replace
+    fallback_reason: str = ""  # why an edit-mode attempt was abandoned
+    model: str = ""
+    finish_reason: str = ""  # why the model stopped: "stop", "length" (cut off), …
+    cache_key: str = ""  # the answer's response cache entry (discarded if it does not work)
+    # Earlier answers rejected by screening: {"reason", "detail", "model", "mode"}
+    screened: list[dict] = field(default_factory=list)
+
+    @property
+    def recalled(self) -> bool:
+        return self.model == MEMORY_MODEL
+
+
+class FixGenerator:
+    """
+    Proposes and applies a fix for a single error.
+
+    Usage:
+        generator = FixGenerator.for_group(client, session_id, group, language, raw_output)
+        proposal = await generator.recall() or await generator.propose()  # memory, else LLM call
+        proposal, result = await generator.apply(proposal)  # ec2-agent /patch or /fix
+    """
+
+    def __init__(
+        self,
+        client: EC2Client,
+        session_id: str,
+        error: dict,
+        language: str,
+        file_content: str,
+        raw_output: str,
+        impl_path: str = "",
+        impl_content: str = "",
+        install_command: str | None = None,
+        test_command: str | None = None,
+        on_log: LogFn | None = None,
+        on_delta: DeltaFn | None = None,
+        ledger: ModelLedger | None = None,
+        related_errors: list[dict] | None = None,
+        related_files: dict[str, str] | None = None,
+        snippets: list[dict] | None = None,
+        repo_map: dict[str, list[str]] | None = None,
+    ):
+        self.client = client
+        self.session_id = session_id
+        self.error = error
+        self.language = language
+        self.file_content = file_content
+        self.raw_output = raw_output
+        self.impl_path = impl_path
+        self.impl_content = impl_content
+        self.install_command = install_command
+        self.test_command = test_command
+        self._on_log = on_log
+        self._on_delta = on_delta  # streams the completion while it is generated
+        self.ledger = ledger
+        self.related_errors = related_errors or []
+        self.related_files = related_files or {}
+        self.snippets = snippets or []
+        self.repo_map = repo_map or {}
+
+        self.file_path = error.get("file", "unknown")
+        self.is_test_file = is_test_path(self.file_path)
+        # Where edits go when the model names no file
+        self.target_path = self.impl_path if self.is_test_file and self.impl_content else self.file_path
+
+    @classmethod
+    def for_group(
+        cls,
+        client: EC2Client,
+        session_id: str,
+        group: ErrorGroup,
+        language: str,
+        raw_output: str,
+        **kwargs,
+    ) -> "FixGenerator":
+        """A generator fixing every error in `group` with one LLM call."""
+        return cls(
+            client,
+            session_id,
+            group.error,
+            language,
+            group.file_content,
+            raw_output,
+            impl_path=group.impl_path,
+            impl_content=group.impl_content,
+            related_errors=group.errors[1:],
+            related_files=group.related_files,
+            snippets=group.snippets,
+            repo_map=group.repo_map,
+            **kwargs,
+        )
+
+    @property
+    def errors(self) -> list[dict]:
+        return [self.error, *self.related_errors]
+
+    @property
+    def target_content(self) -> str:
+        return self.impl_content if self.target_path == self.impl_path and self.impl_content else self.file_content
+
+    async def recall(self) -> FixProposal | None:
+        """A remembered patch for these errors that fits the target file, or None.
+
+        Skipped once a fix for any of the errors has failed in this run —
+        the next attempt should come from the (escalated) model instead.
+        """
+        if self.ledger and any(self.ledger.failed_attempts(e) for e in self.errors):
+            return None
+        edits = await fix_memory.recall(self.errors, self.language, self.target_content)
+        if edits is None:
+            return None
+        await self._log(f"Fix memory: reusing a verified patch ({len(edits)} edit(s)) — no LLM call")
+        return FixProposal(
+            mode="search_replace",
+            file_path=self.target_path,
+            raw="",
+            prompt="",
+            prompt_report={"tokens": 0, "budget": 0, "sections": {}},
+            llm_ms=0.0,
+            edits=[EditBlock(self.target_path, search, replace) for search, replace in edits],
+            model=MEMORY_MODEL,
+        )
+
+    @staticmethod
+    def tested(result: dict) -> bool:
+        """False if the pre-flight check failed and the test run was skipped."""
+        return not (result.get("test_result", {}).get("preflight") or {}).get("errors")
+
+    def cleared(self, result: dict) -> bool:
+        """Whether a test run no longer reports any of these errors.
+
+        A run skipped by the pre-flight check only reports syntax errors,
+        so it never clears anything.
+        """
+        if not self.tested(result):
+            return False
+        if result.get("success"):
+            return True
+        remaining = {error_key(e) for e in result.get("test_result", {}).get("errors", [])}
+        return not any(error_key(e) in remaining for e in self.errors)
+
+    async def settle(self, proposal: FixProposal, result: dict) -> None:
+        """Feed an applied fix's outcome into fix memory.
+
+        Edit-mode fixes confined to the target file are remembered once they
+        clear their errors; a recalled patch that did not is counted against.
+        An LLM answer that did not clear them is dropped from the response
+        cache, so a rerun asks the model again instead of replaying it.
+        """
+        cleared = self.cleared(result)
+        if not cleared:
+            await self._uncache(proposal)
+        if not self.tested(result):
+            return  # no evidence for or against the patch
+        if proposal.mode != "search_replace" or not (cleared or proposal.recalled):
+            return
+        if any(e.path != self.target_path for e in proposal.edits):
+            return
+        await fix_memory.record(
+            self.errors,
+            self.language,
+            [(e.search, e.replace) for e in proposal.edits],
+            success=cleared,
+            recalled=proposal.recalled,
+        )
+
+    async def propose(
+        self,
+        edit_format: str | None = None,
+        fallback_reason: str = "",
+        model: str | None = None,
+        temperature: float | None = None,
+        screened: list[dict] | None = None,
+        note: str = "",
+        use_cache: bool | None = None,
+    ) -> FixProposal:
+        """Build the prompt, call the LLM and parse its answer.
+
+        The model is routed unless given (fallbacks keep the first choice);
+        `temperature` overrides `llm_temperature`, e.g. for speculative
+        candidates. Malformed edit blocks fall back to a whole-file proposal.
+        A screened-out answer is asked for again (see `_screen`); `screened`
+        and `note` carry the earlier rejections into that retry.
+
+        The response cache is only used for a first attempt (`use_cache`
+        unset): a retry after a failed, rejected or screened-out answer —
+        and any speculative candidate — needs a fresh answer.
+        Raises LLMError if the model call itself fails, DegenerateFixError if
+        every answer was screened out.
+        """
+        screened = screened or []
+        if use_cache is None:
+            failed = bool(self.ledger) and any(self.ledger.failed_attempts(e) for e in self.errors)
+            use_cache = not (screened or fallback_reason or failed)
+        mode = edit_format or api_settings.llm_edit_format
+        prompt, report = build_fix_prompt(
+            error=self.error,
+            language=self.language,
+            file_content=self.file_content,
+            raw_output=self.raw_output,
+            impl_path=self.impl_path,
+            impl_content=self.impl_content,
+            edit_format=mode,
+            related_errors=self.related_errors,
+            related_files=self.related_files,
+            snippets=self.snippets,
+            repo_map=self.repo_map,
+            retry_note=note,
+        )
+        await self._log(f"Prompt: ~{report['tokens']} tokens (budget {report['budget']}, {mode})")
+
+        if model is None:
+            route = model_router.route(
+                bug_type=[e.get("error_type", "LOGIC") for e in self.errors],
+                prompt_tokens=report["tokens"],
+                failed_attempts=max(self.ledger.failed_attempts(e) for e in self.errors) if self.ledger else 0,
+            )
+            model = route.model
+            await self._log(f"Model: {model} ({route.reason})")
+
+        # TARGET_FILE redirects and fences are handled while the answer streams in
+        assembler = CompletionAssembler(detect_target=self.is_test_file and mode == "whole_file")
+        t_llm = time.monotonic()
+        text = await ask_llm(
+            prompt,
+            system=EDIT_SYSTEM_PROMPT if mode == "search_replace" else SYSTEM_PROMPT,
+            on_delta=self._on_delta,
+            assembler=assembler,
+            model=model,
+            ledger=self.ledger,
+            owner=self.session_id,
+            temperature=temperature,
+            use_cache=use_cache,
+        )
+        llm_ms = (time.monotonic() - t_llm) * 1000
+        await self._log(f"AI response received ({len(assembler.raw)} chars, {llm_ms:.0f}ms)")
+
+        proposal = FixProposal(
+            mode=mode,
+            file_path=self.target_path,
+            raw=assembler.raw,
+            prompt=prompt,
+            prompt_report=report,
+            llm_ms=llm_ms,
+            fallback_reason=fallback_reason,
+            model=model,
+            finish_reason=assembler.finish_reason,
+            cache_key=assembler.cache_key,
+            screened=screened,
+        )
+
+        if mode == "search_replace":
+            try:
+                proposal.edits = parse_edit_blocks(text, default_path=self.target_path)
+            except EditFormatError as e:
+                if proposal.finish_reason == "length" and api_settings.fix_screen_max_retries > 0:
+                    return await self._screen(proposal, temperature)  # a whole file would be cut off too
+                await self._log(f"Edit blocks unusable ({e}) — retrying as a whole-file fix")
+                return await self.propose(
+                    "whole_file", fallback_reason=str(e), model=model, temperature=temperature, screened=screened
+                )
+            proposal.file_path = proposal.edits[0].path
+            return await self._screen(proposal, temperature)
+
+        # Whole file; test-file errors may redirect to the implementation
+        proposal.file_path = assembler.target_file or self.file_path
+        proposal.content = text
+        if assembler.target_file:
+            await self._log(f"Redirected fix → {assembler.target_file}")
+        return await self._screen(proposal, temperature)
+
+    def _current(self, path: str) -> str | None:
+        """Known content of a file this fix may rewrite."""
+        if path == self.file_path:
+            return self.file_content or None
+        if path == self.impl_path:
+            return self.impl_content or None
+        return None
+
+    async def _screen(self, proposal: FixProposal, temperature: float | None) -> FixProposal:
+        """Return `proposal` if it is worth a test run, else a fresh answer.
+
+        A rejected answer is recorded in `screened` and asked for again with
+        a note on what was wrong — a cut-off whole file as edit blocks, which
+        need far fewer output tokens — at most `fix_screen_max_retries` times.
+        """
+        if api_settings.fix_screen_max_retries <= 0:
+            return proposal
+        edit_mode = proposal.mode == "search_replace"
+        rejection = screen(
+            proposal.finish_reason,
+            edits=proposal.edits if edit_mode else None,
+            content=proposal.content,
+            current=None if edit_mode else self._current(proposal.file_path),
+            file_path=proposal.file_path,
+        )
+        if rejection is None:
+            return proposal
+        await self._uncache(proposal)
+
+        screened = [
+            *proposal.screened,
+            {"reason": rejection.reason, "detail": rejection.detail, "model": proposal.model, "mode": proposal.mode},
+        ]
+        if len(screened) > api_settings.fix_screen_max_retries:
+            raise DegenerateFixError(
+                f"every answer was screened out (last: {rejection.reason} — {rejection.detail})", screened
+            )
+        mode = "search_replace" if rejection.reason == "truncated" else proposal.mode
+        await self._log(f"Answer screened out: {rejection.detail} — asking again ({mode})")
+        return await self.propose(
+            mode,
+            fallback_reason=proposal.fallback_reason,
+            model=proposal.model,
+            temperature=temperature,
+            screened=screened,
+            note=retry_note(rejection, mode),
+        )
+
+    async def forget(self, proposal: FixProposal) -> None:
+        """Count a recalled patch that ec2-agent could not place against its memory entry."""
+        await fix_memory.record(
+            self.errors,
+            self.language,
+            [(e.search, e.replace) for e in proposal.edits],
+            success=False,
+            recalled=True,
+            rejected=True,
+        )
+
+    async def apply(self, proposal: FixProposal) -> tuple[FixProposal, dict]:
+        """Apply a proposal and run the tests.
+
+        Edits that ec2-agent cannot place trigger one whole-file retry (a
+        recalled patch that no longer fits goes to the LLM instead); returns
+        the proposal that was finally applied and ec2-agent's result.
+        """
+        if proposal.mode == "search_replace":
+            files = sorted({e.path for e in proposal.edits})
+            await self._log(f"Applying {len(proposal.edits)} edit(s) to {', '.join(files)}…")
+            try:
+                result = await self.client.apply_patch(
+                    session_id=self.session_id,
+                    edits=[e.as_payload() for e in proposal.edits],
+                    install_command=self.install_command,
+                    test_command=self.test_command,
+                )
+                await self._note_preflight(result)
+                await self.settle(proposal, result)
+                return proposal, result
+            except PatchRejectedError as e:
+                if proposal.recalled:
+                    await self._log(f"Remembered patch rejected ({e}) — asking the LLM")
+                    await self.forget(proposal)
+                    return await self.apply(await self.propose())
+                await self._log(f"Edits rejected ({e}) — retrying as a whole-file fix")
+                await self._uncache(proposal)
+                proposal = await self.propose("whole_file", fallback_reason=str(e), model=proposal.model)
+
+        await self._log(f"Applying fix to {proposal.file_path}…")
+        result = await self.client.apply_fix(
+            session_id=self.session_id,
+            file_path=proposal.file_path,
+            fix_content=proposal.content,
+            install_command=self.install_command,
+            test_command=self.test_command,
+        )
+        await self._note_preflight(result)
+        await self.settle(proposal, result)
+        return proposal, result
+
+    async def _uncache(self, proposal: FixProposal) -> None:
+        """Drop an answer that did not work from the response cache."""
+        if not proposal.cache_key:
+            return
+        try:
+            await llm_cache.discard(proposal.cache_key)
+        except sqlite3.Error as e:
+            logger.warning(f"[LLM-CACHE] could not discard {proposal.cache_key[:12]}: {e}")
+
+    async def _note_preflight(self, result: dict) -> None:
+        """Say so when ec2-agent skipped the test run because the fix does not parse."""
+        preflight = result.get("test_result", {}).get("preflight") or {}
+        if preflight.get("errors"):
+            await self._log(
+                f"Pre-flight: {preflight['errors']} syntax error(s) in {', '.join(preflight.get('checked', []))} "
+                f"— test run skipped ({preflight.get('duration_ms', 0):.0f}ms)"
+            )
+
+    async def _log(self, line: str) -> None:
+        logger.info(f"[FIX] {line}")
+        if self._on_log is not None:
+            await self._on_log(line)
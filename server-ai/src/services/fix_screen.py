@@ -0,0 +1,88 @@
+"""Fix screening — catch degenerate LLM answers before they cost a test run.
+
+An answer is screened out when it cannot possibly fix anything:
+
+    truncated  the completion stopped at `llm_max_tokens` (finish_reason "length")
+    empty      a whole-file answer with no code
+    unchanged  the same file back (compared by content hash, ignoring
+               trailing whitespace), or edits that replace text with itself
+    shrunk     a whole-file answer that kept less than `fix_screen_min_size_ratio`
+               of the file's lines — usually a model that stopped early or
+               elided code ("# ... rest unchanged")
+
+`FixGenerator.propose` screens every answer and asks again with a note
+on what was wrong (`retry_note`), up to `fix_screen_max_retries` times.
+"""
+
+import hashlib
+from dataclasses import dataclass
+
+from src.app.config import api_settings
+from src.llm.edit_blocks import EditBlock
+
+
+@dataclass
+class Rejection:
+    reason: str  # truncated | empty | unchanged | shrunk
+    detail: str
+
+
+def content_hash(text: str) -> str:
+    """Hash of a file's content, blind to trailing whitespace and line endings."""
+    normalized = "\n".join(line.rstrip() for line in text.strip("\n").splitlines())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def screen(
+    finish_reason: str,
+    edits: list[EditBlock] | None = None,
+    content: str = "",
+    current: str | None = None,
+    file_path: str = "",
+) -> Rejection | None:
+    """Why an answer cannot be a fix, or None if it is worth testing.
+
+    Pass `edits` for an edit-mode answer, else the whole-file `content`
+    with the `current` content of `file_path` (None when it is not known).
+    """
+    if finish_reason == "length":
+        return Rejection("truncated", f"the answer was cut off at llm_max_tokens ({api_settings.llm_max_tokens})")
+
+    if edits is not None:
+        if all(content_hash(e.search) == content_hash(e.replace) for e in edits):
+            return Rejection("unchanged", "every edit replaces its SEARCH text with the same code")
+        return None
+
+    if not content.strip():
+        return Rejection("empty", "the answer contains no code")
+    if current is None:
+        return None
+    if content_hash(content) == content_hash(current):
+        return Rejection("unchanged", f"the answer is identical to the current {file_path}")
+    old_lines = len(current.splitlines())
+    new_lines = len(content.splitlines())
+    if old_lines >= api_settings.fix_screen_min_lines and new_lines < old_lines * api_settings.fix_screen_min_size_ratio:
+        return Rejection("shrunk", f"the answer keeps {new_lines} of {old_lines} lines of {file_path}")
+    return None
+
+
+def retry_note(rejection: Rejection, edit_format: str) -> str:
+    """What the next prompt tells the model about its screened-out answer."""
+    if rejection.reason == "truncated":
+        return (
+            "Your previous answer was cut off at the output limit. "
+            "Change only the lines that must change, with as few and as short SEARCH blocks as possible."
+            if edit_format == "search_replace" else
+            "Your previous answer was cut off at the output limit. Return the complete file and nothing else."
+        )
+    if rejection.reason == "unchanged":
+        return (
+            "Your previous answer left the code exactly as it is, but the tests still fail with the error above. "
+            "Make the change that fixes it."
+        )
+    if rejection.reason == "empty":
+        return "Your previous answer contained no code. Return the corrected code."
+    return (
+        f"Your previous answer was rejected: {rejection.detail}. Return the COMPLETE file — every line, "
+        "including the ones you do not change. Never elide code with comments like '... rest unchanged'."
+    )
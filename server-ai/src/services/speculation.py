@@ -0,0 +1,132 @@
+"""Speculative fixes — several candidate answers for one fix, raced on ec2-agent.
+
+One low-temperature answer per iteration means a wrong guess costs a full
+iteration. With `speculative_candidates` > 1 the generator is asked for
+that many answers at once (spread over `speculative_temperatures`), and
+ec2-agent's `POST /fix/speculate` tests them side by side in forked
+workspaces — only the failing tests where the language allows it. The
+first candidate to pass is applied; the next iteration's full run
+verifies it.
+
+If no candidate passes, the first one is applied with a full test run,
+exactly as without speculation, so its partial progress is kept.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from src.app.config import api_settings
+from src.core.exceptions import LLMError
+from src.services.error_groups import is_test_path
+from src.services.fix_batch import batch_payload
+from src.services.fix_generator import FixGenerator, FixProposal
+
+logger = logging.getLogger("rift_server")
+
+LogFn = Callable[[str], Awaitable[None]]
+
+
+def focused_test_command(language: str, errors: list[dict], test_command: str | None) -> str | None:
+    """Command that runs only the failing tests; a custom command is kept as is.
+
+    pytest takes test files as arguments; for other runners (and errors
+    that name no test file) the full default suite runs.
+    """
+    if test_command or language != "python":
+        return test_command
+    files = list(dict.fromkeys(e["file"] for e in errors if e.get("file") and is_test_path(e["file"])))
+    if not files or len(files) < len({e.get("file") for e in errors}):
+        return None  # some errors point outside test files — run everything
+    return f"python -m pytest -v --tb=short {' '.join(files)}"
+
+
+class SpeculativeFix:
+    """
+    Proposes several candidates for one generator's errors and keeps the first that passes.
+
+    Usage:
+        speculation = SpeculativeFix(generator, n=3)
+        proposals = await speculation.propose()              # LLMError if every call failed
+        proposal, result = await speculation.apply(proposals)
+        speculation.report  # {"candidates", "winner", "time_to_green_seconds", "sequential_seconds"}
+    """
+
+    def __init__(self, generator: FixGenerator, n: int, on_log: LogFn | None = None):
+        self.generator = generator
+        self.n = n
+        self._on_log = on_log
+        self.report: dict = {}
+
+    async def propose(self) -> list[FixProposal]:
+        """Candidates from concurrent LLM calls, identical answers removed, in temperature order."""
+        temperatures = api_settings.speculative_temperatures or [api_settings.llm_temperature]
+        await self._log(f"Generating {self.n} candidate fixes (temperatures {', '.join(str(temperatures[i % len(temperatures)]) for i in range(self.n))})…")
+        results = await asyncio.gather(
+            # Never from the response cache: a rerun should sample new candidates
+            *(self.generator.propose(temperature=temperatures[i % len(temperatures)], use_cache=False) for i in range(self.n)),
+            return_exceptions=True,
+        )
+        proposals: list[FixProposal] = []
+        seen: set[str] = set()
+        failures: list[BaseException] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                failures.append(result)
+                continue
+            signature = repr(batch_payload("", result))
+            if signature not in seen:
+                seen.add(signature)
+                proposals.append(result)
+        if not proposals:
+            raise failures[0] if isinstance(failures[0], LLMError) else LLMError(str(failures[0]))
+        if failures:
+            await self._log(f"{len(failures)} candidate call(s) failed: {failures[0]}")
+        if len(proposals) < len(results) - len(failures):
+            await self._log(f"{len(results) - len(failures) - len(proposals)} duplicate candidate(s) dropped")
+        return proposals
+
+    async def apply(self, proposals: list[FixProposal]) -> tuple[FixProposal, dict]:
+        """Race the candidates; the winner is applied, or the first candidate if none passed."""
+        generator = self.generator
+        self.report = {"candidates": len(proposals), "winner": None, "time_to_green_seconds": None, "sequential_seconds": None}
+        if len(proposals) == 1:
+            return await generator.apply(proposals[0])
+
+        test_command = focused_test_command(generator.language, generator.errors, generator.test_command)
+        await self._log(
+            f"Testing {len(proposals)} candidates in parallel workspaces"
+            + (f" ({test_command})" if test_command else "")
+            + "…"
+        )
+        result = await generator.client.speculate_fix(
+            session_id=generator.session_id,
+            candidates=[batch_payload(str(i), p) for i, p in enumerate(proposals)],
+            test_command=test_command,
+        )
+        for c in result.get("candidates", []):
+            await self._log(f"  candidate {int(c['id']) + 1}: {c['status']} ({c.get('duration_seconds', 0):.1f}s)")
+
+        promoted = result.get("promoted")
+        if promoted is None:
+            await self._log("No candidate passed — applying candidate 1 with a full test run")
+            return await generator.apply(proposals[0])
+
+        self.report.update(
+            winner=int(promoted),
+            time_to_green_seconds=result.get("time_to_green_seconds"),
+            sequential_seconds=result.get("sequential_seconds"),
+        )
+        await self._log(
+            f"Candidate {int(promoted) + 1} of {len(proposals)} passed in {result.get('time_to_green_seconds')}s "
+            f"(one at a time: ≥{result.get('sequential_seconds')}s)"
+        )
+        await generator.settle(proposals[int(promoted)], result)
+        return proposals[int(promoted)], result
+
+    async def _log(self, line: str) -> None:
+        logger.info(f"[SPEC] {line}")
+        if self._on_log is not None:
+            await self._on_log(line)
@@ -25,6 +25,8 @@ class GraphState(TypedDict):
 
     # ── Iteration control ──
     current_error: dict[str, Any] | None
+    current_group: Any                       # ErrorGroup: every error sharing current_error's fix target
+    current_groups: list[Any]                # Independent ErrorGroups fixed together this iteration (current_group first)
     iteration: int
     max_iterations: int
 
@@ -36,7 +38,13 @@ class GraphState(TypedDict):
     commit_hash: str | None
 
     # ── Last test run output (for LLM context) ──
-    raw_output: str                          # Full raw output from last test run
+    raw_output: str                          # Last test run's output (fetched in full when it failed and was truncated)
+
+    # ── LLM routing ──
+    model_ledger: Any                        # ModelLedger: per-model usage, fix outcomes, escalation
+
+    # ── Session files ──
+    file_cache: Any                          # FileCache: files read from ec2-agent, invalidated by fix_code
 
     # ── Debug trace (full API call log) ──
     debug_trace: list[dict[str, Any]]        # Every API request+response captured
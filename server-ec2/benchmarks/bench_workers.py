@@ -0,0 +1,125 @@
+"""Load benchmark — EC2 agent throughput vs. uvicorn worker count.
+
+Starts the agent once per worker count, creates a few sessions, and drives
+concurrent `POST /execute` runs against them (one in-flight run per session,
+since runs on the same session are serialized by the session lock).
+
+Requires a reachable Redis and Docker with the executor containers running,
+exactly like production.
+
+Usage (from server-ec2/):
+    python -m benchmarks.bench_workers --repo-url https://github.com/org/repo \
+        --language python --workers 1 2 4 --sessions 8 --duration 120
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+API = "/api/v1"
+
+
+async def _wait_healthy(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{API}/health")).is_success:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("EC2 agent did not become healthy")
+
+
+async def _session_loop(
+    client: httpx.AsyncClient, session_id: str, stop_at: float, latencies: list[float], errors: list[str]
+) -> None:
+    while time.monotonic() < stop_at:
+        t0 = time.monotonic()
+        try:
+            response = await client.post(f"{API}/execute", json={"session_id": session_id})
+            response.raise_for_status()
+            latencies.append(time.monotonic() - t0)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def _run_load(base_url: str, args: argparse.Namespace) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=600.0) as client:
+        await _wait_healthy(client)
+
+        sessions = []
+        for _ in range(args.sessions):
+            response = await client.post(
+                f"{API}/sessions", params={"repo_url": args.repo_url, "language": args.language}
+            )
+            response.raise_for_status()
+            sessions.append(response.json()["session_id"])
+
+        # Warm-up run per session so dependency installs are not measured
+        await asyncio.gather(*(client.post(f"{API}/execute", json={"session_id": s}) for s in sessions))
+
+        latencies: list[float] = []
+        errors: list[str] = []
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(
+            *(_session_loop(client, s, stop_at, latencies, errors) for s in sessions)
+        )
+        elapsed = time.monotonic() - started
+
+        for s in sessions:
+            await client.delete(f"{API}/sessions/{s}")
+
+    return {
+        "runs": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 20 else max(latencies, default=0.0),
+    }
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, EC2_AGENT_UVICORN_WORKERS=str(workers), EC2_AGENT_PORT=str(port))
+    return subprocess.Popen([sys.executable, "-m", "src.app.api"], env=env)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo-url", required=True)
+    parser.add_argument("--language", default="python", choices=["python", "nodejs"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions (one run in flight each)")
+    parser.add_argument("--duration", type=float, default=120.0, help="Measured seconds per worker count")
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        server = _start_server(workers, args.port)
+        try:
+            stats = asyncio.run(_run_load(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        rows.append((workers, stats))
+        print(f"workers={workers}: {stats}", flush=True)
+
+    baseline = rows[0][1]["throughput"] or 1.0
+    print("\nworkers  runs  errors  runs/s   speedup  p50(s)  p95(s)")
+    for workers, stats in rows:
+        print(
+            f"{workers:>7}  {stats['runs']:>4}  {stats['errors']:>6}  {stats['throughput']:>6.2f}  "
+            f"{stats['throughput'] / baseline:>7.2f}x  {stats['p50']:>6.2f}  {stats['p95']:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from src.endpoints import (
     streaming_execution_router,
     fix_router,
     files_router,
+    outputs_router,
 )
 
 
@@ -37,6 +38,8 @@ async def lifespan(app: FastAPI):
     # --- Shutdown ---
     from src.services.session_store import session_store as _store
     _store.close()
+    from src.services.output_store import output_store
+    output_store.close()
     print("Redis connection closed")
     print("Shutting down...")
 
@@ -69,5 +72,6 @@ def init_app() -> FastAPI:
     app.include_router(streaming_execution_router, prefix=api_prefix)
     app.include_router(fix_router, prefix=api_prefix)
     app.include_router(files_router, prefix=api_prefix)
+    app.include_router(outputs_router, prefix=api_prefix)
 
     return app
\ No newline at end of file
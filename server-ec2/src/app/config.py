@@ -20,7 +20,10 @@ class ApiSettings(BaseSettings):
     port: int = Field(default=8001, description="Port to listen on")
     uvicorn_workers: int = Field(
         default=1,
-        description="Number of uvicorn worker processes.",
+        description=(
+            "Number of uvicorn worker processes. Safe to raise: cross-request "
+            "state and per-session locks live in Redis."
+        ),
     )
     reload: bool = Field(
         default=False,
@@ -65,6 +68,101 @@ class ApiSettings(BaseSettings):
         default=7200,
         description="Session TTL in seconds (default: 2 hours)",
     )
+    session_events_maxlen: int = Field(
+        default=1000,
+        description="Approximate max entries kept in each session's status event stream",
+    )
+    session_events_block_ms: int = Field(
+        default=2000,
+        description="How long one SSE poll blocks on the event stream (must stay below the Redis socket timeout)",
+    )
+    session_lock_ttl_seconds: int = Field(
+        default=60,
+        description="Session lock expiry; renewed while held, so only matters if a worker dies",
+    )
+    session_lock_wait_seconds: float = Field(
+        default=900.0,
+        description=(
+            "Max time an operation waits behind one running operation before failing with 409; "
+            "above the longest operation (server-ai allows test runs and fixes 600s)"
+        ),
+    )
+    op_ticket_ttl_seconds: int = Field(
+        default=30,
+        description="Operation queue ticket expiry; heartbeated while waiting/running, so only matters if a worker dies",
+    )
+    run_log_maxlen: int = Field(
+        default=100_000,
+        description="Approximate max events retained per execution run log",
+    )
+    raw_output_head_chars: int = Field(
+        default=2000,
+        description="Characters of test output kept at the start of the inline excerpt",
+    )
+    raw_output_tail_chars: int = Field(
+        default=6000,
+        description="Characters of test output kept at the end of the inline excerpt (summaries live there)",
+    )
+    raw_output_compression_level: int = Field(
+        default=6,
+        description="zlib level (1-9) for stored raw test output",
+    )
+    patch_fuzzy_min_ratio: float = Field(
+        default=0.85,
+        description="Minimum similarity (0-1) for a fuzzy SEARCH match in POST /patch",
+    )
+    sse_keepalive_seconds: int = Field(
+        default=15,
+        description="Idle seconds before an SSE keep-alive comment is sent",
+    )
+    speculative_max_candidates: int = Field(
+        default=4,
+        description="Candidate fixes tested concurrently (each in its own forked workspace) by POST /fix/speculate",
+    )
+    speculative_timeout_seconds: int = Field(
+        default=300,
+        description="Time POST /fix/speculate waits for a passing candidate before giving up",
+    )
+    preflight_enabled: bool = Field(
+        default=True,
+        description="Syntax-check written files before a fix's test run; skip the run when they do not parse",
+    )
+    files_batch_max_paths: int = Field(
+        default=200,
+        description="Most paths POST /files/batch reads in one call",
+    )
+    import_graph_max_depth: int = Field(
+        default=2,
+        description="Hops through imported test helpers when resolving a test's implementation modules",
+    )
+    code_index_chunk_lines: int = Field(
+        default=40,
+        description="Lines per code-search window (windows overlap by a quarter)",
+    )
+    code_index_max_files: int = Field(
+        default=5000,
+        description="Most files indexed for code search per session",
+    )
+    code_index_max_file_bytes: int = Field(
+        default=256_000,
+        description="Files larger than this are left out of the code-search index",
+    )
+    code_search_max_results: int = Field(
+        default=20,
+        description="Most snippets GET /files/search returns in one call",
+    )
+    repo_map_max_files: int = Field(
+        default=2000,
+        description="Most code files outlined by GET /files/map",
+    )
+    repo_map_max_file_bytes: int = Field(
+        default=256_000,
+        description="Files larger than this are listed in the repo map without symbols",
+    )
+    repo_map_blob_ttl: int = Field(
+        default=604800,
+        description="Seconds a file outline stays cached by blob hash (shared across sessions)",
+    )
 
     # ── Auth ──
     api_key: str = Field(
@@ -11,7 +11,12 @@ logger = logging.getLogger("ec2_agent")
 
 
 class DockerManager:
-    """Singleton Docker client manager."""
+    """Singleton Docker client manager.
+
+    One client per worker process. It holds no session state — anything
+    that must be shared between uvicorn workers (locks, install markers,
+    run logs) lives in Redis.
+    """
 
     _instance = None
     _client = None
@@ -47,4 +47,41 @@ class SessionAlreadyExistsError(Exception):
 
 class AuthenticationError(Exception):
     """Raised when API key is missing or invalid."""
-    status_code = 401
\ No newline at end of file
+    status_code = 401
+
+class RunNotFoundError(Exception):
+    """Raised when a streaming run log does not exist or has expired."""
+    status_code = 404
+
+
+class SessionBusyError(Exception):
+    """Raised when a session's workspace lock could not be acquired in time."""
+    status_code = 409  # Conflict
+
+
+class OutputNotFoundError(Exception):
+    """Raised when a stored test output does not exist or has expired."""
+    status_code = 404
+
+
+class PatchApplyError(Exception):
+    """Raised when a search/replace edit cannot be located in its file."""
+    status_code = 422  # Unprocessable Entity
+
+
+class FixConflictError(Exception):
+    """Raised when two fixes in a batch touch the same file."""
+    status_code = 409  # Conflict
+
+
+class BatchPatchError(PatchApplyError):
+    """Raised when edits of one or more fixes in a batch cannot be located.
+
+    `detail` names every rejected fix so the caller can regenerate just those.
+    """
+
+    def __init__(self, rejected: dict[str, str]):
+        self.rejected = rejected
+        message = "; ".join(f"fix {fix_id}: {reason}" for fix_id, reason in rejected.items())
+        super().__init__(message)
+        self.detail = {"message": message, "rejected": rejected}
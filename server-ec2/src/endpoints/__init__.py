@@ -4,6 +4,7 @@ from src.endpoints.execution import router as execution_router
 from src.endpoints.streaming_execution import router as streaming_execution_router
 from src.endpoints.fix import router as fix_router
 from src.endpoints.files import router as files_router
+from src.endpoints.outputs import router as outputs_router
 
 __all__ = [
     "health_router",
@@ -12,4 +13,5 @@ __all__ = [
     "streaming_execution_router",
     "fix_router",
     "files_router",
+    "outputs_router",
 ]
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
 
 from src.app.handlers import handle_endpoint
-from src.models import ExecuteTestsRequest
+from src.models import ExecuteTestsRequest, ExecuteTestsResponse
+from src.services.operation_queue import op_queue, test_run_key
 from src.services.test_runner import TestRunner
 from src.services.session_store import session_store
 
@@ -11,31 +13,44 @@ router = APIRouter(tags=["Execution"])
 @router.post("/execute")
 @handle_endpoint
 async def execute_tests(request: ExecuteTestsRequest):
-    """Run tests for a session."""
+    """Run tests for a session (fail-fast with `max_failures`)."""
     # Validate session exists (raises SessionNotFoundError if missing)
     session = session_store.get(request.session_id)
 
-    # Update session status
-    session_store.update(request.session_id, {"status": "running"})
-
     # Pull metadata from session
     repo_url = session["repo_url"]
     language = session["language"]
     branch = request.branch or "main"  # Use provided branch or default
 
-    # Run tests via TestRunner
-    test_runner = TestRunner()
-    result = test_runner.run_tests(
-        repo_url=repo_url,
-        session_id=request.session_id,
-        language=language,
-        branch=branch,
-        install_command=request.install_command,
-        test_command=request.test_command,
+    def _run() -> dict:
+        # Update session status
+        session_store.update(request.session_id, {"status": "running"})
+
+        # Run tests via TestRunner
+        test_runner = TestRunner()
+        result = test_runner.run_tests(
+            repo_url=repo_url,
+            session_id=request.session_id,
+            language=language,
+            branch=branch,
+            install_command=request.install_command,
+            test_command=request.test_command,
+            max_failures=request.max_failures,
+        )
+
+        # Update session status based on result
+        new_status = "completed" if result.status == "success" else "failed"
+        session_store.update(request.session_id, {"status": new_status})
+        return result.model_dump()
+
+    # Queued behind any other install/test/fix/commit on this session; an identical
+    # run already at the back of the queue is shared instead of run twice.
+    # Blocking Docker work runs off the event loop so one worker can serve other sessions.
+    result = await run_in_threadpool(
+        op_queue.run,
+        request.session_id,
+        "test",
+        _run,
+        test_run_key(branch, request.install_command, request.test_command, request.max_failures),
     )
-
-    # Update session status based on result
-    new_status = "completed" if result.status == "success" else "failed"
-    session_store.update(request.session_id, {"status": new_status})
-
-    return result
\ No newline at end of file
+    return ExecuteTestsResponse(**result)
@@ -1,16 +1,50 @@
-"""Files endpoint — read file contents from a cloned session repo."""
+"""Files endpoints — read-only views of a cloned session repo.
 
+These never join the session's operation queue: they can run while a test
+run, fix or commit is in progress.
+"""
+
+import hashlib
 import os
 
 from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 
+from src.app.config import api_settings
 from src.app.handlers import handle_endpoint
+from src.models import ReadFilesRequest
+from src.services.code_index import code_index
 from src.services.git_service import GitService
+from src.services.import_graph import import_graph
+from src.services.repo_map import repo_map
 from src.services.session_store import session_store
 
 router = APIRouter(tags=["Files"])
 
 
+def _resolve(repo_path: str, file_path: str) -> str:
+    """Absolute path of `file_path` inside the repo; 400 if it escapes it."""
+    abs_path = os.path.normpath(os.path.join(repo_path, file_path))
+
+    # Security: ensure the resolved path is still inside the repo
+    if not abs_path.startswith(os.path.normpath(repo_path)):
+        raise HTTPException(status_code=400, detail=f"Invalid file path — path traversal not allowed: {file_path}")
+    return abs_path
+
+
+def _read(abs_path: str) -> dict | None:
+    """Content, sha256 and size of a file, or None if it does not exist."""
+    if not os.path.isfile(abs_path):
+        return None
+    with open(abs_path, "rb") as f:
+        data = f.read()
+    return {
+        "content": data.decode("utf-8", errors="replace"),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size_bytes": len(data),
+    }
+
+
 @router.get("/files")
 @handle_endpoint
 async def read_file(
@@ -22,24 +56,112 @@ async def read_file(
     session_store.get(session_id)  # raises SessionNotFoundError if missing
 
     git_service = GitService()
-    repo_path = git_service.get_repo_path(session_id)
+    found = _read(_resolve(git_service.get_repo_path(session_id), file_path))
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"File not found in session: {file_path}")
 
-    abs_path = os.path.join(repo_path, file_path)
-    abs_path = os.path.normpath(abs_path)
+    return {"session_id": session_id, "file_path": file_path, **found}
 
-    # Security: ensure the resolved path is still inside the repo
-    if not abs_path.startswith(os.path.normpath(repo_path)):
-        raise HTTPException(status_code=400, detail="Invalid file path — path traversal not allowed")
 
-    if not os.path.isfile(abs_path):
-        raise HTTPException(status_code=404, detail=f"File not found in session: {file_path}")
+@router.post("/files/batch")
+@handle_endpoint
+async def read_files(request: ReadFilesRequest):
+    """Read many files of a session repo in one call.
 
-    with open(abs_path, "r", encoding="utf-8", errors="replace") as f:
-        content = f.read()
+    Missing files come back as null rather than failing the request, so
+    callers can send every candidate path they are guessing at.
+    """
+    session_store.get(request.session_id)  # raises SessionNotFoundError if missing
+    paths = list(dict.fromkeys(request.paths))
+    if len(paths) > api_settings.files_batch_max_paths:
+        raise HTTPException(
+            status_code=400, detail=f"At most {api_settings.files_batch_max_paths} paths per request, got {len(paths)}"
+        )
 
+    repo_path = GitService().get_repo_path(request.session_id)
+    resolved = {path: _resolve(repo_path, path) for path in paths}
+
+    def _read_all() -> dict[str, dict | None]:
+        return {path: _read(abs_path) for path, abs_path in resolved.items()}
+
+    files = await run_in_threadpool(_read_all)
     return {
-        "session_id": session_id,
-        "file_path": file_path,
-        "content": content,
-        "size_bytes": len(content.encode("utf-8")),
+        "session_id": request.session_id,
+        "files": files,
+        "found": sum(f is not None for f in files.values()),
     }
+
+
+@router.get("/files/implementations")
+@handle_endpoint
+async def resolve_implementations(
+    session_id: str = Query(..., description="The session ID"),
+    file_path: str = Query(..., description="Relative path of a test file within the repo"),
+):
+    """Resolve the implementation modules a test file exercises from the workspace's import graph.
+
+    `implementations` lists the workspace modules the test (and test
+    helpers it imports) depend on, the one named like the test first;
+    `imports` lists everything the file itself imports from the workspace.
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    repo_path = GitService().get_repo_path(session_id)
+    abs_path = _resolve(repo_path, file_path)
+    if not os.path.isfile(abs_path):
+        raise HTTPException(status_code=404, detail=f"File not found in session: {file_path}")
+
+    file_path = os.path.relpath(abs_path, repo_path)
+    resolved = await run_in_threadpool(import_graph.implementations, session_id, repo_path, file_path)
+    return {"session_id": session_id, "file_path": file_path, **resolved}
+
+
+@router.get("/files/search")
+@handle_endpoint
+async def search_code(
+    session_id: str = Query(..., description="The session ID"),
+    query: str = Query(..., min_length=1, description="Free text, e.g. an error message and trace"),
+    k: int = Query(default=5, ge=1, description="Number of snippets to return"),
+    exclude: list[str] = Query(default=[], description="Paths to leave out (e.g. files already in the prompt)"),
+):
+    """Find the code most relevant to `query` with the session's BM25 index.
+
+    Returns line windows ranked by score, each with its current text;
+    at most one window per overlapping region of a file.
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+    if k > api_settings.code_search_max_results:
+        raise HTTPException(
+            status_code=400, detail=f"At most {api_settings.code_search_max_results} results per request, got {k}"
+        )
+
+    repo_path = GitService().get_repo_path(session_id)
+    found = await run_in_threadpool(code_index.search, session_id, repo_path, query, k, exclude)
+    return {"session_id": session_id, "query": query, **found}
+
+
+@router.get("/files/map")
+@handle_endpoint
+async def read_repo_map(session_id: str = Query(..., description="The session ID")):
+    """Outline the session's code: every source file with its top-level symbols and signatures.
+
+    `files` maps each path to symbol lines (class members indented by two
+    spaces). Outlines are cached by blob hash, so only files whose content
+    was never seen are parsed (`parsed`); the rest are `cached`.
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    repo_path = GitService().get_repo_path(session_id)
+    built = await run_in_threadpool(repo_map.build, session_id, repo_path)
+    return {"session_id": session_id, "file_count": len(built["files"]), **built}
+
+
+@router.get("/diff")
+@handle_endpoint
+async def read_diff(session_id: str = Query(..., description="The session ID")):
+    """Show the uncommitted changes (e.g. applied fixes) in a session repo."""
+    # Validate session
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    git_service = GitService()
+    return {"session_id": session_id, **git_service.diff(session_id)}
@@ -1,46 +1,357 @@
+import os
+import time
+
 from fastapi import APIRouter
+from starlette.concurrency import run_in_threadpool
 
+from src.app.config import api_settings
 from src.app.handlers import handle_endpoint
-from src.models import ApplyFixRequest, CommitFixRequest
+from src.core.exceptions import BatchPatchError, FixConflictError, PatchApplyError
+from src.models import (
+    ApplyBatchRequest,
+    ApplyFixRequest,
+    ApplyPatchRequest,
+    BatchFix,
+    CommitFixRequest,
+    ExecuteTestsResponse,
+    PatchEdit,
+    SpeculateRequest,
+)
 from src.services.git_service import GitService
+from src.services.operation_queue import op_queue
 from src.services.session_store import session_store
+from src.services.speculation import Candidate, Speculation
 from src.services.test_runner import TestRunner
+from src.utils.patching import apply_edits, unified_diff
 
 router = APIRouter(tags=["Fix"])
 
 
+def _tests_outcome(result: ExecuteTestsResponse) -> str:
+    """How a fix's test run ended, for response messages."""
+    if result.preflight and result.preflight["errors"]:
+        return f"Test run skipped: {result.preflight['errors']} syntax error(s) in the written file(s)."
+    return f"Tests {'passed' if result.status == 'success' else 'failed'}."
+
+
+def _check_rewrite(path: str, before: str | None, content: str) -> None:
+    """Refuse a whole-file rewrite that cannot be a fix, before anything is written."""
+    if before is not None and content == before:
+        raise PatchApplyError(f"{path}: the fix leaves the file unchanged")
+    if before and before.strip() and not content.strip():
+        raise PatchApplyError(f"{path}: the fix would empty the file")
+
+
+def _plan_edits(
+    git_service: GitService, session_id: str, repo_root: str, edits: list[PatchEdit]
+) -> tuple[dict[str, str], list[dict], str]:
+    """Place edits in memory without writing anything.
+
+    Returns (path → new content, per-file edit placements, unified diff).
+    Raises PatchApplyError for a path outside the repo, an edit that
+    cannot be located, or edits that leave every file as it was.
+    """
+    edits_by_file: dict[str, list[tuple[str, str]]] = {}
+    for edit in edits:
+        abs_path = os.path.normpath(os.path.join(repo_root, edit.path))
+        if not abs_path.startswith(repo_root + os.sep):
+            raise PatchApplyError(f"{edit.path}: path is outside the repository")
+        edits_by_file.setdefault(edit.path, []).append((edit.search, edit.replace))
+
+    planned: dict[str, str] = {}
+    files = []
+    diffs = []
+    changed = False
+    for path, file_edits in edits_by_file.items():
+        before = git_service.read_file(session_id, path)
+        after, results = apply_edits(before, file_edits, path, api_settings.patch_fuzzy_min_ratio)
+        planned[path] = after
+        changed = changed or after != before
+        diffs.append(unified_diff(path, before or "", after))
+        files.append({
+            "path": path,
+            "edits": [
+                {"strategy": r.strategy, "start_line": r.start_line, "ratio": r.ratio}
+                for r in results
+            ],
+        })
+    if not changed:
+        raise PatchApplyError(f"{', '.join(edits_by_file)}: the edits leave the file(s) unchanged")
+    return planned, files, "".join(diffs)
+
+
+def _plan_fix(
+    git_service: GitService, session_id: str, repo_root: str, fix: BatchFix
+) -> tuple[dict[str, str], list[dict], str]:
+    """`_plan_edits` for a batch fix, which may also be a whole-file rewrite."""
+    if fix.edits:
+        return _plan_edits(git_service, session_id, repo_root, fix.edits)
+    abs_path = os.path.normpath(os.path.join(repo_root, fix.file_path))
+    if not abs_path.startswith(repo_root + os.sep):
+        raise PatchApplyError(f"{fix.file_path}: path is outside the repository")
+    before = git_service.read_file(session_id, fix.file_path)
+    _check_rewrite(fix.file_path, before, fix.fix_content)
+    diff = unified_diff(fix.file_path, before or "", fix.fix_content)
+    return {fix.file_path: fix.fix_content}, [{"path": fix.file_path, "edits": []}], diff
+
+
 @router.post("/fix")
 @handle_endpoint
 async def apply_fix(request: ApplyFixRequest):
-    """Apply AI-generated fix locally and run tests (no git operations)."""
+    """Apply AI-generated fix locally and run tests (no git operations).
+
+    A rewrite identical to the file, or one that empties it, fails with 422
+    before anything is written.
+    """
     # Validate session exists (raises SessionNotFoundError if missing)
     session = session_store.get(request.session_id)
 
     git_service = GitService()
 
-    # 1. Write the fixed file to disk
-    git_service.write_file(request.session_id, request.file_path, request.fix_content)
-
-    # 2. Run tests with the fix applied
-    test_runner = TestRunner()
-    result = test_runner.run_tests(
-        repo_url=session["repo_url"],
-        session_id=request.session_id,
-        language=session["language"],
-        branch=session.get("branch", "main"),  # Use session branch, not a hardcoded value
-        install_command=request.install_command,
-        test_command=request.test_command,
-    )
+    def _apply():
+        # Write + test as one queued operation so no other run sees a half-applied fix
+        # 1. Write the fixed file to disk — unless it is no fix at all
+        _check_rewrite(request.file_path, git_service.read_file(request.session_id, request.file_path), request.fix_content)
+        git_service.write_file(request.session_id, request.file_path, request.fix_content)
+
+        # 2. Run tests with the fix applied
+        test_runner = TestRunner()
+        result = test_runner.run_tests(
+            repo_url=session["repo_url"],
+            session_id=request.session_id,
+            language=session["language"],
+            branch=session.get("branch", "main"),  # Use session branch, not a hardcoded value
+            install_command=request.install_command,
+            test_command=request.test_command,
+            check_paths=[request.file_path],
+        )
+
+        # Update session status in Redis
+        new_status = "fix_verified" if result.status == "success" else "fix_failed"
+        session_store.update(request.session_id, {"status": new_status})
+        return result
+
+    result = await run_in_threadpool(op_queue.run, request.session_id, "fix", _apply)
+
+    return {
+        "success": result.status == "success",
+        "file_updated": True,
+        "test_result": result.dict(),
+        "message": f"Fix applied. {_tests_outcome(result)}",
+    }
+
+
+@router.post("/patch")
+@handle_endpoint
+async def apply_patch(request: ApplyPatchRequest):
+    """Apply search/replace edits to one or more files and run tests.
+
+    Every edit is located before anything is written: if one cannot be
+    placed (see `src.utils.patching`), the request fails with 422 and the
+    workspace is untouched, so the caller can fall back to a full-file fix.
+    """
+    session = session_store.get(request.session_id)
 
-    # Update session status in Redis
-    new_status = "fix_verified" if result.status == "success" else "fix_failed"
-    session_store.update(request.session_id, {"status": new_status})
+    git_service = GitService()
+    repo_root = os.path.normpath(git_service.get_repo_path(request.session_id))
+
+    def _patch():
+        # 1. Locate every edit in memory (per file, in request order)
+        planned, files, diff = _plan_edits(git_service, request.session_id, repo_root, request.edits)
+
+        # 2. All edits placed — write, then test
+        for path, content in planned.items():
+            git_service.write_file(request.session_id, path, content)
+
+        test_runner = TestRunner()
+        result = test_runner.run_tests(
+            repo_url=session["repo_url"],
+            session_id=request.session_id,
+            language=session["language"],
+            branch=session.get("branch", "main"),
+            install_command=request.install_command,
+            test_command=request.test_command,
+            check_paths=list(planned),
+        )
+
+        new_status = "fix_verified" if result.status == "success" else "fix_failed"
+        session_store.update(request.session_id, {"status": new_status})
+        return result, files, diff
+
+    result, files, diff = await run_in_threadpool(op_queue.run, request.session_id, "fix", _patch)
 
     return {
         "success": result.status == "success",
         "file_updated": True,
+        "files": files,
+        "diff": diff,
         "test_result": result.dict(),
-        "message": f"Fix applied. Tests {'passed' if result.status == 'success' else 'failed'}.",
+        "message": f"Patch applied to {len(files)} file(s). {_tests_outcome(result)}",
+    }
+
+
+@router.post("/fix/batch")
+@handle_endpoint
+async def apply_batch(request: ApplyBatchRequest):
+    """Apply several independent fixes together and run tests once.
+
+    Each fix is search/replace edits or a whole-file rewrite. No two fixes
+    may touch the same file (409). Every fix is placed before anything is
+    written: if edits of some fixes cannot be located the request fails
+    with 422 naming those fixes, and the workspace is untouched.
+    """
+    session = session_store.get(request.session_id)
+
+    owners: dict[str, str] = {}
+    for fix in request.fixes:
+        for path in sorted(fix.paths):
+            if path in owners:
+                raise FixConflictError(f"{path}: touched by fixes {owners[path]} and {fix.id}")
+            owners[path] = fix.id
+
+    git_service = GitService()
+    repo_root = os.path.normpath(git_service.get_repo_path(request.session_id))
+
+    def _batch():
+        # 1. Plan every fix in memory; collect rejections instead of stopping at the first
+        planned: dict[str, str] = {}
+        fixes = []
+        rejected: dict[str, str] = {}
+        for fix in request.fixes:
+            try:
+                contents, files, diff = _plan_fix(git_service, request.session_id, repo_root, fix)
+            except PatchApplyError as e:
+                rejected[fix.id] = str(e)
+                continue
+            planned.update(contents)
+            fixes.append({"id": fix.id, "files": files, "diff": diff})
+        if rejected:
+            raise BatchPatchError(rejected)
+
+        # 2. All fixes placed — write, then test once
+        for path, content in planned.items():
+            git_service.write_file(request.session_id, path, content)
+
+        test_runner = TestRunner()
+        result = test_runner.run_tests(
+            repo_url=session["repo_url"],
+            session_id=request.session_id,
+            language=session["language"],
+            branch=session.get("branch", "main"),
+            install_command=request.install_command,
+            test_command=request.test_command,
+            check_paths=list(planned),
+        )
+
+        new_status = "fix_verified" if result.status == "success" else "fix_failed"
+        session_store.update(request.session_id, {"status": new_status})
+        return result, fixes
+
+    result, fixes = await run_in_threadpool(op_queue.run, request.session_id, "fix", _batch)
+
+    return {
+        "success": result.status == "success",
+        "file_updated": True,
+        "fixes": fixes,
+        "diff": "".join(f["diff"] for f in fixes),
+        "test_result": result.dict(),
+        "message": (
+            f"{len(fixes)} fix(es) applied to {sum(len(f['files']) for f in fixes)} file(s). "
+            f"{_tests_outcome(result)}"
+        ),
+    }
+
+
+@router.post("/fix/speculate")
+@handle_endpoint
+async def speculate_fix(request: SpeculateRequest):
+    """Test candidate fixes for the same failure concurrently; keep the first that passes.
+
+    Each candidate runs `test_command` (typically just the failing tests)
+    in its own forked workspace. The first to pass is written to the
+    session's workspace and the other runs are stopped; if none passes,
+    the workspace is untouched. Candidates whose edits cannot be placed
+    are reported as rejected and not run. At most
+    `speculative_max_candidates` are tried, in request order.
+
+    `sequential_seconds` estimates the same search done one candidate at a
+    time in request order (a lower bound when earlier candidates were
+    stopped before finishing).
+    """
+    session = session_store.get(request.session_id)
+
+    git_service = GitService()
+    repo_root = os.path.normpath(git_service.get_repo_path(request.session_id))
+    requested = request.candidates[:api_settings.speculative_max_candidates]
+
+    def _speculate():
+        # 1. Place every candidate in memory against the current workspace
+        candidates: list[Candidate] = []
+        planned: dict[str, tuple[list[dict], str]] = {}
+        reports: dict[str, dict] = {}
+        for fix in requested:
+            try:
+                contents, files, diff = _plan_fix(git_service, request.session_id, repo_root, fix)
+            except PatchApplyError as e:
+                reports[fix.id] = {"id": fix.id, "status": "rejected", "duration_seconds": 0.0, "message": str(e)}
+                continue
+            candidates.append(Candidate(fix.id, contents))
+            planned[fix.id] = (files, diff)
+
+        # 2. Test them side by side in forked workspaces
+        winner = None
+        started = time.monotonic()
+        if candidates:
+            results, winner = Speculation(
+                request.session_id, session["language"], session.get("branch", "main"), session["repo_url"]
+            ).run(candidates, request.test_command)
+            for r in results:
+                reports[r.id] = {
+                    "id": r.id,
+                    "status": r.status,
+                    "duration_seconds": round(r.duration, 2),
+                    "message": r.message,
+                    "failed": r.test_result.get("failed", 0),
+                    "errors": r.test_result.get("errors", [])[:5],
+                }
+        time_to_green = time.monotonic() - started if winner else None
+
+        # 3. Promote the winner
+        if winner is not None:
+            for path, content in next(c for c in candidates if c.id == winner.id).contents.items():
+                git_service.write_file(request.session_id, path, content)
+            session_store.update(request.session_id, {"status": "fix_verified"})
+
+        ordered = [reports[f.id] for f in requested]
+        sequential = None
+        if winner is not None:
+            # Candidates up to the winner, one after another
+            sequential = 0.0
+            for report in ordered:
+                sequential += report["duration_seconds"]
+                if report["id"] == winner.id:
+                    break
+        return winner, ordered, planned, time_to_green, sequential
+
+    winner, ordered, planned, time_to_green, sequential = await run_in_threadpool(
+        op_queue.run, request.session_id, "fix", _speculate
+    )
+
+    files, diff = planned[winner.id] if winner else ([], "")
+    return {
+        "success": winner is not None,
+        "promoted": winner.id if winner else None,
+        "file_updated": winner is not None,
+        "files": files,
+        "diff": diff,
+        "test_result": winner.test_result if winner else {},
+        "candidates": ordered,
+        "time_to_green_seconds": round(time_to_green, 2) if time_to_green is not None else None,
+        "sequential_seconds": round(sequential, 2) if sequential is not None else None,
+        "message": (
+            f"Candidate {winner.id} of {len(ordered)} passed and was applied."
+            if winner else f"None of {len(ordered)} candidate(s) passed; workspace unchanged."
+        ),
     }
 
 
@@ -53,20 +364,24 @@ async def commit_fix(request: CommitFixRequest):
 
     git_service = GitService()
 
-    # 1. Create/checkout the fix branch
-    git_service.create_branch(request.session_id, request.branch_name)
+    def _commit() -> str:
+        # 1. Create/checkout the fix branch
+        git_service.create_branch(request.session_id, request.branch_name)
 
-    # 2. Commit and push (file should already be written by /fix)
-    commit_hash = git_service.commit_and_push(
-        session_id=request.session_id,
-        file_path=request.file_path,
-        commit_message=request.commit_message,
-        branch_name=request.branch_name,
-        github_token=request.github_token,
-    )
+        # 2. Commit and push (files should already be written by /fix or /patch)
+        commit_hash = git_service.commit_and_push(
+            session_id=request.session_id,
+            file_paths=list(dict.fromkeys([request.file_path, *request.file_paths])),
+            commit_message=request.commit_message,
+            branch_name=request.branch_name,
+            github_token=request.github_token,
+        )
+
+        # Update session status in Redis
+        session_store.update(request.session_id, {"status": "committed"})
+        return commit_hash
 
-    # Update session status in Redis
-    session_store.update(request.session_id, {"status": "committed"})
+    commit_hash = await run_in_threadpool(op_queue.run, request.session_id, "commit", _commit)
 
     return {
         "success": True,
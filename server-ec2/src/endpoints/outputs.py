@@ -0,0 +1,43 @@
+"""Outputs endpoint — lazy retrieval of stored raw test output."""
+
+from fastapi import APIRouter, Query
+from fastapi.responses import Response
+
+from src.app.handlers import handle_endpoint
+from src.services.output_store import output_store
+from src.services.session_store import session_store
+
+router = APIRouter(tags=["Outputs"])
+
+
+@router.get("/outputs/{output_id}")
+@handle_endpoint
+async def read_output(
+    output_id: str,
+    session_id: str = Query(..., description="The session ID the output belongs to"),
+    offset: int = Query(default=0, ge=0, description="First byte to return"),
+    length: int | None = Query(default=None, gt=0, description="Max bytes to return (default: to the end)"),
+):
+    """Return a run's full raw output, or a byte range of it, as plain text.
+
+    `X-Output-Size` always carries the full size so clients can page through
+    large outputs; partial responses use 206 and `Content-Range`.
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    chunk, total = output_store.read(session_id, output_id, offset, length)
+
+    headers = {"X-Output-Size": str(total)}
+    status_code = 200
+    if offset or len(chunk) < total:
+        status_code = 206
+        end = offset + len(chunk) - 1 if chunk else offset
+        headers["Content-Range"] = f"bytes {offset}-{end}/{total}"
+
+    # A range may split a multi-byte character; clients joining ranges get it back intact
+    return Response(
+        content=chunk,
+        status_code=status_code,
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
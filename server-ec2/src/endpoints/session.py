@@ -1,20 +1,39 @@
 """Session endpoints — Redis-backed CRUD + DELETE with repo cleanup."""
 
+import time
 import uuid
 from datetime import datetime, timezone
+from typing import Generator
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from src.app.config import api_settings
 from src.app.handlers import handle_endpoint
+from src.services.code_index import code_index
 from src.services.git_service import GitService
+from src.services.import_graph import import_graph
+from src.services.install_markers import install_markers
+from src.services.run_log import run_logs
+from src.services.operation_queue import op_queue
+from src.services.output_store import output_store
+from src.services.repo_map import repo_map
 from src.services.session_store import session_store
+from src.utils.sse import SSE_HEADERS, sse_comment, sse_event
 
 router = APIRouter(tags=["Session"])
 
 
 @router.post("/sessions", status_code=201)
 @handle_endpoint
-async def create_session(repo_url: str, language: str, user_id: str | None = None, github_token: str | None = None):
+async def create_session(
+    background_tasks: BackgroundTasks,
+    repo_url: str,
+    language: str,
+    user_id: str | None = None,
+    github_token: str | None = None,
+):
     """Clone repo and create a new session.
 
     Args:
@@ -39,14 +58,74 @@ async def create_session(repo_url: str, language: str, user_id: str | None = Non
     }
 
     session_store.create(session_id, session_data)
+
+    # Index for code search once the response is out; a search that arrives first builds it itself
+    background_tasks.add_task(code_index.build, session_id, str(repo_path))
     return session_data
 
 
 @router.get("/sessions/{session_id}")
 @handle_endpoint
 async def get_session(session_id: str):
-    """Get session details."""
-    return session_store.get(session_id)
+    """Get session details, including its queued workspace operations."""
+    session = session_store.get(session_id)
+    session["queue"] = op_queue.snapshot(session_id)
+    return session
+
+
+def _tail_session_events(session_id: str, last_id: str) -> Generator[str, None, None]:
+    """Replay events after `last_id`, then follow the stream until the session is gone."""
+    last_sent = time.monotonic()
+
+    while True:
+        events = session_store.read_events(
+            session_id, last_id=last_id, block_ms=api_settings.session_events_block_ms
+        )
+        for event_id, event in events:
+            last_id = event_id
+            yield sse_event(event, event_id=event_id)
+            last_sent = time.monotonic()
+
+        if events:
+            continue
+
+        if not session_store.exists(session_id):
+            yield sse_event({"type": "session_closed", "session_id": session_id})
+            return
+
+        if time.monotonic() - last_sent >= api_settings.sse_keepalive_seconds:
+            yield sse_comment()
+            last_sent = time.monotonic()
+
+
+@router.get("/sessions/{session_id}/events")
+@handle_endpoint
+async def stream_session_events(
+    session_id: str,
+    last_event_id: str | None = Query(
+        default=None, description="Resume after this event id (alternative to the Last-Event-ID header)"
+    ),
+    last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    """Follow a session's status transitions as Server-Sent Events.
+
+    Each event carries its Redis Stream id, so a reconnecting client that
+    sends `Last-Event-ID` only receives what it missed. Without one, the
+    retained history is replayed first.
+
+    Event payloads:
+    - {"type": "status", "status", "previous_status", "previous_status_ms", "at"}
+    - {"type": "session_closed"} — session deleted or expired; stream ends
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    resume_from = last_event_id_header or last_event_id or "0-0"
+
+    return StreamingResponse(
+        _tail_session_events(session_id, resume_from),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
 
 @router.get("/sessions")
@@ -80,12 +159,23 @@ async def delete_session(session_id: str):
     # Get session first (raises SessionNotFoundError if missing)
     session_data = session_store.get(session_id)
 
-    # Clean up cloned repo from filesystem
-    git_service = GitService()
-    git_service.cleanup_session(session_id)
-
-    # Delete from Redis (session + indexes)
-    session_store.delete(session_id)
+    def _delete() -> None:
+        # Queued behind any in-flight run so we never delete a workspace mid-test;
+        # operations queued after this one fail with 404 once it completes.
+        # Clean up cloned repo from filesystem
+        git_service = GitService()
+        git_service.cleanup_session(session_id)
+
+        # Delete from Redis (session + indexes + run logs + outputs + install marker + import graph + code index + repo map)
+        session_store.delete(session_id)
+        run_logs.delete_session(session_id)
+        output_store.delete_session(session_id)
+        install_markers.clear(session_id)
+        import_graph.clear(session_id)
+        code_index.clear(session_id)
+        repo_map.clear(session_id)
+
+    await run_in_threadpool(op_queue.run, session_id, "delete", _delete)
 
     return {
         "message": f"Session {session_id} deleted",
@@ -1,31 +1,44 @@
-"""Streaming execution endpoint — real-time test output via SSE."""
+"""Streaming execution endpoint — real-time test output via SSE.
+
+Executions run in a background thread and write every event to a durable
+run log (see `src.services.run_log`). HTTP responses only tail that log,
+so a client whose connection drops can resume from its `Last-Event-ID`
+instead of re-running the suite.
+
+Runs take their turn in the session's operation queue. A request identical
+to a run already at the back of that queue is attached to it: the client
+receives the existing run's stream instead of a second execution.
+"""
 
-import json
 import logging
 import os
+import threading
 import time
+import uuid
 from typing import Generator
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Query
 from fastapi.responses import StreamingResponse
 
 from src.app.handlers import handle_endpoint
+from src.core.exceptions import RunNotFoundError, TestExecutionError
 from src.models import ExecuteTestsRequest
 from src.services.docker_service import DockerService
+from src.services.fail_fast import run_watched
 from src.services.git_service import GitService
+from src.services.install_markers import install_markers
+from src.services.operation_queue import Ticket, op_queue, test_run_key
+from src.services.output_store import excerpt, output_store
+from src.services.run_log import run_logs
 from src.services.session_store import session_store
 from src.utils.parsers import parse_test_output
+from src.utils.sse import SSE_HEADERS, sse_comment, sse_event
 
 logger = logging.getLogger("ec2_agent")
 
 router = APIRouter(tags=["Streaming Execution"])
 
 
-def _sse_event(data: dict) -> str:
-    """Format a dict as an SSE event line."""
-    return f"data: {json.dumps(data)}\n\n"
-
-
 def _stream_execution(
     session: dict,
     session_id: str,
@@ -33,9 +46,14 @@ def _stream_execution(
     branch: str,
     install_command: str | None,
     test_command: str | None,
-) -> Generator[str, None, None]:
-    """Generator that streams test execution output as SSE events."""
+    max_failures: int | None = None,
+) -> Generator[dict, None, None]:
+    """Generator that yields test execution events as dicts.
+
+    With `max_failures` the run is fail-fast (see `src.services.fail_fast`).
+    """
 
+    start_time = time.time()
     docker_service = DockerService()
     git_service = GitService()
 
@@ -51,67 +69,76 @@ def _stream_execution(
     container_repo_path = os.path.join(api_settings.container_repos_path, session_id)
 
     # ── Install ──────────────────────────────────────────────────────────
-    yield _sse_event({"type": "phase", "phase": "install"})
+    yield {"type": "phase", "phase": "install"}
 
-    install_lines: list[str] = []
     install_exit = 0
-    try:
-        gen = docker_service.install_dependencies_streaming(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=install_command,
-        )
-        for line in gen:
-            install_lines.append(line)
-            yield _sse_event({"type": "log", "phase": "install", "line": line})
-    except Exception as e:
-        logger.warning(f"Install streaming failed, falling back: {e}")
-        install_exit, install_output = docker_service.install_dependencies(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=install_command,
-        )
-        for line in install_output.strip().split("\n"):
-            install_lines.append(line)
-            yield _sse_event({"type": "log", "phase": "install", "line": line})
+    fingerprint = install_markers.fingerprint(repo_path, language, install_command)
+    if install_markers.is_current(session_id, fingerprint):
+        yield {"type": "log", "phase": "install", "line": "Dependencies unchanged since last install, skipping"}
+    else:
+        try:
+            gen = docker_service.install_dependencies_streaming(
+                language=language,
+                repo_path=container_repo_path,
+                custom_command=install_command,
+            )
+            # Drive manually to capture the (exit_code, output) return value
+            try:
+                while True:
+                    line = next(gen)
+                    yield {"type": "log", "phase": "install", "line": line}
+            except StopIteration as stop:
+                if stop.value:
+                    install_exit, _ = stop.value
+        except Exception as e:
+            logger.warning(f"Install streaming failed, falling back: {e}")
+            install_exit, install_output = docker_service.install_dependencies(
+                language=language,
+                repo_path=container_repo_path,
+                custom_command=install_command,
+            )
+            for line in install_output.strip().split("\n"):
+                yield {"type": "log", "phase": "install", "line": line}
+
+        if install_exit == 0:
+            install_markers.record(session_id, fingerprint)
 
-    yield _sse_event({"type": "phase_done", "phase": "install", "exit_code": install_exit})
+    yield {"type": "phase_done", "phase": "install", "exit_code": install_exit}
 
     # ── Test ─────────────────────────────────────────────────────────────
-    yield _sse_event({"type": "phase", "phase": "test"})
+    yield {"type": "phase", "phase": "test"}
 
     test_lines: list[str] = []
     test_exit = 0
     full_test_output = ""
+    stopped = False
+    command, flagged = docker_service.test_command(language, container_repo_path, test_command, max_failures)
+    watched = bool(max_failures) and not flagged
     try:
-        gen = docker_service.run_tests_streaming(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=test_command,
-        )
+        if watched:
+            gen = run_watched(docker_service, language, command, container_repo_path, max_failures)
+        else:
+            gen = docker_service.exec_command_streaming(language, command, container_repo_path)
         # Manually drive the generator so we can capture its return value
-        # (exit_code, full_output) which is set via `return` inside the generator.
+        # (exit_code, full_output[, stopped]) which is set via `return` inside the generator.
         try:
             while True:
                 line = next(gen)
                 test_lines.append(line)
-                yield _sse_event({"type": "log", "phase": "test", "line": line})
+                yield {"type": "log", "phase": "test", "line": line}
         except StopIteration as stop:
             if stop.value:
-                test_exit, full_test_output = stop.value
+                test_exit, full_test_output = stop.value[:2]
+                stopped = watched and stop.value[2]
             else:
                 test_exit = 0
                 full_test_output = "\n".join(test_lines)
     except Exception as e:
         logger.warning(f"Test streaming failed, falling back: {e}")
-        test_exit, full_test_output = docker_service.run_tests(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=test_command,
-        )
+        test_exit, full_test_output = docker_service.exec_command(language, command, container_repo_path)
         for line in full_test_output.strip().split("\n"):
             test_lines.append(line)
-            yield _sse_event({"type": "log", "phase": "test", "line": line})
+            yield {"type": "log", "phase": "test", "line": line}
 
     # Parse errors
     errors = parse_test_output(full_test_output, language)
@@ -120,7 +147,10 @@ def _stream_execution(
     # Count passed
     passed = _count_passed(full_test_output, language)
     failed = len(errors)
-    duration = 0  # Will be measured by caller
+    duration = round(time.time() - start_time, 2)
+
+    # Every line was already streamed; the result only references the stored output
+    output_ref = output_store.save(session_id, full_test_output)
 
     # ── Final result ──
     result = {
@@ -130,12 +160,18 @@ def _stream_execution(
         "passed": passed,
         "failed": failed,
         "errors": [{"file": e.file, "line": e.line, "message": e.message, "error_type": e.error_type, "full_trace": e.full_trace} for e in errors],
-        "raw_output": full_test_output,
+        "raw_output": excerpt(full_test_output, output_ref),
+        "output": output_ref.model_dump(),
         "duration": duration,
+        "fail_fast": None if not max_failures else {
+            "max_failures": max_failures,
+            "method": "watch" if watched else "flag",
+            "complete": not stopped if watched else test_exit == 0,
+        },
     }
 
-    yield _sse_event({"type": "result", "data": result})
-    yield _sse_event({"type": "done"})
+    yield {"type": "result", "data": result}
+    yield {"type": "done"}
 
 
 def _count_passed(output: str, language: str) -> int:
@@ -158,38 +194,139 @@ def _count_passed(output: str, language: str) -> int:
     return 0
 
 
+def _run_execution(session: dict, session_id: str, run_id: str, ticket: Ticket, **kwargs) -> None:
+    """Background thread body — drive the execution and persist every event.
+
+    Waits for the run's turn in the session queue (reporting its position
+    in the log) and holds it for the whole run, so no fix/commit from any
+    worker touches the workspace while the suite is running.
+    """
+
+    def _on_position(position: int) -> None:
+        run_logs.append(session_id, run_id, {"type": "queued", "position": position})
+
+    def _run() -> dict:
+        status = "failed"
+        result = None
+        session_store.update(session_id, {"status": "running"})
+        try:
+            for event in _stream_execution(session=session, session_id=session_id, **kwargs):
+                if event.get("type") == "result":
+                    result = event["data"]
+                    status = "completed" if result["status"] == "success" else "failed"
+                run_logs.append(session_id, run_id, event)
+        finally:
+            session_store.update(session_id, {"status": status})
+        if result is None:
+            raise TestExecutionError("Execution finished without a result")
+        return result  # shared with coalesced POST /execute callers
+
+    try:
+        op_queue.execute(ticket, _run, on_position=_on_position)
+    except Exception as e:
+        logger.error(f"[RUN {run_id}] Execution failed: {e}", exc_info=True)
+        run_logs.append(session_id, run_id, {"type": "error", "message": str(e)})
+        run_logs.append(session_id, run_id, {"type": "done"})
+
+
+def _tail_run(session_id: str, run_id: str, last_id: str) -> Generator[str, None, None]:
+    """Format a run log tail as SSE, with keep-alives while the log is idle."""
+    for item in run_logs.tail(session_id, run_id, last_id):
+        if item is None:
+            yield sse_comment()
+            continue
+        event_id, event = item
+        yield sse_event(event, event_id=event_id)
+
+
 @router.post("/execute/stream")
+@handle_endpoint
 async def execute_tests_streaming(request: ExecuteTestsRequest):
     """Run tests with real-time SSE streaming output.
 
-    Returns a text/event-stream response where each event is a JSON line:
-    - {"type": "phase", "phase": "install"|"test"}
+    Returns a text/event-stream response where each event is a JSON line
+    tagged with an `id:` that can be passed back as `Last-Event-ID` to
+    `GET /execute/stream/{run_id}` after a disconnect:
+    - {"type": "run", "run_id": "..."}  — always first
+    - {"type": "queued", "position": N}  — operations still ahead of this run
+    - {"type": "phase", "phase": "install"|"test"}  — with `max_failures`, the test phase is fail-fast
     - {"type": "log", "phase": "...", "line": "..."}
     - {"type": "phase_done", "phase": "...", "exit_code": N}
     - {"type": "result", "data": {...}}
+    - {"type": "error", "message": "..."}  — execution crashed
     - {"type": "done"}
     """
     session = session_store.get(request.session_id)
-    session_store.update(request.session_id, {"status": "running"})
-
     language = session["language"]
     branch = request.branch or "main"
 
-    def generate():
-        yield from _stream_execution(
-            session=session,
-            session_id=request.session_id,
-            language=language,
-            branch=branch,
-            install_command=request.install_command,
-            test_command=request.test_command,
+    run_id = uuid.uuid4().hex
+    # Log exists before the ticket so a request coalesced into it can tail it at once
+    run_logs.append(request.session_id, run_id, {"type": "run", "run_id": run_id})
+    ticket = op_queue.enqueue(
+        request.session_id,
+        "test",
+        coalesce_key=test_run_key(branch, request.install_command, request.test_command, request.max_failures),
+        meta={"run_id": run_id},
+        can_join=lambda meta: "run_id" in meta,  # only runs with a log can be tailed
+    )
+    if ticket.joined:
+        run_logs.discard(request.session_id, run_id)
+        return StreamingResponse(
+            _tail_run(request.session_id, ticket.meta["run_id"], "0-0"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
         )
 
+    thread = threading.Thread(
+        target=_run_execution,
+        kwargs={
+            "session": session,
+            "session_id": request.session_id,
+            "run_id": run_id,
+            "ticket": ticket,
+            "language": language,
+            "branch": branch,
+            "install_command": request.install_command,
+            "test_command": request.test_command,
+            "max_failures": request.max_failures,
+        },
+        name=f"run-{run_id[:8]}",
+        daemon=True,
+    )
+    thread.start()
+
     return StreamingResponse(
-        generate(),
+        _tail_run(request.session_id, run_id, "0-0"),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",
-        },
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/execute/stream/{run_id}")
+@handle_endpoint
+async def resume_execution_stream(
+    run_id: str,
+    session_id: str = Query(..., description="The session ID the run belongs to"),
+    last_event_id: str | None = Query(
+        default=None, description="Resume after this event id (alternative to the Last-Event-ID header)"
+    ),
+    last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    """Reconnect to a running (or finished) execution.
+
+    Replays every event after `Last-Event-ID` and then follows the live
+    log until the run's `done` event. Without an id the whole run is replayed.
+    """
+    session_store.get(session_id)  # raises SessionNotFoundError if missing
+
+    if not run_logs.exists(session_id, run_id):
+        raise RunNotFoundError(f"Run {run_id} not found for session {session_id}")
+
+    resume_from = last_event_id_header or last_event_id or "0-0"
+
+    return StreamingResponse(
+        _tail_run(session_id, run_id, resume_from),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
@@ -1,15 +1,33 @@
 """Pydantic models for EC2 Agent API."""
 
-from src.models.execution import ExecuteTestsRequest, ExecuteTestsResponse, TestError
-from src.models.fix import ApplyFixRequest, ApplyFixResponse, CommitFixRequest, CommitFixResponse
+from src.models.execution import ExecuteTestsRequest, ExecuteTestsResponse, RawOutputRef, TestError
+from src.models.files import ReadFilesRequest
+from src.models.fix import (
+    ApplyBatchRequest,
+    ApplyFixRequest,
+    ApplyFixResponse,
+    ApplyPatchRequest,
+    BatchFix,
+    CommitFixRequest,
+    CommitFixResponse,
+    PatchEdit,
+    SpeculateRequest,
+)
 from src.models.session import SessionResponse
 
 __all__ = [
     "ExecuteTestsRequest",
     "ExecuteTestsResponse",
+    "RawOutputRef",
     "TestError",
+    "ReadFilesRequest",
     "ApplyFixRequest",
     "ApplyFixResponse",
+    "ApplyPatchRequest",
+    "ApplyBatchRequest",
+    "BatchFix",
+    "SpeculateRequest",
+    "PatchEdit",
     "CommitFixRequest",
     "CommitFixResponse",
     "SessionResponse",
@@ -15,6 +15,16 @@ class TestError(BaseModel):
     full_trace: str | None = Field(default=None, description="Full traceback if available")
 
 
+class RawOutputRef(BaseModel):
+    """Reference to a run's full output, stored compressed on the agent."""
+
+    output_id: str = Field(..., description="Pass to GET /outputs/{output_id} to fetch the full text")
+    sha256: str = Field(..., description="SHA-256 of the full UTF-8 output")
+    size_bytes: int = Field(..., description="Size of the full output in bytes")
+    compressed_bytes: int = Field(..., description="Stored (compressed) size in bytes")
+    truncated: bool = Field(default=False, description="True if the raw_output excerpt does not cover the whole output")
+
+
 class ExecuteTestsRequest(BaseModel):
     """Request body for POST /execute-tests."""
 
@@ -31,6 +41,14 @@ class ExecuteTestsRequest(BaseModel):
         default=None,
         description="Custom test execution command (optional). Uses smart defaults if not provided."
     )
+    max_failures: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Fail-fast (\"find next error\") mode: stop the run after this many failures. "
+            "Omit to run the whole suite."
+        ),
+    )
 
     class Config:
         json_schema_extra = {
@@ -52,5 +70,19 @@ class ExecuteTestsResponse(BaseModel):
     passed: int = Field(default=0, description="Number of tests passed")
     failed: int = Field(default=0, description="Number of tests failed")
     errors: list[TestError] = Field(default_factory=list, description="List of test errors")
-    raw_output: str = Field(default="", description="Raw test output from container")
-    duration: float = Field(default=0.0, description="Execution time in seconds")
\ No newline at end of file
+    raw_output: str = Field(
+        default="", description="Test output from container, bounded to a head/tail excerpt"
+    )
+    output: RawOutputRef | None = Field(default=None, description="Reference to the full stored output")
+    duration: float = Field(default=0.0, description="Execution time in seconds")
+    preflight: dict | None = Field(
+        default=None,
+        description="Syntax check of the files just written: checked, skipped, errors, duration_ms",
+    )
+    fail_fast: dict | None = Field(
+        default=None,
+        description=(
+            "Fail-fast run: max_failures, method (flag | watch) and complete "
+            "(false when the run may have stopped before the end of the suite)"
+        ),
+    )
\ No newline at end of file
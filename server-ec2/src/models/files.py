@@ -0,0 +1,10 @@
+"""Pydantic models for file endpoints."""
+
+from pydantic import BaseModel, Field
+
+
+class ReadFilesRequest(BaseModel):
+    """Request body for POST /files/batch — read many files in one call."""
+
+    session_id: str = Field(..., description="Session identifier")
+    paths: list[str] = Field(..., min_length=1, description="Relative paths of the files to read")
@@ -1,6 +1,6 @@
 """Pydantic models for fix endpoints."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class ApplyFixRequest(BaseModel):
@@ -17,6 +17,70 @@ class ApplyFixRequest(BaseModel):
     )
 
 
+class PatchEdit(BaseModel):
+    """One search/replace edit. An empty `search` creates a new (or empty) file."""
+
+    path: str = Field(..., description="Relative path of the file to edit")
+    search: str = Field(default="", description="Existing text to replace (matched tolerantly)")
+    replace: str = Field(default="", description="Text to put in its place")
+
+
+class ApplyPatchRequest(BaseModel):
+    """Request body for POST /patch — apply search/replace edits and run tests."""
+
+    session_id: str = Field(..., description="Session identifier")
+    edits: list[PatchEdit] = Field(..., min_length=1, description="Edits, applied in order per file")
+    install_command: str | None = Field(
+        default=None, description="Optional custom install command"
+    )
+    test_command: str | None = Field(
+        default=None, description="Optional custom test command"
+    )
+
+
+class BatchFix(BaseModel):
+    """One fix in a batch: search/replace `edits`, or a whole-file rewrite."""
+
+    id: str = Field(..., description="Caller's id for this fix, echoed in the response")
+    edits: list[PatchEdit] = Field(default=[], description="Search/replace edits, applied in order per file")
+    file_path: str | None = Field(default=None, description="File to overwrite (whole-file fix)")
+    fix_content: str | None = Field(default=None, description="New content for file_path")
+
+    @model_validator(mode="after")
+    def _one_form(self) -> "BatchFix":
+        whole_file = self.file_path is not None and self.fix_content is not None
+        if bool(self.edits) == whole_file:
+            raise ValueError(f"fix {self.id}: give either edits or file_path + fix_content")
+        return self
+
+    @property
+    def paths(self) -> set[str]:
+        return {e.path for e in self.edits} if self.edits else {self.file_path}
+
+
+class ApplyBatchRequest(BaseModel):
+    """Request body for POST /fix/batch — apply independent fixes together and run tests once."""
+
+    session_id: str = Field(..., description="Session identifier")
+    fixes: list[BatchFix] = Field(..., min_length=1, description="Fixes; no two may touch the same file")
+    install_command: str | None = Field(
+        default=None, description="Optional custom install command"
+    )
+    test_command: str | None = Field(
+        default=None, description="Optional custom test command"
+    )
+
+
+class SpeculateRequest(BaseModel):
+    """Request body for POST /fix/speculate — candidate fixes for the same failure, first passing one wins."""
+
+    session_id: str = Field(..., description="Session identifier")
+    candidates: list[BatchFix] = Field(..., min_length=1, description="Candidates, most likely first")
+    test_command: str | None = Field(
+        default=None, description="Command each candidate runs, e.g. only the failing tests"
+    )
+
+
 class ApplyFixResponse(BaseModel):
     """Response body from POST /fix."""
 
@@ -31,6 +95,10 @@ class CommitFixRequest(BaseModel):
 
     session_id: str = Field(..., description="Session identifier")
     file_path: str = Field(..., description="Relative path of file to commit")
+    file_paths: list[str] = Field(
+        default_factory=list,
+        description="Further files written by the same fix (multi-file edits), committed along with file_path",
+    )
     commit_message: str = Field(
         ..., description="Commit message (should start with [AI-AGENT])"
     )
@@ -12,4 +12,8 @@ class SessionResponse(BaseModel):
     repo_url: str = Field(default="", description="Repository URL")
     language: str = Field(default="", description="Project language")
     repo_path: str = Field(default="", description="Path on EC2 where repo is cloned")
-    created_at: str = Field(default="", description="ISO timestamp of session creation")
\ No newline at end of file
+    created_at: str = Field(default="", description="ISO timestamp of session creation")
+    queue: list[dict] = Field(
+        default_factory=list,
+        description="Queued workspace operations: {ticket, kind, state, position}; position 0 is running",
+    )
\ No newline at end of file
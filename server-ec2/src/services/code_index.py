@@ -0,0 +1,295 @@
+"""Code index — BM25 search over a session's source files, for LLM context retrieval.
+
+When a failure's cause lives in a file the test does not import (a helper,
+a fixture, a config file), neither the error nor the import graph points
+at it. Every source and config file is split into overlapping line
+windows; each window is indexed by its identifiers, lowercased and also
+split at camelCase / snake_case boundaries (`getUserName` → `getusername`,
+`get`, `user`, `name`), so an error message mentioning `user_name` finds
+`userName`.
+
+Per-file term counts live in Redis, written once at clone time and
+updated by `GitService.write_file`. A version counter moves on every
+change; each worker keeps the BM25 statistics built from the hash in
+memory and rebuilds them only when the version moved. Snippets are read
+from disk at search time, so they show the file as it is now.
+"""
+
+import json
+import logging
+import math
+import os
+import posixpath
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from src.app.config import api_settings
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   code_index:{session_id}          → hash: file path → {"chunks": [[start_line, end_line, {term: count}]]}
+#   code_index_version:{session_id}  → counter, bumped whenever the hash changes
+# ═══════════════════════════════════════════════════════════
+
+CODE_INDEX_PREFIX = "code_index:"
+CODE_INDEX_VERSION_PREFIX = "code_index_version:"
+
+INDEXED_EXTENSIONS = (
+    ".py", ".pyi", ".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs",
+    ".json", ".toml", ".cfg", ".ini", ".yaml", ".yml",
+)
+SKIPPED_DIRS = {
+    ".git", "node_modules", "venv", ".venv", "env", "__pycache__", ".pytest_cache", ".mypy_cache",
+    ".tox", "dist", "build", "coverage", ".next", ".nuxt", "site-packages",
+}
+SKIPPED_FILES = {"package-lock.json", "pnpm-lock.yaml", "yarn.lock", "poetry.lock"}
+
+# Language keywords and filler words: present everywhere, so they only add noise
+STOPWORDS = frozenset(
+    """
+    and as assert async await break case catch class const continue def default del elif else except export
+    extends false finally for from function if import in is lambda let new none not null of or pass raise
+    return self static this throw true try type undefined var void while with yield the an to be it on at by
+    """.split()
+)
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*")
+_WORD_PART_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# BM25 parameters (the usual defaults)
+_K1 = 1.2
+_B = 0.75
+_LOADED_SESSIONS = 8  # in-memory indexes kept per worker
+
+
+def tokenize(text: str) -> list[str]:
+    """Index terms of `text`: each identifier lowercased, plus its camelCase / snake_case parts."""
+    terms: list[str] = []
+    for word in _IDENTIFIER_RE.findall(text):
+        lower = word.lower()
+        if len(lower) > 1 and lower not in STOPWORDS:
+            terms.append(lower)
+        parts = _WORD_PART_RE.findall(word)
+        if len(parts) > 1:
+            terms.extend(p for part in parts if len(p := part.lower()) > 1 and p not in STOPWORDS)
+    return terms
+
+
+def _chunks(source: str) -> list[list]:
+    """[start_line, end_line, {term: count}] per window; windows overlap by a quarter."""
+    lines = source.splitlines()
+    size = max(1, api_settings.code_index_chunk_lines)
+    step = max(1, size - size // 4)
+    chunks = []
+    for start in range(0, max(1, len(lines) - size + step), step):
+        window = lines[start:start + size]
+        terms = Counter(tokenize("\n".join(window)))
+        if terms:
+            chunks.append([start + 1, start + len(window), dict(terms)])
+    return chunks
+
+
+class _Bm25:
+    """In-memory BM25 statistics for one version of a session's index."""
+
+    def __init__(self, entries: dict[str, dict]):
+        self.chunks: list[tuple[str, int, int]] = []
+        self.lengths: list[int] = []
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for path, entry in entries.items():
+            for start, end, terms in entry["chunks"]:
+                index = len(self.chunks)
+                self.chunks.append((path, start, end))
+                self.lengths.append(sum(terms.values()))
+                for term, count in terms.items():
+                    self.postings.setdefault(term, []).append((index, count))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        self.files = len(entries)
+
+    def top(self, terms: list[str], k: int, exclude: set[str]) -> list[tuple[float, tuple[str, int, int]]]:
+        """Best `k` windows for the query terms; at most one per overlapping region of a file."""
+        total = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, count in postings:
+                norm = _K1 * (1 - _B + _B * self.lengths[index] / self.avg_length)
+                scores[index] = scores.get(index, 0.0) + idf * count * (_K1 + 1) / (count + norm)
+
+        picked: list[tuple[float, tuple[str, int, int]]] = []
+        for index, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            path, start, end = self.chunks[index]
+            if path in exclude:
+                continue
+            if any(p == path and s <= end and start <= e for _, (p, s, e) in picked):
+                continue
+            picked.append((score, self.chunks[index]))
+            if len(picked) >= k:
+                break
+        return picked
+
+
+class CodeIndex:
+    """Redis-backed per-session BM25 index over identifiers."""
+
+    def __init__(self):
+        self._loaded: OrderedDict[str, tuple[int, _Bm25]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    def build(self, session_id: str, repo_path: str) -> dict:
+        """Index every source and config file of a fresh checkout."""
+        started = time.monotonic()
+        entries: dict[str, str] = {}
+        chunks = 0
+        for file_path in source_files(repo_path):
+            entry = _index_file(repo_path, file_path)
+            if entry is not None:
+                entries[file_path] = json.dumps(entry)
+                chunks += len(entry["chunks"])
+
+        key = f"{CODE_INDEX_PREFIX}{session_id}"
+        version_key = f"{CODE_INDEX_VERSION_PREFIX}{session_id}"
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if entries:
+            pipe.hset(key, mapping=entries)
+        pipe.incr(version_key)
+        pipe.expire(key, api_settings.session_ttl)
+        pipe.expire(version_key, api_settings.session_ttl)
+        pipe.execute()
+
+        stats = {"files": len(entries), "chunks": chunks, "seconds": round(time.monotonic() - started, 3)}
+        logger.info(f"[INDEX] {session_id}: indexed {stats['files']} file(s), {chunks} chunk(s) in {stats['seconds']}s")
+        return stats
+
+    def update(self, session_id: str, file_path: str, repo_path: str) -> None:
+        """Re-index one file after it was written (no-op for a session without an index)."""
+        version_key = f"{CODE_INDEX_VERSION_PREFIX}{session_id}"
+        if not self.client.exists(version_key):
+            return
+        file_path = posixpath.normpath(file_path)
+        key = f"{CODE_INDEX_PREFIX}{session_id}"
+        entry = _index_file(repo_path, file_path) if _indexable(file_path) else None
+        pipe = self.client.pipeline()
+        if entry is None:
+            pipe.hdel(key, file_path)
+        else:
+            pipe.hset(key, file_path, json.dumps(entry))
+        pipe.incr(version_key)
+        pipe.execute()
+
+    def search(self, session_id: str, repo_path: str, query: str, k: int, exclude: list[str] | None = None) -> dict:
+        """Top-`k` snippets for `query`, best first; builds the index if the session has none yet."""
+        if not self.client.exists(f"{CODE_INDEX_VERSION_PREFIX}{session_id}"):
+            self.build(session_id, repo_path)
+        index = self._load(session_id)
+        terms = tokenize(query)
+        skip = {posixpath.normpath(p) for p in exclude or []}
+
+        results = []
+        for score, (path, start, end) in index.top(terms, k, skip):
+            snippet = _read_lines(os.path.join(repo_path, path), start, end)
+            if snippet:
+                results.append(
+                    {"path": path, "start_line": start, "end_line": end, "score": round(score, 3), "snippet": snippet}
+                )
+        return {"results": results, "terms": sorted(set(terms)), "indexed_files": index.files}
+
+    def clear(self, session_id: str) -> None:
+        """Forget the index (e.g. when the session is deleted)."""
+        self.client.delete(f"{CODE_INDEX_PREFIX}{session_id}", f"{CODE_INDEX_VERSION_PREFIX}{session_id}")
+        with self._lock:
+            self._loaded.pop(session_id, None)
+
+    def _load(self, session_id: str) -> _Bm25:
+        """This worker's BM25 statistics for the session, rebuilt when the index changed."""
+        version = int(self.client.get(f"{CODE_INDEX_VERSION_PREFIX}{session_id}") or 0)
+        with self._lock:
+            loaded = self._loaded.get(session_id)
+            if loaded and loaded[0] == version:
+                self._loaded.move_to_end(session_id)
+                return loaded[1]
+
+        raw = self.client.hgetall(f"{CODE_INDEX_PREFIX}{session_id}")
+        index = _Bm25({_text(path): json.loads(entry) for path, entry in raw.items()})
+        with self._lock:
+            self._loaded[session_id] = (version, index)
+            self._loaded.move_to_end(session_id)
+            while len(self._loaded) > _LOADED_SESSIONS:
+                self._loaded.popitem(last=False)
+        return index
+
+
+def _text(value: str | bytes) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _indexable(file_path: str, extensions: tuple[str, ...] = INDEXED_EXTENSIONS) -> bool:
+    parts = file_path.split("/")
+    return (
+        file_path.endswith(extensions)
+        and parts[-1] not in SKIPPED_FILES
+        and not any(part in SKIPPED_DIRS for part in parts[:-1])
+    )
+
+
+def source_files(repo_path: str, extensions: tuple[str, ...] = INDEXED_EXTENSIONS, limit: int | None = None) -> list[str]:
+    """Files of the checkout with one of `extensions`, outside vendored and build directories.
+
+    Capped at `limit` (default `code_index_max_files`), in path order.
+    """
+    limit = limit or api_settings.code_index_max_files
+    found: list[str] = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRS and not d.endswith(".egg-info"))
+        rel_root = os.path.relpath(root, repo_path)
+        for name in sorted(files):
+            file_path = posixpath.normpath(posixpath.join(rel_root.replace(os.sep, "/"), name))
+            if _indexable(file_path, extensions):
+                found.append(file_path)
+                if len(found) >= limit:
+                    logger.warning(f"[INDEX] {repo_path}: stopped at {len(found)} files")
+                    return found
+    return found
+
+
+def _index_file(repo_path: str, file_path: str) -> dict | None:
+    """Chunk terms of a file, or None when it is missing, too large or binary."""
+    abs_path = os.path.join(repo_path, file_path)
+    try:
+        if os.path.getsize(abs_path) > api_settings.code_index_max_file_bytes:
+            return None
+        with open(abs_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b"\0" in data[:1024]:
+        return None
+    return {"chunks": _chunks(data.decode("utf-8", errors="replace"))}
+
+
+def _read_lines(abs_path: str, start: int, end: int) -> str:
+    try:
+        with open(abs_path, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return ""
+    return "\n".join(lines[start - 1:end])
+
+
+# Global singleton — import this everywhere
+code_index = CodeIndex()
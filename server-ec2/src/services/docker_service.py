@@ -1,6 +1,9 @@
 """Docker execution service — run commands in long-running containers."""
 
+import hashlib
+import json
 import logging
+import os
 import time
 from typing import Generator
 
@@ -140,7 +143,7 @@ class DockerService:
         container_name = self.get_container_name(language)
         container = self.docker_manager.get_container(container_name)
 
-        full_command = f"bash -c 'cd {workdir} && {command}'"
+        full_command = self._shell(command, workdir)
         logger.info(f"Executing in {container_name}: {command[:100]}...")
 
         start = time.time()
@@ -156,6 +159,36 @@ class DockerService:
 
         return exit_code, output_str
 
+    @staticmethod
+    def _pgid_file(workdir: str) -> str:
+        """Where the process group of the command running in `workdir` is recorded."""
+        return f"/tmp/exec-{hashlib.sha1(workdir.encode()).hexdigest()[:16]}.pgid"
+
+    def _shell(self, command: str, workdir: str) -> str:
+        """Run `command` in `workdir` as its own process group, recorded for `kill_workdir`.
+
+        `set -m` gives the background job a process group of its own (and is
+        turned off again so no job notices end up in the output); the shell
+        waits for it and exits with its status.
+        """
+        pgid_file = self._pgid_file(workdir)
+        return (
+            f"bash -c 'set -m; cd {workdir} || exit 1; ( {command} ) & pid=$!; set +m; echo $pid > {pgid_file}; "
+            f"wait $pid; status=$?; rm -f {pgid_file}; exit $status'"
+        )
+
+    def kill_workdir(self, language: str, workdir: str) -> None:
+        """Kill the process group of the command running in `workdir`.
+
+        Stops a test run started with `exec_command` or
+        `exec_command_streaming` from another thread — including processes
+        that changed directory (`cd sub && …`); docker has no API to cancel
+        an exec.
+        """
+        pgid_file = self._pgid_file(workdir)
+        command = f'[ -s {pgid_file} ] && kill -9 -- -$(cat {pgid_file}) 2>/dev/null; rm -f {pgid_file}; true'
+        self.exec_command(language, command, "/")
+
     def exec_command_streaming(
         self, language: str, command: str, workdir: str, timeout_seconds: int = 180
     ) -> Generator[str, None, tuple[int, str]]:
@@ -176,7 +209,7 @@ class DockerService:
         container_name = self.get_container_name(language)
         container = self.docker_manager.get_container(container_name)
 
-        full_command = f"bash -c 'cd {workdir} && {command}'"
+        full_command = self._shell(command, workdir)
         logger.info(f"[STREAM] Executing in {container_name}: {command[:100]}...")
 
         exec_id = container.client.api.exec_create(
@@ -275,20 +308,23 @@ class DockerService:
         logger.info(f"Installing dependencies at {repo_path}")
         return self.exec_command(language, install_cmd, repo_path)
 
-    def run_tests(
-        self, language: str, repo_path: str, custom_command: str | None = None
-    ) -> tuple[int, str]:
-        """Run tests in the container.
+    def test_command(
+        self,
+        language: str,
+        repo_path: str,
+        custom_command: str | None = None,
+        max_failures: int | None = None,
+    ) -> tuple[str, bool]:
+        """Resolve the shell command of a test run.
 
-        Args:
-            language: "python" or "nodejs"
-            repo_path: Container-visible path (e.g., /repos/session_abc)
-            custom_command: Optional custom test command. If None, uses default.
+        With `max_failures`, the runner's fail-fast flag is added when the
+        command is recognised (see `src.services.fail_fast`).
 
         Returns:
-            Tuple of (exit_code, raw_test_output)
-            exit_code 0 = all passed, non-zero = failures.
+            Tuple of (command, fail_fast_flagged)
         """
+        from src.services.fail_fast import fail_fast_command
+
         if custom_command:
             test_cmd = self._normalize_test_command(custom_command, repo_path) + " 2>&1"
             logger.info(f"Using custom test command: {test_cmd[:100]}")
@@ -298,8 +334,23 @@ class DockerService:
                 raise UnsupportedLanguageError(f"No test command for '{language}'")
             logger.info(f"Using default test runner for {language}")
 
-        logger.info(f"Running tests at {repo_path}")
-        return self.exec_command(language, test_cmd, repo_path)
+        if not max_failures:
+            return test_cmd, False
+        flagged = fail_fast_command(test_cmd, max_failures, self._npm_test_script(repo_path))
+        if flagged is None:
+            return test_cmd, False
+        logger.info(f"[FAIL-FAST] Test command: {flagged[:100]}")
+        return flagged, True
+
+    @staticmethod
+    def _npm_test_script(repo_path: str) -> str:
+        """`scripts.test` of the workspace's package.json ("" if there is none)."""
+        session_part = os.path.relpath(repo_path, api_settings.container_repos_path)
+        try:
+            with open(os.path.join(api_settings.repos_base_path, session_part, "package.json"), encoding="utf-8") as fh:
+                return json.load(fh).get("scripts", {}).get("test", "") or ""
+        except (OSError, ValueError, AttributeError):
+            return ""
 
     def _resolve_command(
         self, language: str, custom_command: str | None, command_map: dict[str, str], label: str
@@ -321,11 +372,3 @@ class DockerService:
         """Install dependencies, yielding output lines in real-time."""
         cmd = self._resolve_command(language, custom_command, self.INSTALL_COMMANDS, "install")
         return self.exec_command_streaming(language, cmd, repo_path)
-
-    def run_tests_streaming(
-        self, language: str, repo_path: str, custom_command: str | None = None
-    ) -> Generator[str, None, tuple[int, str]]:
-        """Run tests, yielding output lines in real-time."""
-        normalized = self._normalize_test_command(custom_command, repo_path) if custom_command else None
-        cmd = self._resolve_command(language, normalized, self.TEST_COMMANDS, "test")
-        return self.exec_command_streaming(language, cmd, repo_path)
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""Fail-fast test runs — stop at the first failures ("find next error" mode).
+
+To choose what to fix next, the repair loop only needs the first few
+failures, not the whole suite. With `max_failures` set on `/execute` or
+`/execute/stream`, the runner's own flag is added where the command is
+recognised:
+
+    pytest     --maxfail=N
+    jest       --bail=N      (stops after N failed test files)
+    vitest     --bail=N
+    npm test   -- --bail=N   (when package.json's test script is plain jest or vitest)
+
+Any other command (e.g. `make test`) runs as given and is stopped once
+`FailureWatcher` has seen N complete failures in its streamed output — a
+failure counts once the block reporting it (pytest's `____ test_x ____`
+section, jest's `●` entry) has ended, so its message and trace are kept;
+the process group of the run is then killed. A run that passes has
+always run the whole suite.
+"""
+
+import logging
+import re
+from typing import Generator
+
+from src.services.docker_service import DockerService
+from src.utils.parsers import parse_test_output
+
+logger = logging.getLogger("ec2_agent")
+
+# Last runner invocation of the command (earlier ones may be `pip install pytest`)
+_RUNNER_RE = re.compile(r"(?:^|(?<=[\s/]))(pytest|py\.test|jest|vitest)(?=\s|$)")
+_NPM_TEST_RE = re.compile(r"^npm\s+(?:run\s+)?test(?=\s|$)")
+_NPM_SCRIPT_RE = re.compile(r"^\s*(?:npx\s+)?(?:jest|vitest)\b[^&|;]*$")
+_FAIL_FAST_ARG_RE = re.compile(r"(?:^|\s)(?:-x|--exitfirst|--maxfail\b|--bail\b)")
+
+# A line that reports a failure inside a failure block / in the summary, and
+# a line that ends the block before it
+_BLOCK_FAILURE_RE = re.compile(r"^\s*●\s|^E\s")
+_FAILURE_RE = re.compile(r"^\s*●\s|^E\s|^(?:FAILED|ERROR)\s")
+_BOUNDARY_RE = re.compile(r"^\s*(?:PASS|FAIL)\s|^\s*●\s|^Test(?:s| Suites):|^_{3,}\s|^={3,}|^(?:FAILED|ERROR)\s")
+
+
+def fail_fast_command(command: str, max_failures: int, test_script: str = "") -> str | None:
+    """`command` with its runner's fail-fast flag, or None if the runner is not recognised.
+
+    `test_script` is package.json's `scripts.test`, for `npm test`.
+    """
+    if _FAIL_FAST_ARG_RE.search(command):
+        return command  # already fails fast
+    matches = list(_RUNNER_RE.finditer(command))
+    if matches:
+        match = matches[-1]
+        flag = f"--maxfail={max_failures}" if match.group(1) in ("pytest", "py.test") else f"--bail={max_failures}"
+        return f"{command[:match.end()]} {flag}{command[match.end():]}"
+
+    npm = _NPM_TEST_RE.match(command)
+    if npm and _NPM_SCRIPT_RE.match(test_script):
+        rest = command[npm.end():]
+        if re.match(r"\s+--(?=\s|$)", rest):
+            rest = re.sub(r"^\s+--", f" -- --bail={max_failures}", rest, count=1)
+        else:
+            rest = f" -- --bail={max_failures}{rest}"
+        return command[:npm.end()] + rest
+    return None
+
+
+class FailureWatcher:
+    """Counts complete failures in a test run's output as it streams in.
+
+    Failure blocks are counted as they end; the parser's count (which for
+    pytest only sees the `FAILED …` summary at the end of the run) is used
+    when it is higher.
+    """
+
+    def __init__(self, language: str, max_failures: int):
+        self.language = language
+        self.max_failures = max_failures
+        self.failures = 0
+        self._lines: list[str] = []
+        self._blocks = 0  # failure blocks that have ended
+        self._open = False  # a failure was reported since the last count
+        self._in_block = False  # ... inside a failure block, not in the summary
+
+    def feed(self, line: str) -> bool:
+        """Take one output line; True once `max_failures` complete failures were seen."""
+        if self._open and _BOUNDARY_RE.match(line):
+            self._blocks += self._in_block
+            parsed = len(parse_test_output("\n".join(self._lines), self.language))
+            self.failures = max(self._blocks, parsed)
+            self._open = self._in_block = False
+        self._lines.append(line)
+        if _FAILURE_RE.match(line):
+            self._open = True
+            self._in_block = self._in_block or bool(_BLOCK_FAILURE_RE.match(line))
+        return self.failures >= self.max_failures
+
+
+def run_watched(
+    docker_service: DockerService, language: str, command: str, workdir: str, max_failures: int
+) -> Generator[str, None, tuple[int, str, bool]]:
+    """Stream a test run and stop it once `max_failures` complete failures were seen.
+
+    Yields output lines. Returns (exit_code, full_output, stopped) via
+    StopIteration.value.
+    """
+    watcher = FailureWatcher(language, max_failures)
+    lines: list[str] = []
+    gen = docker_service.exec_command_streaming(language, command, workdir)
+    try:
+        while True:
+            line = next(gen)
+            lines.append(line)
+            yield line
+            if watcher.feed(line):
+                break
+    except StopIteration as stop:
+        exit_code, output = stop.value or (0, "\n".join(lines))
+        return exit_code, output, False
+
+    gen.close()
+    try:
+        docker_service.kill_workdir(language, workdir)
+    except Exception as e:
+        logger.warning(f"[FAIL-FAST] could not stop the run in {workdir}: {e}")
+    note = f"[fail-fast] Stopped after {watcher.failures} failure(s) (max_failures={max_failures})"
+    logger.info(f"[FAIL-FAST] {workdir}: {note}")
+    lines.append(note)
+    yield note
+    return 1, "\n".join(lines), True
@@ -3,14 +3,21 @@
 import logging
 import os
 import shutil
+import subprocess
+import tempfile
 
 from git import Repo
 
 from src.app.config import api_settings
 from src.core.exceptions import RepositoryCloneError, RepositoryNotFoundError
+from src.services.code_index import code_index
+from src.services.import_graph import import_graph
 
 logger = logging.getLogger("ec2_agent")
 
+# Installed dependencies in a workspace: shared with its forks, never copied
+DEPENDENCY_DIRS = ("node_modules", ".venv", "venv")
+
 
 class GitService:
     """Handles all git operations for cloned repositories."""
@@ -113,20 +120,20 @@ class GitService:
     def commit_and_push(
         self,
         session_id: str,
-        file_path: str,
+        file_paths: list[str],
         commit_message: str,
         branch_name: str,
         github_token: str | None = None,
     ) -> str:
-        """Stage a file, commit, and push to remote.
+        """Stage files, commit, and push to remote.
 
         Returns the commit hash.
         """
         repo_path = self.get_repo_path(session_id)
         repo = self._get_repo(repo_path)
 
-        # Stage the file
-        repo.index.add([file_path])
+        # Stage every file the fix wrote
+        repo.index.add(file_paths)
 
         # Commit
         commit = repo.index.commit(commit_message)
@@ -153,23 +160,99 @@ class GitService:
 
         return commit.hexsha
 
+    def read_file(self, session_id: str, file_path: str) -> str | None:
+        """Read a file from the cloned repo; None if it does not exist."""
+        abs_path = os.path.join(self.get_repo_path(session_id), file_path)
+        if not os.path.isfile(abs_path):
+            return None
+        with open(abs_path, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
     def write_file(self, session_id: str, file_path: str, content: str) -> str:
         """Write content to a file in the cloned repo.
 
+        The file is replaced atomically (temp file + rename), so concurrent
+        readers such as `/files` see either the old or the new content.
+
         Returns the absolute path of the written file.
         """
         repo_path = self.get_repo_path(session_id)
         abs_path = os.path.join(repo_path, file_path)
 
         # Ensure parent directory exists
-        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-
-        with open(abs_path, "w") as f:
-            f.write(content)
+        parent = os.path.dirname(abs_path)
+        os.makedirs(parent, exist_ok=True)
 
+        fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            if os.path.exists(abs_path):
+                shutil.copymode(abs_path, tmp_path)  # keep e.g. the executable bit
+            else:
+                os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; containers must read it
+            os.replace(tmp_path, abs_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        import_graph.invalidate(session_id, file_path)
+        code_index.update(session_id, file_path, repo_path)
         logger.info(f"Wrote fix to {file_path}")
         return abs_path
 
+    def diff(self, session_id: str) -> dict:
+        """Return the uncommitted changes in a session's working tree.
+
+        Read-only: safe to call while other operations run on the session.
+        """
+        repo_path = self.get_repo_path(session_id)
+        repo = self._get_repo(repo_path)
+
+        return {
+            "diff": repo.git.diff("HEAD"),
+            "changed_files": repo.git.diff("HEAD", "--name-only").splitlines(),
+            "untracked_files": repo.untracked_files,
+        }
+
+    def fork_workspace(self, session_id: str, fork_id: str) -> str:
+        """Copy a session's working tree (including installed dependencies) to workspace `fork_id`.
+
+        Uses a copy-on-write clone where the filesystem supports it
+        (`cp --reflink=always`), so a fork costs little until files change.
+        Elsewhere the tree is copied without its dependency directories
+        (`DEPENDENCY_DIRS`), which are symlinked to the session's instead.
+        Remove it with `cleanup_session(fork_id)`.
+
+        Returns the absolute path of the fork.
+        """
+        repo_path = self.get_repo_path(session_id)
+        if not os.path.exists(repo_path):
+            raise RepositoryNotFoundError(f"Repo path not found: {repo_path}")
+        fork_path = self.get_repo_path(fork_id)
+        if os.path.exists(fork_path):
+            shutil.rmtree(fork_path)
+        try:
+            subprocess.run(
+                ["cp", "-a", "--reflink=always", repo_path, fork_path], check=True, capture_output=True
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(
+                f"cp --reflink unavailable ({e}), copying {session_id} → {fork_id} "
+                f"with its dependencies symlinked"
+            )
+            shutil.rmtree(fork_path, ignore_errors=True)
+            shutil.copytree(
+                repo_path, fork_path, symlinks=True,
+                ignore=lambda path, names: [n for n in names if path == repo_path and n in DEPENDENCY_DIRS],
+            )
+            for name in DEPENDENCY_DIRS:
+                if os.path.isdir(os.path.join(repo_path, name)):
+                    # Relative, so it resolves both here and inside the containers
+                    os.symlink(os.path.join("..", session_id, name), os.path.join(fork_path, name))
+        return fork_path
+
     def cleanup_session(self, session_id: str) -> None:
         """Delete a session's cloned repo directory."""
         repo_path = self.get_repo_path(session_id)
@@ -0,0 +1,278 @@
+"""Import graph — which workspace modules a file imports, cached per session.
+
+Used to find the implementation behind a failing test. Python imports are
+read with `ast`; JS/TS imports with a light scanner (`import … from`,
+`export … from`, `require()`, `import()`), resolved through relative paths,
+tsconfig `baseUrl`/`paths` and package.json `imports` / the package's own
+name.
+
+Each file's import specifiers are parsed once and kept in Redis along with
+the file's mtime and size; resolving them to files is done per request
+(it is a few `stat` calls), so a write only invalidates the written file.
+`GitService.write_file` calls `invalidate`; an entry whose file changed
+some other way (e.g. during a test run) is re-parsed when next used.
+"""
+
+import ast
+import json
+import logging
+import os
+import posixpath
+import re
+
+from src.app.config import api_settings
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   import_graph:{session_id}  → hash: file path → {"mtime_ns", "size", "imports"}
+# ═══════════════════════════════════════════════════════════
+
+IMPORT_GRAPH_PREFIX = "import_graph:"
+
+PY_ROOTS = ("", "src", "lib")  # where absolute imports are looked up, after the file's own directory
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+
+_JS_IMPORT_RE = re.compile(
+    r"""(?:\bimport\s+(?:type\s+)?(?:[\w*${}\s,]+?\s+from\s+)?|\bexport\s+(?:type\s+)?[\w*${}\s,]+?\s+from\s+|\brequire\s*\(\s*|\bimport\s*\(\s*)["']([^"'\n]+)["']"""
+)
+_JSON_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+def is_test_path(file_path: str) -> bool:
+    name = file_path.lower()
+    return any(x in name for x in ("test", "spec", "__test__"))
+
+
+def _python_imports(source: str) -> list[list]:
+    """[module, names, level] per import statement."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    imports: list[list] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, [], 0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", [alias.name for alias in node.names if alias.name != "*"], node.level])
+    return imports
+
+
+def _js_imports(source: str) -> list[str]:
+    return list(dict.fromkeys(_JS_IMPORT_RE.findall(source)))
+
+
+def _load_jsonc(path: str) -> dict:
+    """JSON that may carry comments and trailing commas (tsconfig)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        text = _JSON_COMMENT_RE.sub(lambda m: m.group(1) or "", text)
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+    except (OSError, ValueError):
+        return {}
+
+
+class _Resolver:
+    """Turns import specifiers into workspace paths for one repo checkout."""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        options = _load_jsonc(os.path.join(repo_path, "tsconfig.json")).get("compilerOptions", {})
+        self.base_url = posixpath.normpath(options["baseUrl"]) if options.get("baseUrl") else None
+        self.ts_paths: dict[str, list[str]] = options.get("paths") or {}
+        package = _load_jsonc(os.path.join(repo_path, "package.json"))
+        self.package_name: str = package.get("name") or ""
+        self.package_imports: dict = package.get("imports") or {}
+
+    def _file(self, path: str) -> str | None:
+        path = posixpath.normpath(path)
+        if path.startswith("..") or not os.path.isfile(os.path.join(self.repo_path, path)):
+            return None
+        return path
+
+    # ── Python ──
+
+    def python(self, importer: str, module: str, names: list[str], level: int) -> list[str]:
+        here = posixpath.dirname(importer)
+        if level:
+            base = here
+            for _ in range(level - 1):
+                base = posixpath.dirname(base)
+            roots = [base]
+        else:
+            roots = [here, *PY_ROOTS]
+        parts = module.split(".") if module else []
+        for root in roots:
+            stem = posixpath.join(root, *parts) if parts else root
+            found = [
+                p
+                for name in names
+                if (p := self._file(f"{posixpath.join(stem, name)}.py") or self._file(posixpath.join(stem, name, "__init__.py")))
+            ]
+            module_file = (self._file(f"{stem}.py") if parts else None) or self._file(posixpath.join(stem, "__init__.py"))
+            if found or module_file:
+                # The package itself only matters for names that are not submodules
+                return [*found, *([module_file] if module_file and (not names or len(found) < len(names)) else [])]
+        return []
+
+    # ── JS / TS ──
+
+    def js(self, importer: str, spec: str) -> str | None:
+        if spec.startswith("."):
+            return self._js_file(posixpath.join(posixpath.dirname(importer), spec))
+        if spec.startswith("#") and self.package_imports:
+            target = self._match(self.package_imports, spec)
+            return self._js_file(target) if target else None
+        if self.package_name and (spec == self.package_name or spec.startswith(self.package_name + "/")):
+            rest = spec[len(self.package_name):].lstrip("/")
+            return self._js_file(rest or "index") or self._js_file(posixpath.join("src", rest or "index"))
+        base = self.base_url or "."
+        for pattern, targets in self.ts_paths.items():
+            for target in targets if isinstance(targets, list) else [targets]:
+                mapped = self._match({pattern: target}, spec)
+                if mapped and (found := self._js_file(posixpath.join(base, mapped))):
+                    return found
+        if self.base_url:
+            return self._js_file(posixpath.join(self.base_url, spec))
+        return None  # a package from node_modules
+
+    @staticmethod
+    def _match(mapping: dict, spec: str) -> str | None:
+        """Apply a `paths`/`imports`-style mapping with at most one `*` per pattern."""
+        for pattern, target in mapping.items():
+            if isinstance(target, dict):  # conditional export: take the first string
+                target = next((t for t in target.values() if isinstance(t, str)), None)
+            if not isinstance(target, str):
+                continue
+            if "*" not in pattern:
+                if spec == pattern:
+                    return target
+                continue
+            prefix, suffix = pattern.split("*", 1)
+            if spec.startswith(prefix) and spec.endswith(suffix) and len(spec) >= len(prefix) + len(suffix):
+                return target.replace("*", spec[len(prefix):len(spec) - len(suffix)])
+        return None
+
+    def _js_file(self, path: str) -> str | None:
+        path = posixpath.normpath(path)
+        stem, ext = posixpath.splitext(path)
+        candidates = [path] if ext in JS_EXTENSIONS else []
+        if ext in (".js", ".jsx", ".mjs", ".cjs"):
+            candidates += [stem + ".ts", stem + ".tsx"]  # TS sources imported by their emitted name
+        candidates += [path + e for e in JS_EXTENSIONS] + [posixpath.join(path, "index" + e) for e in JS_EXTENSIONS]
+        return next((found for c in candidates if (found := self._file(c))), None)
+
+
+class ImportGraph:
+    """Redis-backed per-session cache of parsed imports."""
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    def imports(self, session_id: str, repo_path: str, file_path: str, resolver: "_Resolver | None" = None) -> list[str]:
+        """Workspace files `file_path` imports, in source order."""
+        resolver = resolver or _Resolver(repo_path)
+        specs = self._specifiers(session_id, repo_path, file_path)
+        resolved: list[str] = []
+        if file_path.endswith(".py"):
+            for module, names, level in specs:
+                resolved.extend(resolver.python(file_path, module, names, level))
+        else:
+            resolved.extend(p for spec in specs if (p := resolver.js(file_path, spec)))
+        return [p for p in dict.fromkeys(resolved) if p != file_path]
+
+    def implementations(self, session_id: str, repo_path: str, file_path: str) -> dict:
+        """Implementation modules a test file exercises.
+
+        Its non-test imports, plus those of test helpers it imports
+        (fixtures, shared setup — and for pytest the `conftest.py` files
+        above it) up to `import_graph_max_depth` hops. The module named
+        like the test (`test_calc.py` → `calc.py`) comes first.
+        """
+        resolver = _Resolver(repo_path)
+        implementations: list[str] = []
+        frontier = [file_path]
+        if file_path.endswith(".py"):
+            frontier += _conftests(repo_path, file_path)
+        seen = set(frontier)
+        for _ in range(max(1, api_settings.import_graph_max_depth)):
+            helpers: list[str] = []
+            for importer in frontier:
+                for path in self.imports(session_id, repo_path, importer, resolver):
+                    if path in seen:
+                        continue
+                    seen.add(path)
+                    (helpers if is_test_path(path) or path.endswith("conftest.py") else implementations).append(path)
+            frontier = helpers
+            if not frontier:
+                break
+
+        stem = _test_stem(file_path)
+        implementations.sort(key=lambda p: _module_stem(p) != stem)  # stable: keeps source order otherwise
+        return {"implementations": implementations, "imports": self.imports(session_id, repo_path, file_path, resolver)}
+
+    def invalidate(self, session_id: str, file_path: str) -> None:
+        """Drop a file's cached imports (it was written)."""
+        self.client.hdel(f"{IMPORT_GRAPH_PREFIX}{session_id}", posixpath.normpath(file_path))
+
+    def clear(self, session_id: str) -> None:
+        """Forget the whole graph (e.g. when the session is deleted)."""
+        self.client.delete(f"{IMPORT_GRAPH_PREFIX}{session_id}")
+
+    def _specifiers(self, session_id: str, repo_path: str, file_path: str) -> list:
+        abs_path = os.path.join(repo_path, file_path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return []
+        key = f"{IMPORT_GRAPH_PREFIX}{session_id}"
+        cached = self.client.hget(key, file_path)
+        if cached:
+            entry = json.loads(cached)
+            if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                return entry["imports"]
+
+        with open(abs_path, encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        imports = _python_imports(source) if file_path.endswith(".py") else _js_imports(source)
+        logger.debug(f"[IMPORTS] {session_id}: parsed {file_path} ({len(imports)} import(s))")
+        self.client.hset(key, file_path, json.dumps({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "imports": imports}))
+        self.client.expire(key, api_settings.session_ttl)
+        return imports
+
+
+def _conftests(repo_path: str, file_path: str) -> list[str]:
+    """conftest.py files pytest loads for `file_path`, nearest first."""
+    found = []
+    directory = posixpath.dirname(file_path)
+    while True:
+        path = posixpath.join(directory, "conftest.py")
+        if os.path.isfile(os.path.join(repo_path, path)):
+            found.append(path)
+        if not directory:
+            return found
+        directory = posixpath.dirname(directory)
+
+
+def _test_stem(file_path: str) -> str:
+    name = posixpath.basename(file_path).split(".")[0]
+    for affix in ("test_", "_test", "_spec"):
+        name = name.removeprefix(affix) if affix.endswith("_") else name.removesuffix(affix)
+    return name
+
+
+def _module_stem(file_path: str) -> str:
+    name = posixpath.basename(file_path).split(".")[0]
+    return posixpath.basename(posixpath.dirname(file_path)) if name in ("__init__", "index") else name
+
+
+# Global singleton — import this everywhere
+import_graph = ImportGraph()
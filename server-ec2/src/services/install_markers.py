@@ -0,0 +1,87 @@
+"""Dependency install markers — skip re-installing when nothing changed.
+
+A marker is a fingerprint of the dependency manifests plus the install
+command, recorded in Redis after a successful install. It is shared by all
+uvicorn workers, so whichever worker handles the next run sees it.
+
+Only installs that land in the workspace itself (node_modules) are
+skipped. Python packages go into the language container's shared
+site-packages, which another session may have changed since — a Python
+session's unchanged manifests say nothing about what is installed.
+"""
+
+import hashlib
+import logging
+import os
+
+from src.app.config import api_settings
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   install_marker:{session_id}  → fingerprint of the last good install
+# ═══════════════════════════════════════════════════════════
+
+INSTALL_MARKER_PREFIX = "install_marker:"
+
+# Files whose content decides what an install produces, for languages that
+# install into the workspace
+MANIFEST_FILES: dict[str, tuple[str, ...]] = {
+    "nodejs": (
+        "package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json",
+    ),
+}
+
+
+class InstallMarkers:
+    """Redis-backed record of which dependency set is installed in each workspace."""
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    def fingerprint(self, repo_path: str, language: str, install_command: str | None) -> str:
+        """Hash the manifests found in `repo_path` together with the install command.
+
+        Empty for languages whose installs are shared between sessions —
+        such an install is never skipped.
+        """
+        if language not in MANIFEST_FILES:
+            return ""
+        digest = hashlib.sha256()
+        digest.update(f"{language}\0{install_command or ''}\0".encode())
+        for name in MANIFEST_FILES.get(language, ()):
+            path = os.path.join(repo_path, name)
+            if not os.path.isfile(path):
+                continue
+            digest.update(name.encode() + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def is_current(self, session_id: str, fingerprint: str) -> bool:
+        """True if the last successful install for this session matches `fingerprint`."""
+        if not fingerprint:
+            return False
+        return self.client.get(f"{INSTALL_MARKER_PREFIX}{session_id}") == fingerprint
+
+    def record(self, session_id: str, fingerprint: str) -> None:
+        """Remember a successful install."""
+        if not fingerprint:
+            return
+        self.client.set(
+            f"{INSTALL_MARKER_PREFIX}{session_id}", fingerprint, ex=api_settings.session_ttl
+        )
+        logger.info(f"Install marker recorded for session {session_id}")
+
+    def clear(self, session_id: str) -> None:
+        """Forget the install state (e.g. when the session is deleted)."""
+        self.client.delete(f"{INSTALL_MARKER_PREFIX}{session_id}")
+
+
+# Global singleton — import this everywhere
+install_markers = InstallMarkers()
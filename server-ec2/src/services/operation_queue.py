@@ -0,0 +1,313 @@
+"""Redis-backed per-session operation queue — ordered, coalescing workspace access.
+
+Every operation that mutates or executes in a session workspace (install +
+test runs, fixes, commits, deletes) takes a ticket and waits for its turn,
+in arrival order, across all uvicorn workers. Read-only calls (`/files`,
+`/diff`) never queue.
+
+A test run that arrives while an identical test run is already the last
+ticket in the queue joins it instead of queueing another run: nothing can
+change the workspace between the two, so they would produce the same result.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, NamedTuple
+
+import redis
+
+from src.app.config import api_settings
+from src.core.exceptions import SessionBusyError, SessionNotFoundError, TestExecutionError
+from src.services.session_lock import session_lock
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   op_queue:{session_id}   → Redis LIST of ticket ids (head = running)
+#   op_ticket:{ticket_id}   → Redis HASH {kind, state, coalesce_key, meta, ...}
+#   op_result:{ticket_id}   → JSON result shared with coalesced followers
+# ═══════════════════════════════════════════════════════════
+
+QUEUE_PREFIX = "op_queue:"
+TICKET_PREFIX = "op_ticket:"
+RESULT_PREFIX = "op_result:"
+
+POLL_INTERVAL = 0.2
+
+
+def test_run_key(
+    branch: str, install_command: str | None, test_command: str | None, max_failures: int | None = None
+) -> str:
+    """Coalesce key for a test run — identical parameters mean an identical run."""
+    params = json.dumps([branch, install_command, test_command, *([max_failures] if max_failures else [])])
+    return "test:" + hashlib.sha1(params.encode()).hexdigest()
+
+
+class Ticket(NamedTuple):
+    """A place in a session's queue.
+
+    `joined` is True when the request was coalesced into an existing
+    ticket; the caller should then wait for that ticket's result instead
+    of running anything itself.
+    """
+
+    id: str
+    session_id: str
+    kind: str
+    joined: bool
+    meta: dict
+
+
+class SessionOperationQueue:
+    """
+    FIFO queue of workspace operations per session.
+
+    Usage:
+        result = op_queue.run(session_id, "fix", do_fix)
+        result = op_queue.run(session_id, "test", run_suite, coalesce_key=key)
+    """
+
+    @property
+    def client(self) -> redis.Redis:
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    # ── High-level ────────────────────────────────────────
+
+    def run(
+        self,
+        session_id: str,
+        kind: str,
+        fn: Callable[[], Any],
+        coalesce_key: str | None = None,
+    ) -> Any:
+        """Queue `fn`, run it when it reaches the head, and return its result.
+
+        With `coalesce_key`, `fn` must return a JSON-serializable value: a
+        coalesced request receives the leader's result instead of running.
+        """
+        ticket = self.enqueue(session_id, kind, coalesce_key=coalesce_key)
+        if ticket.joined:
+            return self.wait_result(ticket)
+        return self.execute(ticket, fn)
+
+    def execute(
+        self,
+        ticket: Ticket,
+        fn: Callable[[], Any],
+        on_position: Callable[[int], None] | None = None,
+    ) -> Any:
+        """Wait for `ticket`'s turn, run `fn` under the session lock, then leave the queue."""
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(ticket, stop), name=f"op-{ticket.id[:8]}", daemon=True
+        )
+        heartbeat.start()
+
+        try:
+            self.wait_turn(ticket, on_position=on_position)
+            with session_lock.hold(ticket.session_id, ticket.kind):
+                try:
+                    result = fn()
+                except Exception as e:
+                    self._publish_result(ticket, {"error": str(e)})
+                    raise
+            self._publish_result(ticket, {"result": result})
+            return result
+        finally:
+            stop.set()
+            self._leave(ticket)
+
+    # ── Building blocks ───────────────────────────────────
+
+    def enqueue(
+        self,
+        session_id: str,
+        kind: str,
+        coalesce_key: str | None = None,
+        meta: dict | None = None,
+        can_join: Callable[[dict], bool] | None = None,
+    ) -> Ticket:
+        """Take a ticket, or join the tail ticket if it is an identical operation.
+
+        `can_join` lets the caller veto joining based on the tail ticket's meta
+        (e.g. a streaming request can only join a run that has a run log).
+        """
+        queue_key = f"{QUEUE_PREFIX}{session_id}"
+        ticket_id = uuid.uuid4().hex
+        meta = meta or {}
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(queue_key)
+
+                    if coalesce_key:
+                        tail_id = pipe.lindex(queue_key, -1)
+                        tail = pipe.hgetall(f"{TICKET_PREFIX}{tail_id}") if tail_id else {}
+                        tail_meta = json.loads(tail.get("meta", "{}")) if tail else {}
+                        if (
+                            tail
+                            and tail.get("coalesce_key") == coalesce_key
+                            and (can_join is None or can_join(tail_meta))
+                        ):
+                            pipe.unwatch()
+                            logger.info(f"[QUEUE] {kind} on {session_id} coalesced into {tail_id}")
+                            return Ticket(tail_id, session_id, kind, True, tail_meta)
+
+                    ticket_key = f"{TICKET_PREFIX}{ticket_id}"
+                    pipe.multi()
+                    pipe.rpush(queue_key, ticket_id)
+                    pipe.expire(queue_key, api_settings.session_ttl)
+                    pipe.hset(ticket_key, mapping={
+                        "kind": kind,
+                        "state": "queued",
+                        "coalesce_key": coalesce_key or "",
+                        "meta": json.dumps(meta),
+                        "enqueued_at": time.time(),
+                    })
+                    pipe.expire(ticket_key, api_settings.op_ticket_ttl_seconds)
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    continue
+
+        logger.info(f"[QUEUE] {kind} on {session_id} queued as {ticket_id}")
+        return Ticket(ticket_id, session_id, kind, False, meta)
+
+    def wait_turn(self, ticket: Ticket, on_position: Callable[[int], None] | None = None) -> None:
+        """Block until `ticket` is at the head of its queue.
+
+        Tickets whose owner died (heartbeat expired) are dropped from the
+        head so they cannot stall the queue. `on_position` is called with
+        the number of operations ahead whenever that number changes.
+
+        Raises SessionNotFoundError if the session is deleted while waiting,
+        and SessionBusyError if the queue does not advance (same operation
+        at the head) for `session_lock_wait_seconds` — a long but healthy
+        run ahead only delays the ticket.
+        """
+        queue_key = f"{QUEUE_PREFIX}{ticket.session_id}"
+        deadline = time.monotonic() + api_settings.session_lock_wait_seconds
+        last_position = None
+        last_head = None
+
+        while True:
+            if not session_store.exists(ticket.session_id):
+                raise SessionNotFoundError(f"Session {ticket.session_id} was deleted while queued")
+
+            queue = self.client.lrange(queue_key, 0, -1)
+            if ticket.id not in queue:
+                raise SessionBusyError(f"{ticket.kind} on session {ticket.session_id} lost its queue slot")
+
+            head = queue[0]
+            if head != last_head:
+                last_head = head
+                deadline = time.monotonic() + api_settings.session_lock_wait_seconds
+            if head == ticket.id:
+                self.client.hset(f"{TICKET_PREFIX}{ticket.id}", "state", "running")
+                return
+
+            if not self.client.exists(f"{TICKET_PREFIX}{head}"):
+                logger.warning(f"[QUEUE] Dropping stale ticket {head} from {ticket.session_id}")
+                self.client.lrem(queue_key, 1, head)
+                continue
+
+            position = queue.index(ticket.id)
+            if position != last_position:
+                last_position = position
+                if on_position:
+                    on_position(position)
+
+            if time.monotonic() >= deadline:
+                raise SessionBusyError(
+                    f"Session {ticket.session_id} is busy ({position} operation(s) ahead of {ticket.kind}; "
+                    f"the queue has not moved for {api_settings.session_lock_wait_seconds:.0f}s)"
+                )
+
+            time.sleep(POLL_INTERVAL)
+
+    def wait_result(self, ticket: Ticket) -> Any:
+        """Wait for a coalesced ticket's leader to publish its result."""
+        result_key = f"{RESULT_PREFIX}{ticket.id}"
+        while True:
+            raw = self.client.get(result_key)
+            if raw is not None:
+                outcome = json.loads(raw)
+                if "error" in outcome:
+                    raise TestExecutionError(f"Coalesced {ticket.kind} failed: {outcome['error']}")
+                return outcome["result"]
+
+            if not self.client.exists(f"{TICKET_PREFIX}{ticket.id}"):
+                # Leader finished between our checks — result must be there now
+                raw = self.client.get(result_key)
+                if raw is None:
+                    raise TestExecutionError(f"Coalesced {ticket.kind} ended without a result")
+                continue
+
+            time.sleep(POLL_INTERVAL)
+
+    def snapshot(self, session_id: str) -> list[dict]:
+        """Describe the queue for status reporting: position 0 is the running operation."""
+        ticket_ids = self.client.lrange(f"{QUEUE_PREFIX}{session_id}", 0, -1)
+        if not ticket_ids:
+            return []
+
+        pipe = self.client.pipeline()
+        for ticket_id in ticket_ids:
+            pipe.hgetall(f"{TICKET_PREFIX}{ticket_id}")
+        tickets = pipe.execute()
+
+        return [
+            {
+                "ticket": ticket_id,
+                "kind": data.get("kind"),
+                "state": data.get("state"),
+                "position": position,
+            }
+            for position, (ticket_id, data) in enumerate(zip(ticket_ids, tickets))
+            if data
+        ]
+
+    # ── Internal ──────────────────────────────────────────
+
+    def _publish_result(self, ticket: Ticket, outcome: dict) -> None:
+        """Share the outcome with coalesced followers (only for coalescable tickets)."""
+        if not self.client.hget(f"{TICKET_PREFIX}{ticket.id}", "coalesce_key"):
+            return
+        try:
+            payload = json.dumps(outcome, default=str)
+        except TypeError as e:
+            payload = json.dumps({"error": f"Result not shareable: {e}"})
+        self.client.set(f"{RESULT_PREFIX}{ticket.id}", payload, ex=api_settings.op_ticket_ttl_seconds * 10)
+
+    def _leave(self, ticket: Ticket) -> None:
+        pipe = self.client.pipeline()
+        pipe.lrem(f"{QUEUE_PREFIX}{ticket.session_id}", 1, ticket.id)
+        pipe.delete(f"{TICKET_PREFIX}{ticket.id}")
+        pipe.execute()
+        logger.info(f"[QUEUE] {ticket.kind} {ticket.id} left {ticket.session_id} queue")
+
+    def _heartbeat(self, ticket: Ticket, stop: threading.Event) -> None:
+        """Keep the ticket alive while its owner is waiting or running.
+
+        A failed renewal is retried on the next beat — the ticket only
+        expires (and is dropped as stale) if several in a row fail.
+        """
+        ttl = api_settings.op_ticket_ttl_seconds
+        while not stop.wait(ttl / 3):
+            try:
+                self.client.expire(f"{TICKET_PREFIX}{ticket.id}", ttl)
+            except Exception as e:
+                logger.warning(f"[QUEUE] Heartbeat for {ticket.kind} {ticket.id} failed: {e}")
+
+
+# Global singleton — import this everywhere
+op_queue = SessionOperationQueue()
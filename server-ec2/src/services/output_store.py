@@ -0,0 +1,140 @@
+"""Redis-backed raw test output — stored once per run, compressed, read lazily.
+
+Responses only carry a head/tail excerpt (`raw_output`) and an `output`
+reference (id, hash, size); the full text is fetched through
+`GET /outputs/{output_id}` when someone actually needs it.
+"""
+
+import hashlib
+import logging
+import uuid
+import zlib
+
+import redis
+
+from src.app.config import api_settings
+from src.core.exceptions import OutputNotFoundError
+from src.models import RawOutputRef
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   raw_output:{session_id}:{output_id}  → zlib-compressed UTF-8 output (bytes)
+#   session_outputs:{session_id}         → Redis SET of output_ids (for cleanup)
+# ═══════════════════════════════════════════════════════════
+
+OUTPUT_PREFIX = "raw_output:"
+SESSION_OUTPUTS_PREFIX = "session_outputs:"
+
+
+class OutputStore:
+    """
+    Compressed raw output storage.
+
+    Uses its own binary-safe Redis client: the session store's client
+    decodes every reply as text, which compressed payloads are not.
+
+    Usage:
+        ref = output_store.save(session_id, full_output)
+        text, total = output_store.read(session_id, ref.output_id, offset, length)
+    """
+
+    def __init__(self):
+        self._client: redis.Redis | None = None
+
+    @property
+    def client(self) -> redis.Redis:
+        """Lazy-initialised binary Redis client."""
+        if self._client is None:
+            self._client = redis.from_url(
+                api_settings.redis_url,
+                decode_responses=False,  # payloads are zlib bytes
+                socket_connect_timeout=5,
+                socket_timeout=5,
+                retry_on_timeout=True,
+                health_check_interval=30,
+            )
+        return self._client
+
+    def _key(self, session_id: str, output_id: str) -> str:
+        return f"{OUTPUT_PREFIX}{session_id}:{output_id}"
+
+    # ── Write ─────────────────────────────────────────────
+
+    def save(self, session_id: str, output: str) -> RawOutputRef:
+        """Compress and store a run's output; return the reference sent to clients."""
+        data = output.encode("utf-8")
+        compressed = zlib.compress(data, api_settings.raw_output_compression_level)
+        output_id = uuid.uuid4().hex
+
+        pipe = self.client.pipeline()
+        pipe.set(self._key(session_id, output_id), compressed, ex=api_settings.session_ttl)
+        pipe.sadd(f"{SESSION_OUTPUTS_PREFIX}{session_id}", output_id)
+        pipe.expire(f"{SESSION_OUTPUTS_PREFIX}{session_id}", api_settings.session_ttl)
+        pipe.execute()
+
+        logger.info(
+            f"Stored output {output_id} for {session_id}: "
+            f"{len(data)} bytes → {len(compressed)} compressed"
+        )
+        return RawOutputRef(
+            output_id=output_id,
+            sha256=hashlib.sha256(data).hexdigest(),
+            size_bytes=len(data),
+            compressed_bytes=len(compressed),
+            truncated=len(output) > api_settings.raw_output_head_chars + api_settings.raw_output_tail_chars,
+        )
+
+    # ── Read ──────────────────────────────────────────────
+
+    def read(
+        self, session_id: str, output_id: str, offset: int = 0, length: int | None = None
+    ) -> tuple[bytes, int]:
+        """Return (bytes in [offset, offset+length), total size) of a stored output.
+
+        Raises OutputNotFoundError if the output expired or never existed.
+        """
+        compressed = self.client.get(self._key(session_id, output_id))
+        if compressed is None:
+            raise OutputNotFoundError(f"Output {output_id} not found for session {session_id}")
+
+        data = zlib.decompress(compressed)
+        end = len(data) if length is None else offset + length
+        return data[offset:end], len(data)
+
+    # ── Cleanup ───────────────────────────────────────────
+
+    def delete_session(self, session_id: str) -> int:
+        """Delete every output stored for a session. Returns the number removed."""
+        index_key = f"{SESSION_OUTPUTS_PREFIX}{session_id}"
+        output_ids = self.client.smembers(index_key)
+
+        pipe = self.client.pipeline()
+        for output_id in output_ids:
+            pipe.delete(self._key(session_id, output_id.decode()))
+        pipe.delete(index_key)
+        pipe.execute()
+        return len(output_ids)
+
+    def close(self) -> None:
+        """Close the Redis connection pool."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+def excerpt(output: str, ref: RawOutputRef) -> str:
+    """Bounded stand-in for the stored output: head, an omission marker, tail."""
+    if not ref.truncated:
+        return output
+    tail_chars = api_settings.raw_output_tail_chars
+    head = output[:api_settings.raw_output_head_chars]
+    tail = output[-tail_chars:] if tail_chars else ""
+    omitted = ref.size_bytes - len(head.encode("utf-8")) - len(tail.encode("utf-8"))
+    return f"{head}\n… <{omitted} bytes omitted — GET /outputs/{ref.output_id}> …\n{tail}"
+
+
+# Global singleton — import this everywhere
+output_store = OutputStore()
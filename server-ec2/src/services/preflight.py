@@ -0,0 +1,203 @@
+"""Pre-flight — syntax checks on freshly written files before a test run.
+
+A fix with broken syntax otherwise costs a dependency install and a full
+test run to discover. `TestRunner.run_tests(check_paths=…)` runs this
+first and skips the test run when a file does not parse.
+
+Python files are compiled in-process (milliseconds); a file that fails is
+re-checked by the container's interpreter, so a newer Python in the
+container than on the host never rejects valid syntax. JS/TS files are
+checked in the node container by one `node` process: with the
+workspace's `typescript` package through `transpileModule` (syntax only,
+JSX allowed), else `node --check` for plain JS. Files no checker covers
+are reported as skipped, never as errors — and if the container cannot be
+reached, the test run simply goes ahead.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+from src.app.config import api_settings
+from src.models.execution import TestError
+from src.services.docker_service import DockerService
+
+logger = logging.getLogger("ec2_agent")
+
+PY_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts")
+
+# Paths are spliced into a shell command; anything else is skipped
+_SAFE_PATH_RE = re.compile(r"^[\w./@+-]+$")
+
+_PY_CHECK = """
+import json, sys
+out = []
+for path in sys.argv[1:]:
+    try:
+        with open(path, "rb") as f:
+            compile(f.read(), path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        out.append({"path": path, "line": e.lineno, "column": e.offset, "message": f"{type(e).__name__}: {e.msg}"})
+    except ValueError as e:
+        out.append({"path": path, "line": None, "column": None, "message": f"ValueError: {e}"})
+print(json.dumps(out))
+"""
+
+_JS_CHECK = r"""
+const fs = require("fs");
+const { execFileSync } = require("child_process");
+let ts = null;
+try { ts = require(require.resolve("typescript", { paths: [process.cwd()] })); } catch (e) {}
+// node --check errors that come from module type or JSX, not from broken syntax
+const AMBIGUOUS = /Cannot use import statement|Unexpected token 'export'|Unexpected token '<'|import\.meta|outside a module/;
+const out = [];
+for (const path of process.argv.slice(1)) {
+  if (ts) {
+    const result = ts.transpileModule(fs.readFileSync(path, "utf8"), {
+      fileName: path,
+      reportDiagnostics: true,
+      compilerOptions: { jsx: ts.JsxEmit.Preserve, allowJs: true },
+    });
+    for (const d of result.diagnostics || []) {
+      const pos = d.file && d.start !== undefined ? d.file.getLineAndCharacterOfPosition(d.start) : null;
+      out.push({
+        path, line: pos ? pos.line + 1 : null, column: pos ? pos.character + 1 : null,
+        message: "TS" + d.code + ": " + ts.flattenDiagnosticMessageText(d.messageText, "\n"), checker: "typescript",
+      });
+    }
+  } else if (/\.[cm]?js$/.test(path)) {
+    try {
+      execFileSync(process.execPath, ["--check", path], { stdio: "pipe" });
+    } catch (e) {
+      const text = String(e.stderr || "");
+      const where = /:(\d+)\s*$/.exec(text.split("\n")[0]);
+      const message = (text.match(/^\w*Error: .*$/m) || [text.trim().split("\n").pop() || "SyntaxError"])[0];
+      if (!AMBIGUOUS.test(message)) {
+        out.push({ path, line: where ? Number(where[1]) : null, column: null, message, checker: "node" });
+      }
+    }
+  } else {
+    out.push({ path, skipped: true });
+  }
+}
+console.log(JSON.stringify(out));
+"""
+
+
+@dataclass
+class PreflightResult:
+    checked: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)  # no checker for them
+    errors: list[TestError] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "errors": len(self.errors),
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+    def report(self) -> str:
+        """Stand-in for test output when the run was skipped."""
+        lines = [f"Pre-flight syntax check failed — test run skipped ({len(self.errors)} error(s))", ""]
+        lines += [f"{e.file}:{e.line or '?'}: {e.message}" for e in self.errors]
+        return "\n".join(lines) + "\n"
+
+
+def _compile_errors(path: str, data: bytes) -> list[dict]:
+    """What `_PY_CHECK` reports for one file, run in this process."""
+    try:
+        compile(data, path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [{"path": path, "line": e.lineno, "column": e.offset, "message": f"{type(e).__name__}: {e.msg}"}]
+    except ValueError as e:
+        return [{"path": path, "line": None, "column": None, "message": f"ValueError: {e}"}]
+    return []
+
+
+class Preflight:
+    """Syntax checks for files of one workspace."""
+
+    def __init__(self, session_id: str, language: str, repo_path: str):
+        self.session_id = session_id
+        self.language = language
+        self.repo_path = repo_path
+        self.container_repo_path = os.path.join(api_settings.container_repos_path, session_id)
+
+    def check(self, paths: list[str]) -> PreflightResult:
+        started = time.monotonic()
+        result = PreflightResult()
+        paths = [p for p in dict.fromkeys(os.path.normpath(p) for p in paths) if os.path.isfile(os.path.join(self.repo_path, p))]
+        safe = [p for p in paths if _SAFE_PATH_RE.match(p)]
+        py_paths = [p for p in safe if p.endswith(PY_EXTENSIONS) and self.language == "python"]
+        js_paths = [p for p in safe if p.endswith(JS_EXTENSIONS) and self.language == "nodejs"]
+        result.skipped = [p for p in paths if p not in py_paths and p not in js_paths]
+
+        found: list[dict] = []
+        if py_paths:
+            found += self._check_python(py_paths)
+        if js_paths:
+            js_found = self._run_in_container(_JS_CHECK, "node -e", js_paths)
+            if js_found is None:
+                result.skipped += js_paths
+            else:
+                result.skipped += [f["path"] for f in js_found if f.get("skipped")]
+                found += [f for f in js_found if not f.get("skipped")]
+        result.checked = [p for p in paths if p not in result.skipped]
+
+        for f in found:
+            message = f["message"]
+            error_type = "INDENTATION" if message.startswith(("IndentationError", "TabError")) else "SYNTAX"
+            location = f"{f['path']}:{f.get('line') or '?'}" + (f":{f['column']}" if f.get("column") else "")
+            result.errors.append(TestError(
+                file=f["path"], line=f.get("line"), error_type=error_type, message=message,
+                full_trace=f"{location}: {message} (pre-flight, {f.get('checker', 'python')})",
+            ))
+        result.duration = time.monotonic() - started
+        logger.info(
+            f"[PREFLIGHT] {self.session_id}: {len(result.checked)} checked, {len(result.skipped)} skipped, "
+            f"{len(result.errors)} error(s) in {result.duration * 1000:.0f}ms"
+        )
+        return result
+
+    def _check_python(self, paths: list[str]) -> list[dict]:
+        found = []
+        for path in paths:
+            with open(os.path.join(self.repo_path, path), "rb") as f:
+                found += _compile_errors(path, f.read())
+        if not found:
+            return found
+        # Only the container's interpreter knows which syntax the tests run under
+        failing = list(dict.fromkeys(f["path"] for f in found))
+        confirmed = self._run_in_container(_PY_CHECK, "python -c", failing)
+        return found if confirmed is None else confirmed
+
+    def _run_in_container(self, script: str, interpreter: str, paths: list[str]) -> list[dict] | None:
+        """Run a check script over `paths` in the workspace's container; None if it could not run."""
+        encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+        command = f'{interpreter} "$(echo {encoded} | base64 -d)" ' + " ".join(f'"{p}"' for p in paths)
+        try:
+            _, output = DockerService().exec_command(self.language, command, self.container_repo_path)
+        except Exception as e:
+            logger.warning(f"[PREFLIGHT] {self.session_id}: check could not run ({e}), skipping")
+            return None
+        for line in reversed(output.strip().splitlines()):
+            try:
+                found = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(found, list):
+                return found
+        logger.warning(f"[PREFLIGHT] {self.session_id}: unexpected checker output: {output[-300:]}")
+        return None
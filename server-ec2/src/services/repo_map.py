@@ -0,0 +1,180 @@
+"""Repo map — a compact outline of a session's code: files and their top-level symbols.
+
+Gives the model an overview of the project (which module defines what) so
+it picks the right file to change. Python is outlined with `ast`
+(functions, classes with their methods, module constants); JS/TS with a
+line scanner over top-level declarations and exports.
+
+Outlines are cached in Redis by git blob hash, shared by all sessions: a
+file whose content was outlined before — in this checkout, an earlier
+commit or another session of the same repo — is never parsed again. Per
+session, each file's blob hash is kept with its mtime and size, so an
+unchanged file is not even re-read.
+"""
+
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+
+from src.app.config import api_settings
+from src.services.code_index import source_files
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   repo_map:{session_id}   → hash: file path → {"mtime_ns", "size", "blob"}
+#   repo_map_blob:{sha1}    → JSON list of symbol lines (shared across sessions)
+# ═══════════════════════════════════════════════════════════
+
+REPO_MAP_PREFIX = "repo_map:"
+REPO_MAP_BLOB_PREFIX = "repo_map_blob:"
+
+MAPPED_EXTENSIONS = (".py", ".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+
+_JS_DECLARATION_RE = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?"
+    r"(?:(?:async\s+)?function\s*\*?\s*[\w$]+\s*(?:<[^>]*>)?\s*\([^)]*\)?"
+    r"|class\s+[\w$]+(?:\s+extends\s+[\w$.]+)?"
+    r"|(?:interface|type|enum)\s+[\w$]+"
+    r"|(?:const|let|var)\s+[\w$]+(?:\s*:\s*[^=]+)?\s*=\s*(?:async\s+)?(?:\([^)]*\)|[\w$]+)\s*=>)"
+)
+_JS_EXPORT_RE = re.compile(r"^(?:export\s+(?:default\s+[\w$]+|\{[^}]*\}|\*\s+from\s+\S+)|module\.exports\s*=\s*[^;]+|exports\.[\w$]+\s*=)")
+_MAX_SYMBOL_CHARS = 120
+
+
+def blob_hash(data: bytes) -> str:
+    """Git's blob id of `data` — equal to `git hash-object` for the file."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _short(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= _MAX_SYMBOL_CHARS else text[:_MAX_SYMBOL_CHARS - 1] + "…"
+
+
+def _signature(node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return _short(f"{prefix} {node.name}({ast.unparse(node.args)}){returns}")
+
+
+def _python_symbols(source: str) -> list[str]:
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    symbols: list[str] = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(_signature(node))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(b) for b in node.bases)
+            symbols.append(_short(f"class {node.name}({bases})" if bases else f"class {node.name}"))
+            symbols.extend(
+                "  " + _signature(child)
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and (not child.name.startswith("_") or child.name == "__init__")
+            )
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            symbols.extend(t.id for t in targets if isinstance(t, ast.Name) and t.id.isupper())
+    return symbols
+
+
+def _js_symbols(source: str) -> list[str]:
+    """Top-level declarations and exports (lines that start at column 0)."""
+    symbols: list[str] = []
+    for line in source.splitlines():
+        if not line or line[0].isspace():
+            continue
+        match = _JS_DECLARATION_RE.match(line) or _JS_EXPORT_RE.match(line)
+        if match:
+            symbols.append(_short(match.group(0).rstrip("{ =")))
+    return list(dict.fromkeys(symbols))
+
+
+def outline(file_path: str, source: str) -> list[str]:
+    """Symbol lines of one file; class members are indented by two spaces."""
+    return _python_symbols(source) if file_path.endswith(".py") else _js_symbols(source)
+
+
+class RepoMap:
+    """Redis-backed outlines of session checkouts, cached by blob hash."""
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    def build(self, session_id: str, repo_path: str) -> dict:
+        """Outline every code file of the checkout.
+
+        Returns {"files": {path: [symbol, …]}, "parsed": n, "cached": n}, where
+        `parsed` counts files outlined now and `cached` those reused by blob hash.
+        """
+        paths = source_files(repo_path, MAPPED_EXTENSIONS, api_settings.repo_map_max_files)
+        key = f"{REPO_MAP_PREFIX}{session_id}"
+        known = dict(zip(paths, self.client.hmget(key, paths))) if paths else {}
+
+        blobs: dict[str, str] = {}
+        stale: dict[str, str] = {}
+        sources: dict[str, str] = {}  # path → content, for files read now
+        for path in paths:
+            abs_path = os.path.join(repo_path, path)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            cached = json.loads(known[path]) if known.get(path) else None
+            if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+                blobs[path] = cached["blob"]
+                continue
+            if st.st_size > api_settings.repo_map_max_file_bytes:
+                continue
+            with open(abs_path, "rb") as f:
+                data = f.read()
+            blobs[path] = blob_hash(data)
+            sources[path] = data.decode("utf-8", errors="replace")
+            stale[path] = json.dumps({"mtime_ns": st.st_mtime_ns, "size": st.st_size, "blob": blobs[path]})
+
+        unique = list(dict.fromkeys(blobs.values()))
+        outlines = dict(zip(unique, self.client.mget([f"{REPO_MAP_BLOB_PREFIX}{b}" for b in unique]))) if unique else {}
+
+        files: dict[str, list[str]] = {}
+        new_outlines: dict[str, str] = {}
+        parsed = 0
+        for path, blob in blobs.items():
+            raw = outlines.get(blob) or new_outlines.get(blob)
+            if raw is None:
+                if path not in sources:  # stat matched but the blob's outline expired
+                    with open(os.path.join(repo_path, path), "rb") as f:
+                        sources[path] = f.read().decode("utf-8", errors="replace")
+                raw = new_outlines[blob] = json.dumps(outline(path, sources[path]))
+                parsed += 1
+            files[path] = json.loads(raw)
+
+        pipe = self.client.pipeline()
+        if stale:
+            pipe.hset(key, mapping=stale)
+        pipe.expire(key, api_settings.session_ttl)
+        for blob, raw in new_outlines.items():
+            pipe.set(f"{REPO_MAP_BLOB_PREFIX}{blob}", raw, ex=api_settings.repo_map_blob_ttl)
+        pipe.execute()
+
+        logger.info(f"[REPO-MAP] {session_id}: {len(files)} file(s), {parsed} parsed, {len(files) - parsed} cached")
+        return {"files": files, "parsed": parsed, "cached": len(files) - parsed}
+
+    def clear(self, session_id: str) -> None:
+        """Forget the session's blob hashes; shared outlines expire on their own."""
+        self.client.delete(f"{REPO_MAP_PREFIX}{session_id}")
+
+
+# Global singleton — import this everywhere
+repo_map = RepoMap()
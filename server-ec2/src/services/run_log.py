@@ -0,0 +1,166 @@
+"""Redis-backed run logs — durable, replayable event logs for test executions."""
+
+import json
+import logging
+import time
+from typing import Generator
+
+from src.app.config import api_settings
+from src.core.exceptions import RunNotFoundError
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   run_log:{session_id}:{run_id}  → Redis STREAM of execution events
+#   session_runs:{session_id}      → Redis SET of run_ids (for cleanup)
+# ═══════════════════════════════════════════════════════════
+
+RUN_LOG_PREFIX = "run_log:"
+SESSION_RUNS_PREFIX = "session_runs:"
+
+# Event types that end a run — tailing stops after one of these is delivered
+TERMINAL_EVENTS = ("done",)
+
+
+class RunLogStore:
+    """
+    Append-only log of every event an execution produces.
+
+    The execution writes here from a background thread; HTTP clients only
+    ever read, so a dropped connection can resume from its last event id
+    instead of re-running the suite.
+
+    Usage:
+        run_logs.append(session_id, run_id, {"type": "log", ...})
+        for event_id, event in run_logs.tail(session_id, run_id, last_id):
+            ...
+    """
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    def _key(self, session_id: str, run_id: str) -> str:
+        return f"{RUN_LOG_PREFIX}{session_id}:{run_id}"
+
+    # ── Write ─────────────────────────────────────────────
+
+    def append(self, session_id: str, run_id: str, event: dict) -> str:
+        """Append one event and return its stream id."""
+        key = self._key(session_id, run_id)
+        pipe = self.client.pipeline()
+        pipe.xadd(
+            key,
+            {"event": json.dumps(event)},
+            maxlen=api_settings.run_log_maxlen,
+            approximate=True,
+        )
+        pipe.expire(key, api_settings.session_ttl)
+        pipe.sadd(f"{SESSION_RUNS_PREFIX}{session_id}", run_id)
+        pipe.expire(f"{SESSION_RUNS_PREFIX}{session_id}", api_settings.session_ttl)
+        event_id, *_ = pipe.execute()
+        return event_id
+
+    # ── Read ──────────────────────────────────────────────
+
+    def exists(self, session_id: str, run_id: str) -> bool:
+        """Check whether a run log is still retained."""
+        return self.client.exists(self._key(session_id, run_id)) > 0
+
+    def read(
+        self,
+        session_id: str,
+        run_id: str,
+        last_id: str = "0-0",
+        block_ms: int | None = None,
+        count: int = 500,
+    ) -> list[tuple[str, dict]]:
+        """Read events after `last_id` (exclusive), oldest first."""
+        key = self._key(session_id, run_id)
+        response = self.client.xread({key: last_id}, count=count, block=block_ms)
+        if not response:
+            return []
+
+        _, entries = response[0]
+        return [(entry_id, json.loads(fields["event"])) for entry_id, fields in entries]
+
+    def tail(
+        self, session_id: str, run_id: str, last_id: str = "0-0"
+    ) -> Generator[tuple[str, dict] | None, None, None]:
+        """Follow a run log until its terminal event has been delivered.
+
+        Yields (event_id, event) tuples, or None whenever the log has been
+        idle for `sse_keepalive_seconds` so callers can emit a keep-alive.
+
+        Raises RunNotFoundError if the log does not exist (expired or never started).
+        """
+        if not self.exists(session_id, run_id):
+            raise RunNotFoundError(f"Run {run_id} not found for session {session_id}")
+
+        last_activity = time.monotonic()
+        while True:
+            events = self.read(
+                session_id, run_id, last_id=last_id,
+                block_ms=api_settings.session_events_block_ms,
+            )
+            for event_id, event in events:
+                last_id = event_id
+                yield event_id, event
+                if event.get("type") in TERMINAL_EVENTS:
+                    return
+
+            if events:
+                last_activity = time.monotonic()
+                continue
+
+            if not self.exists(session_id, run_id):
+                logger.warning(f"Run log {run_id} expired while being tailed")
+                return
+
+            if self._is_finished(session_id, run_id):
+                # Resumed after the terminal event was already delivered
+                return
+
+            if time.monotonic() - last_activity >= api_settings.sse_keepalive_seconds:
+                yield None
+                last_activity = time.monotonic()
+
+    def _is_finished(self, session_id: str, run_id: str) -> bool:
+        """True if the newest event in the log is a terminal one."""
+        newest = self.client.xrevrange(self._key(session_id, run_id), count=1)
+        if not newest:
+            return False
+        _, fields = newest[0]
+        return json.loads(fields["event"]).get("type") in TERMINAL_EVENTS
+
+    # ── Cleanup ───────────────────────────────────────────
+
+    def discard(self, session_id: str, run_id: str) -> None:
+        """Drop a single run log that will never be written to (e.g. a coalesced request)."""
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(session_id, run_id))
+        pipe.srem(f"{SESSION_RUNS_PREFIX}{session_id}", run_id)
+        pipe.execute()
+
+    def delete_session(self, session_id: str) -> int:
+        """Delete every run log recorded for a session. Returns the number removed."""
+        runs_key = f"{SESSION_RUNS_PREFIX}{session_id}"
+        run_ids = self.client.smembers(runs_key)
+
+        pipe = self.client.pipeline()
+        for run_id in run_ids:
+            pipe.delete(self._key(session_id, run_id))
+        pipe.delete(runs_key)
+        pipe.execute()
+
+        if run_ids:
+            logger.info(f"Deleted {len(run_ids)} run log(s) for session {session_id}")
+        return len(run_ids)
+
+
+# Global singleton — import this everywhere
+run_logs = RunLogStore()
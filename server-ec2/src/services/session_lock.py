@@ -0,0 +1,107 @@
+"""Redis-based per-session locks — serialize workspace operations across workers."""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from redis.exceptions import LockError
+
+from src.app.config import api_settings
+from src.core.exceptions import SessionBusyError
+from src.services.session_store import session_store
+
+logger = logging.getLogger("ec2_agent")
+
+# ═══════════════════════════════════════════════════════════
+# KEY SCHEMA
+# ═══════════════════════════════════════════════════════════
+#   session_lock:{session_id}        → redis-py Lock token
+#   session_lock_owner:{session_id}  → name of the operation holding it
+# ═══════════════════════════════════════════════════════════
+
+LOCK_PREFIX = "session_lock:"
+LOCK_OWNER_PREFIX = "session_lock_owner:"
+
+
+class SessionLock:
+    """
+    Mutual exclusion for operations that touch a session's workspace
+    (install, test, fix, commit, delete).
+
+    The lock lives in Redis so it holds across every uvicorn worker. It is
+    acquired with a TTL so a crashed worker cannot wedge a session forever,
+    and a renewal thread keeps extending it while a long test run is active.
+
+    Usage:
+        with session_lock.hold(session_id, "fix"):
+            ...
+    """
+
+    @property
+    def client(self):
+        """Share the session store's Redis connection pool."""
+        return session_store.client
+
+    @contextmanager
+    def hold(
+        self, session_id: str, operation: str, wait_seconds: float | None = None
+    ) -> Iterator[None]:
+        """Block until the session's lock is acquired, hold it for the `with` body.
+
+        Raises SessionBusyError if it cannot be acquired within `wait_seconds`
+        (default: `session_lock_wait_seconds`).
+        """
+        ttl = api_settings.session_lock_ttl_seconds
+        lock = self.client.lock(
+            f"{LOCK_PREFIX}{session_id}",
+            timeout=ttl,
+            sleep=0.1,
+            blocking_timeout=(
+                wait_seconds if wait_seconds is not None else api_settings.session_lock_wait_seconds
+            ),
+            thread_local=False,  # acquired and released from different threads is fine
+        )
+
+        if not lock.acquire():
+            holder = self.client.get(f"{LOCK_OWNER_PREFIX}{session_id}") or "another operation"
+            raise SessionBusyError(f"Session {session_id} is busy ({holder} in progress)")
+
+        self.client.set(f"{LOCK_OWNER_PREFIX}{session_id}", operation, ex=ttl)
+        logger.info(f"[LOCK] {operation} acquired session {session_id}")
+
+        stop = threading.Event()
+        renewer = threading.Thread(
+            target=self._renew,
+            args=(lock, session_id, operation, stop),
+            name=f"lock-{session_id[:8]}",
+            daemon=True,
+        )
+        renewer.start()
+
+        try:
+            yield
+        finally:
+            stop.set()
+            renewer.join(timeout=1)
+            self.client.delete(f"{LOCK_OWNER_PREFIX}{session_id}")
+            try:
+                lock.release()
+            except LockError:
+                logger.warning(f"[LOCK] {operation} lost session {session_id} lock before release")
+            logger.info(f"[LOCK] {operation} released session {session_id}")
+
+    def _renew(self, lock, session_id: str, operation: str, stop: threading.Event) -> None:
+        """Keep extending the lock TTL until `stop` is set."""
+        ttl = api_settings.session_lock_ttl_seconds
+        while not stop.wait(ttl / 3):
+            try:
+                lock.reacquire()
+                self.client.expire(f"{LOCK_OWNER_PREFIX}{session_id}", ttl)
+            except LockError:
+                logger.error(f"[LOCK] Could not renew session {session_id} lock for {operation}")
+                return
+
+
+# Global singleton — import this everywhere
+session_lock = SessionLock()
@@ -17,11 +17,13 @@ logger = logging.getLogger("ec2_agent")
 #   session:{session_id}        → JSON blob (hash-like)
 #   user_sessions:{user_id}     → Redis SET of session_ids
 #   sessions_index              → Redis SET of ALL session_ids
+#   session_events:{session_id} → Redis STREAM of status transitions
 # ═══════════════════════════════════════════════════════════
 
 SESSION_PREFIX = "session:"
 USER_INDEX_PREFIX = "user_sessions:"
 SESSIONS_INDEX = "sessions_index"
+EVENTS_PREFIX = "session_events:"
 
 
 class SessionStore:
@@ -38,6 +40,7 @@ class SessionStore:
         store.delete(session_id)                 # remove session
         sessions = store.list_all()              # list all
         sessions = store.list_by_user(user_id)   # filter by user
+        events = store.read_events(session_id)   # status change stream
     """
 
     def __init__(self):
@@ -76,6 +79,9 @@ class SessionStore:
         """
         key = f"{SESSION_PREFIX}{session_id}"
 
+        now = datetime.now(timezone.utc)
+        data.setdefault("status_changed_at", now.isoformat())
+
         # Atomic check-and-set (NX = only if not exists)
         payload = json.dumps(data)
         was_set = self.client.set(key, payload, nx=True, ex=api_settings.session_ttl)
@@ -88,6 +94,10 @@ class SessionStore:
         pipe = self.client.pipeline()
         pipe.sadd(SESSIONS_INDEX, session_id)
         pipe.sadd(f"{USER_INDEX_PREFIX}{user_id}", session_id)
+        if "status" in data:
+            self._append_status_event(
+                pipe, session_id, data["status"], None, None, now, api_settings.session_ttl
+            )
         pipe.execute()
 
         logger.info(f"Session created: {session_id} (TTL={api_settings.session_ttl}s)")
@@ -111,25 +121,52 @@ class SessionStore:
         """
         Partial update — merges `updates` into the existing session.
 
+        When `updates` contains a "status", the transition (and how long the
+        session spent in the previous status) is appended to the session's
+        event stream so observers can follow it without polling.
+
         Preserves remaining TTL.
         Raises SessionNotFoundError if missing.
         """
         key = f"{SESSION_PREFIX}{session_id}"
 
-        # Get current TTL so we can preserve it
-        ttl = self.client.ttl(key)
-        raw = self.client.get(key)
-
-        if raw is None:
-            raise SessionNotFoundError(session_id)
-
-        data = json.loads(raw)
-        data.update(updates)
-        data["updated_at"] = datetime.now(timezone.utc).isoformat()
-
-        # Write back with remaining TTL (or default if TTL was -1/no expiry)
-        effective_ttl = ttl if ttl > 0 else api_settings.session_ttl
-        self.client.set(key, json.dumps(data), ex=effective_ttl)
+        # Optimistic transaction: several uvicorn workers may update the same
+        # session concurrently, so retry if the key changes under us.
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+
+                    # Get current TTL so we can preserve it
+                    ttl = pipe.ttl(key)
+                    raw = pipe.get(key)
+
+                    if raw is None:
+                        raise SessionNotFoundError(session_id)
+
+                    data = json.loads(raw)
+                    previous_status = data.get("status")
+                    previous_changed_at = data.get("status_changed_at")
+
+                    now = datetime.now(timezone.utc)
+                    data.update(updates)
+                    data["updated_at"] = now.isoformat()
+                    if "status" in updates:
+                        data["status_changed_at"] = now.isoformat()
+
+                    # Write back with remaining TTL (or default if TTL was -1/no expiry)
+                    effective_ttl = ttl if ttl > 0 else api_settings.session_ttl
+                    pipe.multi()
+                    pipe.set(key, json.dumps(data), ex=effective_ttl)
+                    if "status" in updates:
+                        self._append_status_event(
+                            pipe, session_id, updates["status"], previous_status,
+                            previous_changed_at, now, effective_ttl,
+                        )
+                    pipe.execute()
+                    break
+                except redis.WatchError:
+                    logger.debug(f"Session {session_id} changed during update, retrying")
 
         logger.info(f"Session updated: {session_id} → {list(updates.keys())}")
         return data
@@ -152,6 +189,7 @@ class SessionStore:
         # Atomic cleanup: session key + both indexes
         pipe = self.client.pipeline()
         pipe.delete(key)
+        pipe.delete(f"{EVENTS_PREFIX}{session_id}")
         pipe.srem(SESSIONS_INDEX, session_id)
         pipe.srem(f"{USER_INDEX_PREFIX}{user_id}", session_id)
         pipe.execute()
@@ -175,8 +213,64 @@ class SessionStore:
         session_ids = self.client.smembers(f"{USER_INDEX_PREFIX}{user_id}")
         return self._fetch_many(session_ids)
 
+    # ── Event stream ──────────────────────────────────────
+
+    def read_events(
+        self,
+        session_id: str,
+        last_id: str = "0-0",
+        block_ms: int | None = None,
+        count: int = 100,
+    ) -> list[tuple[str, dict]]:
+        """
+        Read status events recorded after `last_id` (exclusive).
+
+        With `block_ms` set, waits up to that long for new events.
+        Returns a list of (event_id, event) tuples, oldest first.
+        """
+        key = f"{EVENTS_PREFIX}{session_id}"
+        response = self.client.xread({key: last_id}, count=count, block=block_ms)
+        if not response:
+            return []
+
+        _, entries = response[0]
+        return [(entry_id, json.loads(fields["event"])) for entry_id, fields in entries]
+
     # ── Internal ──────────────────────────────────────────
 
+    def _append_status_event(
+        self,
+        pipe: redis.client.Pipeline,
+        session_id: str,
+        status: str,
+        previous_status: str | None,
+        previous_changed_at: str | None,
+        now: datetime,
+        ttl: int,
+    ) -> None:
+        """Queue an XADD of a status transition onto `pipe` (bounded by MAXLEN)."""
+        previous_status_ms = None
+        if previous_changed_at:
+            elapsed = now - datetime.fromisoformat(previous_changed_at)
+            previous_status_ms = round(elapsed.total_seconds() * 1000)
+
+        event = {
+            "type": "status",
+            "session_id": session_id,
+            "status": status,
+            "previous_status": previous_status,
+            "previous_status_ms": previous_status_ms,
+            "at": now.isoformat(),
+        }
+        key = f"{EVENTS_PREFIX}{session_id}"
+        pipe.xadd(
+            key,
+            {"event": json.dumps(event)},
+            maxlen=api_settings.session_events_maxlen,
+            approximate=True,
+        )
+        pipe.expire(key, ttl)
+
     def _fetch_many(self, session_ids: set[str]) -> list[dict]:
         """
         Fetch multiple sessions via pipeline.
@@ -0,0 +1,130 @@
+"""Speculative fixes — test candidate fixes side by side, keep the first that passes.
+
+Each candidate is written to its own fork of the session's workspace
+(`GitService.fork_workspace`, copy-on-write where supported) and tested
+there concurrently. The first candidate whose tests pass wins: the other
+runs are killed, and the caller promotes the winner to the real workspace.
+Forks are removed as soon as their run ends.
+
+Usage:
+    results, winner = Speculation(session_id, language).run(candidates, test_command)
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from src.app.config import api_settings
+from src.services.docker_service import DockerService
+from src.services.git_service import GitService
+from src.services.test_runner import TestRunner
+
+logger = logging.getLogger("ec2_agent")
+
+
+@dataclass
+class Candidate:
+    """One candidate fix: the files it writes, already placed in memory."""
+
+    id: str
+    contents: dict[str, str]  # path → new content
+
+
+@dataclass
+class CandidateResult:
+    id: str
+    status: str = "pending"  # passed | failed | cancelled | error
+    duration: float = 0.0  # seconds from fork to end of its test run (or cancellation)
+    test_result: dict = field(default_factory=dict)
+    message: str = ""
+
+
+class Speculation:
+    """Runs candidates for one session concurrently in forked workspaces."""
+
+    def __init__(self, session_id: str, language: str, branch: str = "main", repo_url: str = ""):
+        self.session_id = session_id
+        self.language = language
+        self.branch = branch
+        self.repo_url = repo_url
+        self.git_service = GitService()
+        self._cancelled = threading.Event()
+
+    def fork_id(self, candidate: Candidate) -> str:
+        return f"{self.session_id}--spec-{candidate.id}"
+
+    def run(
+        self, candidates: list[Candidate], test_command: str | None = None
+    ) -> tuple[list[CandidateResult], CandidateResult | None]:
+        """Test every candidate; returns all results and the winner (None if none passed)."""
+        results = {c.id: CandidateResult(c.id) for c in candidates}
+        started = time.monotonic()
+        winner: CandidateResult | None = None
+
+        with ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="spec") as pool:
+            futures = {
+                pool.submit(self._try, candidate, results[candidate.id], test_command, started): candidate
+                for candidate in candidates
+            }
+            pending = set(futures)
+            deadline = started + api_settings.speculative_timeout_seconds
+            while pending and winner is None:
+                done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.warning(f"[SPEC] {self.session_id}: no candidate passed within the timeout")
+                    break
+                for future in done:
+                    result = results[futures[future].id]
+                    if result.status == "passed" and winner is None:
+                        winner = result
+                        logger.info(f"[SPEC] {self.session_id}: candidate {result.id} passed after {result.duration:.1f}s")
+
+            if pending:
+                # Stop the losers' test runs; their threads then clean up their forks
+                self._cancelled.set()
+                for future in pending:
+                    self._kill(futures[future])
+
+        for result in results.values():
+            if result.status == "pending":
+                result.status = "cancelled"
+        return list(results.values()), winner
+
+    def _try(self, candidate: Candidate, result: CandidateResult, test_command: str | None, started: float) -> None:
+        fork_id = self.fork_id(candidate)
+        try:
+            if self._cancelled.is_set():
+                return
+            self.git_service.fork_workspace(self.session_id, fork_id)
+            for path, content in candidate.contents.items():
+                self.git_service.write_file(fork_id, path, content)
+            if self._cancelled.is_set():
+                return
+            test_result = TestRunner().run_tests(
+                repo_url=self.repo_url,
+                session_id=fork_id,
+                language=self.language,
+                branch=self.branch,
+                test_command=test_command,
+                skip_install=True,  # the fork carries the workspace's installed dependencies
+                check_paths=list(candidate.contents),
+            )
+            if self._cancelled.is_set() and test_result.status != "success":
+                return  # killed — its output says nothing about the candidate
+            result.test_result = test_result.dict()
+            result.status = "passed" if test_result.status == "success" else "failed"
+        except Exception as e:
+            logger.warning(f"[SPEC] candidate {candidate.id} errored: {e}")
+            result.status, result.message = "error", str(e)
+        finally:
+            result.duration = time.monotonic() - started
+            self.git_service.cleanup_session(fork_id)
+
+    def _kill(self, candidate: Candidate) -> None:
+        workdir = f"{api_settings.container_repos_path.rstrip('/')}/{self.fork_id(candidate)}"
+        try:
+            DockerService().kill_workdir(self.language, workdir)
+        except Exception as e:
+            logger.warning(f"[SPEC] could not stop candidate {candidate.id}: {e}")
@@ -7,7 +7,11 @@ import time
 from src.app.config import api_settings
 from src.models.execution import ExecuteTestsRequest, ExecuteTestsResponse, TestError
 from src.services.docker_service import DockerService
+from src.services.fail_fast import run_watched
 from src.services.git_service import GitService
+from src.services.install_markers import install_markers
+from src.services.output_store import excerpt, output_store
+from src.services.preflight import Preflight
 from src.utils.parsers import parse_test_output
 
 logger = logging.getLogger("ec2_agent")
@@ -31,6 +35,9 @@ class TestRunner:
         branch: str = "main",
         install_command: str | None = None,
         test_command: str | None = None,
+        skip_install: bool = False,
+        check_paths: list[str] | None = None,
+        max_failures: int | None = None,
     ) -> ExecuteTestsResponse:
         """Execute the full test pipeline.
 
@@ -41,13 +48,19 @@ class TestRunner:
             branch: Git branch to clone
             install_command: Optional custom dependency install command
             test_command: Optional custom test execution command
+            skip_install: Don't install dependencies (e.g. a forked workspace
+                that already has them)
+            check_paths: Files just written; syntax-checked first, and the
+                install and test run are skipped if any does not parse
+            max_failures: Fail-fast — stop after this many failures (see
+                `src.services.fail_fast`); None runs the whole suite
 
         Returns:
             ExecuteTestsResponse with test results
 
         Pipeline:
-        1. Clone the repository
-        2. Install dependencies in Docker container
+        1. Clone the repository (then the pre-flight syntax check, if asked)
+        2. Install dependencies in Docker container (unless already installed)
         3. Run tests in Docker container
         4. Parse the output for errors
         5. Return structured results
@@ -66,23 +79,58 @@ class TestRunner:
         # Container sees repos at whatever path was configured internally
         container_repo_path = os.path.join(api_settings.container_repos_path, session_id)
 
-        # 2. Install dependencies
-        logger.info(f"Installing dependencies for {language}")
-        install_exit, install_output = self.docker_service.install_dependencies(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=install_command,
-        )
-        if install_exit != 0:
-            logger.warning(f"Dependency install had issues: {install_output[:200]}")
+        preflight = None
+        if check_paths and api_settings.preflight_enabled:
+            preflight = Preflight(session_id, language, repo_path).check(check_paths)
+            if not preflight.ok:
+                report = preflight.report()
+                output_ref = output_store.save(session_id, report)
+                return ExecuteTestsResponse(
+                    session_id=session_id,
+                    status="failed",
+                    language=language,
+                    failed=len(preflight.errors),
+                    errors=preflight.errors,
+                    raw_output=excerpt(report, output_ref),
+                    output=output_ref,
+                    duration=round(time.time() - start_time, 2),
+                    preflight=preflight.summary(),
+                )
+
+        # 2. Install dependencies (node_modules: skipped when the manifests are unchanged)
+        fingerprint = install_markers.fingerprint(repo_path, language, install_command)
+        if skip_install:
+            logger.info(f"Skipping install for {session_id}")
+        elif install_markers.is_current(session_id, fingerprint):
+            logger.info(f"Dependencies unchanged for {session_id}, skipping install")
+        else:
+            logger.info(f"Installing dependencies for {language}")
+            install_exit, install_output = self.docker_service.install_dependencies(
+                language=language,
+                repo_path=container_repo_path,
+                custom_command=install_command,
+            )
+            if install_exit != 0:
+                logger.warning(f"Dependency install had issues: {install_output[:200]}")
+            else:
+                install_markers.record(session_id, fingerprint)
 
-        # 3. Run tests
+        # 3. Run tests (fail-fast: the runner's own flag, else stopped by watching its output)
         logger.info(f"Running tests for {language}")
-        test_exit, test_output = self.docker_service.run_tests(
-            language=language,
-            repo_path=container_repo_path,
-            custom_command=test_command,
-        )
+        command, flagged = self.docker_service.test_command(language, container_repo_path, test_command, max_failures)
+        fail_fast = None
+        if max_failures and not flagged:
+            watched = run_watched(self.docker_service, language, command, container_repo_path, max_failures)
+            try:
+                while True:
+                    next(watched)
+            except StopIteration as stop:
+                test_exit, test_output, stopped = stop.value
+            fail_fast = {"max_failures": max_failures, "method": "watch", "complete": not stopped}
+        else:
+            test_exit, test_output = self.docker_service.exec_command(language, command, container_repo_path)
+            if max_failures:
+                fail_fast = {"max_failures": max_failures, "method": "flag", "complete": test_exit == 0}
 
         # 4. Parse output
         errors = parse_test_output(test_output, language)
@@ -99,6 +147,9 @@ class TestRunner:
             f"failed={failed}, duration={duration:.2f}s"
         )
 
+        # 6. Store the full output once; the response only carries an excerpt
+        output_ref = output_store.save(session_id, test_output)
+
         return ExecuteTestsResponse(
             session_id=session_id,
             status=status,
@@ -106,8 +157,11 @@ class TestRunner:
             passed=passed,
             failed=failed,
             errors=errors,
-            raw_output=test_output,
+            raw_output=excerpt(test_output, output_ref),
+            output=output_ref,
             duration=round(duration, 2),
+            preflight=preflight.summary() if preflight else None,
+            fail_fast=fail_fast,
         )
 
 
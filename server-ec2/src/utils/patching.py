@@ -0,0 +1,153 @@
+"""Search/replace patch application with tolerant matching.
+
+LLM-produced SEARCH text is usually, but not always, an exact copy of the
+file. Matching is tried in increasingly tolerant passes and stops at the
+first pass that finds exactly one location:
+
+1. exact — the SEARCH text appears verbatim, once
+2. whitespace — same lines ignoring trailing whitespace and indentation;
+   the replacement is re-indented by the same offset
+3. fuzzy — the most similar window of lines (difflib ratio) above
+   `min_ratio`, and clearly better than the runner-up
+
+A SEARCH block that matches nowhere, or in several places equally well,
+is rejected rather than guessed.
+"""
+
+import difflib
+from dataclasses import dataclass
+
+from src.core.exceptions import PatchApplyError
+
+
+@dataclass
+class EditResult:
+    """How one edit was located."""
+
+    strategy: str  # exact | whitespace | fuzzy | create
+    start_line: int  # 1-based line where the replaced region starts
+    ratio: float = 1.0
+
+
+def apply_edits(
+    content: str | None, edits: list[tuple[str, str]], path: str, min_ratio: float = 0.85
+) -> tuple[str, list[EditResult]]:
+    """Apply (search, replace) pairs to `content` in order.
+
+    `content` is None for a file that does not exist yet; only an empty
+    SEARCH (file creation) is accepted for it.
+
+    Raises PatchApplyError describing the first edit that cannot be placed.
+    """
+    results: list[EditResult] = []
+
+    for index, (search, replace) in enumerate(edits, start=1):
+        if not search.strip():
+            if content:
+                raise PatchApplyError(f"{path}: edit {index} has an empty SEARCH but the file is not empty")
+            content = replace
+            results.append(EditResult("create", 1))
+            continue
+
+        if content is None:
+            raise PatchApplyError(f"{path}: file does not exist")
+
+        content, result = _apply_one(content, search, replace, min_ratio, f"{path}: edit {index}")
+        results.append(result)
+
+    return content or "", results
+
+
+def _apply_one(
+    content: str, search: str, replace: str, min_ratio: float, label: str
+) -> tuple[str, EditResult]:
+    # 1. Exact
+    count = content.count(search)
+    if count == 1:
+        pos = content.index(search)
+        return (
+            content[:pos] + replace + content[pos + len(search):],
+            EditResult("exact", content.count("\n", 0, pos) + 1),
+        )
+    if count > 1:
+        raise PatchApplyError(f"{label}: SEARCH text matches {count} places; include more context")
+
+    lines = content.splitlines(keepends=True)
+    search_lines = search.splitlines()
+    replace_lines = replace.splitlines()
+    # Drop blank edge lines the model tends to add or omit
+    while search_lines and not search_lines[0].strip():
+        search_lines.pop(0)
+    while search_lines and not search_lines[-1].strip():
+        search_lines.pop()
+    n = len(search_lines)
+    if not n or n > len(lines):
+        raise PatchApplyError(f"{label}: SEARCH text not found")
+
+    # 2. Whitespace-insensitive line match
+    wanted = [line.strip() for line in search_lines]
+    starts = [
+        i for i in range(len(lines) - n + 1)
+        if [line.strip() for line in lines[i:i + n]] == wanted
+    ]
+    if len(starts) > 1:
+        raise PatchApplyError(f"{label}: SEARCH text matches {len(starts)} places; include more context")
+    if starts:
+        start = starts[0]
+        new_lines = _reindent(lines[start:start + n], search_lines, replace_lines)
+        return _splice(lines, start, n, new_lines), EditResult("whitespace", start + 1)
+
+    # 3. Fuzzy window match
+    scored = []
+    for i in range(len(lines) - n + 1):
+        window = [line.strip() for line in lines[i:i + n]]
+        scored.append((difflib.SequenceMatcher(None, "\n".join(window), "\n".join(wanted)).ratio(), i))
+    scored.sort(reverse=True)
+    best_ratio, start = scored[0]
+    runner_up = scored[1][0] if len(scored) > 1 else 0.0
+    if best_ratio < min_ratio:
+        raise PatchApplyError(f"{label}: SEARCH text not found (closest match {best_ratio:.0%} similar)")
+    if best_ratio - runner_up < 0.02:
+        raise PatchApplyError(f"{label}: SEARCH text is ambiguous ({best_ratio:.0%} vs {runner_up:.0%})")
+
+    new_lines = _reindent(lines[start:start + n], search_lines, replace_lines)
+    return _splice(lines, start, n, new_lines), EditResult("fuzzy", start + 1, round(best_ratio, 3))
+
+
+def _reindent(original: list[str], search_lines: list[str], replace_lines: list[str]) -> list[str]:
+    """Shift the replacement by the indentation difference between file and SEARCH."""
+    def indent(line: str) -> str:
+        return line[: len(line) - len(line.lstrip())]
+
+    first_file = next((line for line in original if line.strip()), "")
+    first_search = next((line for line in search_lines if line.strip()), "")
+    file_indent, search_indent = indent(first_file), indent(first_search)
+
+    newline = "\r\n" if original and original[0].endswith("\r\n") else "\n"
+    out = []
+    for line in replace_lines:
+        if line.strip() and line.startswith(search_indent):
+            line = file_indent + line[len(search_indent):]
+        elif line.strip() and not search_indent:
+            line = file_indent + line
+        out.append(line.rstrip("\r\n") + newline)
+    return out
+
+
+def _splice(lines: list[str], start: int, n: int, new_lines: list[str]) -> str:
+    tail = lines[start + n:]
+    if new_lines and not tail and not lines[start + n - 1].endswith(("\n", "\r\n")):
+        new_lines[-1] = new_lines[-1].rstrip("\r\n")  # file had no trailing newline
+    return "".join(lines[:start] + new_lines + tail)
+
+
+def unified_diff(path: str, before: str, after: str) -> str:
+    """git-style unified diff of one file."""
+    return "".join(
+        difflib.unified_diff(
+            before.splitlines(keepends=True),
+            after.splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+        )
+    )
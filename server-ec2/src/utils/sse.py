@@ -0,0 +1,23 @@
+"""Server-Sent Events helpers — wire formatting shared by streaming endpoints."""
+
+import json
+
+SSE_HEADERS: dict[str, str] = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(data: dict, event_id: str | None = None) -> str:
+    """Format a dict as an SSE event, optionally tagged with an `id:` line.
+
+    Clients echo the last seen id back in the `Last-Event-ID` header when
+    they reconnect, which lets Redis-Stream-backed endpoints resume.
+    """
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def sse_comment(text: str = "keepalive") -> str:
+    """Format an SSE comment line (ignored by clients, keeps proxies from timing out)."""
+    return f": {text}\n\n"